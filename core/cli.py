@@ -0,0 +1,207 @@
+"""
+Headless command line entry point.
+
+    python -m core.cli batch <input> [-o OUTPUT] [--engine gemini|comfy] ...
+
+Runs a batch without the GUI: only Qt-free core modules are imported
+(no PySide6 / qfluentwidgets), and each engine's modules are imported
+only when that engine is used.
+
+Exit codes: 0 all tasks done, 1 some tasks failed or the batch could not
+start, 2 invalid arguments / missing settings, 130 interrupted.
+"""
+import argparse
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+
+from core.constants import DEFAULT_COMFY_URL, IMAGE_FORMATS
+from core.utils.naming import format_eta
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+DEFAULT_MODEL_ID = "gemini-3-pro-image-preview"
+DEFAULT_WORKFLOW = Path(__file__).resolve().parent.parent / "data" / "api_nano_banana_pro.json"
+API_KEY_ENV_VARS = ("NANO_PAPL_API_KEY", "GEMINI_API_KEY")
+
+
+class ConsoleReporter:
+    """Prints batch log lines plus a progress/ETA line whenever the percentage changes."""
+
+    def __init__(self, quiet=False, stream=None):
+        self.quiet = quiet
+        self.stream = stream or sys.stdout
+        self.started = time.monotonic()
+        self._last_pct = -1
+
+    def log(self, message):
+        if not self.quiet:
+            print(message, file=self.stream, flush=True)
+
+    def progress(self, value):
+        pct = int(value)
+        if pct == self._last_pct:
+            return
+        self._last_pct = pct
+        elapsed = time.monotonic() - self.started
+        eta = format_eta(int(elapsed * (100 - value) / value)) if 0 < value < 100 else "0s"
+        print(f"[PROGRESS] {pct}% | Elapsed: {format_eta(int(elapsed))} | ETA: {eta}", file=self.stream, flush=True)
+
+    def preview(self, input_path, output_path, prompt):
+        pass  # no image preview in the terminal; the log already names the saved file
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m core.cli", description="Nano Papl headless runner")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    batch = sub.add_parser("batch", help="Run a batch over a project (or a folder of projects)")
+    batch.add_argument("input", help="Project folder (with prompts.md) or a root folder of projects")
+    batch.add_argument("-o", "--output", default="", help="Output folder (default: <input>/_renders)")
+    batch.add_argument("--engine", choices=("gemini", "comfy"), default="gemini")
+    batch.add_argument("--resolution", default="1K", help="1K, 2K or 4K (default: 1K)")
+    batch.add_argument("--ratio", default="1:1", help="Aspect ratio, e.g. 16:9, or 'Original'")
+    batch.add_argument("--format", dest="output_format", choices=IMAGE_FORMATS, default="PNG")
+    batch.add_argument("--no-resume", dest="resume", action="store_false", help="Ignore the output folder's journal")
+    batch.add_argument("--result-cache", action="store_true", help="Reuse identical previous generations")
+    batch.add_argument("--no-logs", dest="save_logs", action="store_false", help="Don't write per-image prompt logs")
+    batch.add_argument("-q", "--quiet", action="store_true", help="Only print progress and the summary")
+
+    gemini = batch.add_argument_group("gemini")
+    gemini.add_argument("--api-key", default="", help=f"Gemini API key (default: {' / '.join(API_KEY_ENV_VARS)} or the saved key)")
+    gemini.add_argument("--model", default=DEFAULT_MODEL_ID)
+    gemini.add_argument("--concurrency", type=int, default=None, help="Parallel requests (default: from settings)")
+    gemini.add_argument("--timeout", type=int, default=None, help="Request timeout in seconds (default: from settings)")
+
+    comfy = batch.add_argument_group("comfy")
+    comfy.add_argument("--comfy-url", action="append", default=None, help="ComfyUI server; repeat to load balance (default: from settings)")
+    comfy.add_argument("--workflow", default=str(DEFAULT_WORKFLOW), help="API-format workflow JSON")
+    comfy.add_argument("--queue-depth", type=int, default=None, help="Prompts kept queued per server (default: from settings)")
+    comfy.add_argument("--system-prompt", default="")
+    comfy.add_argument("--seed", type=int, default=None, help="Fixed seed (default: random per task)")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == "batch":
+        return run_batch(args)
+    return EXIT_USAGE
+
+
+def run_batch(args) -> int:
+    input_path = Path(args.input)
+    if not input_path.is_dir():
+        print(f"Error: input folder not found: {input_path}", file=sys.stderr)
+        return EXIT_USAGE
+
+    # Settings are read only now, so --help never touches the config file / keyring
+    from core.utils import config_helper
+    config = config_helper.config_manager.config
+
+    reporter = ConsoleReporter(quiet=args.quiet)
+    if args.engine == "gemini":
+        runner = _make_gemini_runner(args, config, reporter)
+        if runner is None:
+            return EXIT_USAGE
+        execute = runner.run
+    else:
+        runner = _make_comfy_runner(args, config, reporter)
+        execute = runner.process_batch
+
+    interrupted = []
+
+    def on_sigint(signum, frame):
+        if interrupted:
+            raise KeyboardInterrupt
+        interrupted.append(signum)
+        print("Stopping after the running task(s)... (Ctrl+C again to abort)", file=sys.stderr, flush=True)
+        runner.stop()
+
+    previous = signal.signal(signal.SIGINT, on_sigint)
+    try:
+        summary = execute()
+    except KeyboardInterrupt:
+        print("Aborted.", file=sys.stderr)
+        return EXIT_INTERRUPTED
+    finally:
+        signal.signal(signal.SIGINT, previous)
+
+    elapsed = format_eta(int(time.monotonic() - reporter.started))
+    print(f"Done: {summary.succeeded} succeeded, {summary.failed} failed, {summary.skipped} skipped in {elapsed}", flush=True)
+
+    if summary.error:
+        print(f"Error: {summary.error}", file=sys.stderr)
+        return EXIT_FAILED
+    if interrupted or summary.stopped:
+        return EXIT_INTERRUPTED if interrupted else EXIT_FAILED
+    return EXIT_FAILED if summary.failed else EXIT_OK
+
+
+def _make_gemini_runner(args, config, reporter):
+    from core.services.batch_runner import BatchRunner
+    from core.services.rate_limiter import RateLimiter
+    from core.services.result_cache import ResultCache
+    from core.utils.path_provider import PathProvider
+
+    api_key = args.api_key or next((os.environ[v] for v in API_KEY_ENV_VARS if os.environ.get(v)), "") or config.api_key
+    if not api_key:
+        print(f"Error: Gemini API key missing (use --api-key, {API_KEY_ENV_VARS[0]} or the app's Settings)", file=sys.stderr)
+        return None
+
+    result_cache = None
+    if args.result_cache:
+        result_cache = ResultCache(PathProvider().get_result_cache_dir(), config.result_cache_max_mb * 1024 * 1024)
+
+    return BatchRunner(
+        api_key, args.input, args.output,
+        args.resolution, args.ratio, args.output_format,
+        args.model, args.save_logs,
+        timeout=args.timeout or config.api_timeout,
+        max_concurrency=args.concurrency or config.batch_concurrency,
+        rate_limiter=RateLimiter.from_config(config),
+        resume=args.resume,
+        result_cache=result_cache,
+        log_callback=reporter.log,
+        progress_callback=reporter.progress,
+        preview_callback=reporter.preview
+    )
+
+
+def _make_comfy_runner(args, config, reporter):
+    from core.services.comfy_orchestrator import ComfyOrchestrator
+
+    urls = args.comfy_url or [config.comfy_url or DEFAULT_COMFY_URL] + list(config.comfy_extra_urls)
+    settings = {
+        "comfy_url": urls[0],
+        "comfy_urls": urls,
+        "api_key": config.comfy_api_key,
+        "input_path": args.input,
+        "output_path": args.output,
+        "resolution": args.resolution,
+        "ratio": args.ratio,
+        "workflow_path": args.workflow,
+        "system_prompt": args.system_prompt,
+        "use_random_seed": args.seed is None,
+        "seed_value": args.seed or 0,
+        "save_logs": args.save_logs,
+        "resume": args.resume,
+        "result_cache": args.result_cache,
+        "result_cache_max_mb": config.result_cache_max_mb,
+        "queue_depth": args.queue_depth or config.comfy_queue_depth
+    }
+    return ComfyOrchestrator(
+        settings,
+        log_callback=reporter.log,
+        progress_callback=reporter.progress,
+        preview_callback=reporter.preview
+    )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
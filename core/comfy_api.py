@@ -1,15 +1,42 @@
 import json
+import os
 import uuid
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from core.logger import logger
 
 class ComfyAPI:
     """
     Handles HTTP communication with the ComfyUI server using the requests library.
+
+    All calls share one pooled Session (keep-alive connections) with
+    connect/read timeouts. Idempotent GET/HEAD calls are retried by the
+    transport; uploads are retried here since they overwrite by name.
+    Queueing a prompt is never retried, to avoid running it twice.
     """
-    def __init__(self, base_url="http://127.0.0.1:8188"):
+    DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, base_url="http://127.0.0.1:8188", connect_timeout=5.0, read_timeout=120.0, retries=3, pool_size=16):
         self.base_url = base_url.rstrip('/')
         self.client_id = str(uuid.uuid4())
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+
+        retry = Retry(
+            total=retries, connect=retries, read=retries, status=retries,
+            backoff_factor=0.5,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset({"GET", "HEAD"}),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self):
+        self.session.close()
 
     def upload_image(self, file_path: str, target_name: str) -> str | None:
         """
@@ -24,24 +51,41 @@ class ComfyAPI:
         """
         url = f"{self.base_url}/upload/image"
         
-        try:
-            with open(file_path, 'rb') as f:
-                files = {'image': (target_name, f, 'image/png')} # Basic MIME, requests handles boundary
-                # ComfyUI might expect 'overwrite': 'true' or similar if needed.
-                data = {'overwrite': 'true'} 
-                
-                response = requests.post(url, files=files, data=data)
-                
-            if response.status_code == 200:
-                result = response.json()
-                return result.get("name")
-            else:
-                logger.error(f"[ComfyAPI] Upload failed: {response.status_code} - {response.text}")
+        for attempt in range(self.retries + 1):
+            try:
+                with open(file_path, 'rb') as f:
+                    files = {'image': (target_name, f, 'image/png')} # Basic MIME, requests handles boundary
+                    # Overwrite by name makes the upload safe to retry
+                    data = {'overwrite': 'true'} 
+                    
+                    response = self.session.post(url, files=files, data=data, timeout=self.timeout)
+                    
+                if response.status_code == 200:
+                    result = response.json()
+                    return result.get("name")
+                else:
+                    logger.error(f"[ComfyAPI] Upload failed: {response.status_code} - {response.text}")
+                    return None
+
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt < self.retries:
+                    logger.warning(f"[ComfyAPI] Upload retry {attempt + 1}/{self.retries}: {e}")
+                    continue
+                logger.error(f"[ComfyAPI] Upload error: {e}")
+                return None
+            except Exception as e:
+                logger.error(f"[ComfyAPI] Upload error: {e}")
                 return None
-                
+
+    def has_input_image(self, filename: str) -> bool:
+        """Checks whether a file exists in the server's input folder (HEAD /view, no body)."""
+        url = f"{self.base_url}/view"
+        try:
+            response = self.session.head(url, params={"filename": filename, "type": "input"}, timeout=self.timeout)
+            return response.status_code == 200
         except Exception as e:
-            logger.error(f"[ComfyAPI] Upload error: {e}")
-            return None
+            logger.error(f"[ComfyAPI] Input check error: {e}")
+            return False
 
     def queue_prompt(self, workflow: dict, api_key: str = None) -> str | None:
         """
@@ -66,7 +110,7 @@ class ComfyAPI:
             }
 
         try:
-            response = requests.post(url, json=payload)
+            response = self.session.post(url, json=payload, timeout=self.timeout)
             if response.status_code == 200:
                 return response.json().get("prompt_id")
             else:
@@ -83,7 +127,7 @@ class ComfyAPI:
         """
         url = f"{self.base_url}/history/{prompt_id}"
         try:
-            response = requests.get(url)
+            response = self.session.get(url, timeout=self.timeout)
             if response.status_code == 200:
                 return response.json()
             else:
@@ -92,9 +136,63 @@ class ComfyAPI:
             logger.error(f"[ComfyAPI] History error: {e}")
             return None
 
+    def get_queue(self):
+        """
+        Retrieves the server queue.
+        Returns {"queue_running": [...], "queue_pending": [...]} or None.
+        Each item is [number, prompt_id, prompt, extra_data, outputs_to_execute].
+        """
+        url = f"{self.base_url}/queue"
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            if response.status_code == 200:
+                return response.json()
+            return None
+        except Exception as e:
+            logger.error(f"[ComfyAPI] Queue error: {e}")
+            return None
+
+    def get_system_stats(self):
+        """Retrieves /system_stats (devices, VRAM). Used as a health check; None if unreachable."""
+        url = f"{self.base_url}/system_stats"
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            if response.status_code == 200:
+                return response.json()
+            return None
+        except Exception as e:
+            logger.error(f"[ComfyAPI] System stats error: {e}")
+            return None
+
+    def delete_queued(self, prompt_ids: list) -> bool:
+        """Removes pending prompts from the server queue. Returns True on success."""
+        url = f"{self.base_url}/queue"
+        try:
+            response = self.session.post(url, json={"delete": list(prompt_ids)}, timeout=self.timeout)
+            return response.status_code == 200
+        except Exception as e:
+            logger.error(f"[ComfyAPI] Queue delete error: {e}")
+            return False
+
+    def interrupt(self, prompt_id: str = None) -> bool:
+        """
+        Interrupts execution. With prompt_id, servers that support it only
+        interrupt that prompt (older ones interrupt whatever is running).
+        """
+        url = f"{self.base_url}/interrupt"
+        payload = {"prompt_id": prompt_id} if prompt_id else {}
+        try:
+            response = self.session.post(url, json=payload, timeout=self.timeout)
+            return response.status_code == 200
+        except Exception as e:
+            logger.error(f"[ComfyAPI] Interrupt error: {e}")
+            return False
+
     def download_image(self, filename, subfolder, img_type, save_path):
         """
         Downloads a generated image.
+        Streams to a temp file in chunks and renames it into place, so large
+        outputs are never held in memory and a partial file is never left behind.
         Returns True on success, False on failure.
         """
         params = {
@@ -104,17 +202,24 @@ class ComfyAPI:
         }
         
         url = f"{self.base_url}/view"
+        tmp_path = save_path.with_name(save_path.name + ".part")
         
         try:
-            response = requests.get(url, params=params)
-            if response.status_code == 200:
+            with self.session.get(url, params=params, stream=True, timeout=self.timeout) as response:
+                if response.status_code != 200:
+                    logger.error(f"[ComfyAPI] Download failed: {response.status_code}")
+                    return False
+
                 save_path.parent.mkdir(parents=True, exist_ok=True)
-                with open(save_path, 'wb') as f:
-                    f.write(response.content)
-                return True
-            else:
-                logger.error(f"[ComfyAPI] Download failed: {response.status_code}")
-                return False
+                with open(tmp_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=self.DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+            os.replace(tmp_path, save_path)
+            return True
         except Exception as e:
             logger.error(f"[ComfyAPI] Download error: {e}")
+            try:
+                tmp_path.unlink(missing_ok=True)
+            except OSError:
+                pass
             return False
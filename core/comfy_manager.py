@@ -4,6 +4,7 @@ import os
 from pathlib import Path
 
 from core.comfy_api import ComfyAPI
+from core.comfy_ws import ComfyEventListener, wait_for_outputs
 from core.constants import DEFAULT_NODE_MAPPING
 from core.utils import prompt_parser, image_utils
 
@@ -20,6 +21,7 @@ class ComfyBatchManager:
         self.api = ComfyAPI(base_url=settings.get("comfy_url", "http://127.0.0.1:8188"))
         self.is_running = True
         self.PROMPT_FILENAME = "prompts.md"
+        self.listener = None  # WebSocket completion events (None = polling)
 
     def log(self, message):
         self.log_callback(message)
@@ -98,13 +100,22 @@ class ComfyBatchManager:
         self.log(f"Total tasks found: {total_tasks}")
 
         # 4. Execution Loop
-        for i, task in enumerate(task_list):
-            if not self.is_running: break
-            
-            try:
-                self._process_single_task(task, i, total_tasks, workflow_template, output_path, dry_run)
-            except Exception as e:
-                self.log(f"Critical Error processing task {i}: {e}")
+        if not dry_run:
+            self.listener = ComfyEventListener(self.api)
+            if not self.listener.start():
+                self.listener = None
+        try:
+            for i, task in enumerate(task_list):
+                if not self.is_running: break
+                
+                try:
+                    self._process_single_task(task, i, total_tasks, workflow_template, output_path, dry_run)
+                except Exception as e:
+                    self.log(f"Critical Error processing task {i}: {e}")
+        finally:
+            if self.listener:
+                self.listener.close()
+                self.listener = None
 
         self.log("Batch Cycle Completed.")
 
@@ -204,16 +215,14 @@ class ComfyBatchManager:
         self.progress_callback((index + 1) / total_tasks * 100)
 
     def _wait_for_completion_managed(self, prompt_id):
-        # Polling logic
-        while self.is_running:
-            hist = self.api.get_history(prompt_id)
-            if hist and prompt_id in hist:
-                outputs = hist[prompt_id].get("outputs", {})
-                if DEFAULT_NODE_MAPPING["SAVE_IMAGE"] in outputs:
-                    return outputs[DEFAULT_NODE_MAPPING["SAVE_IMAGE"]].get("images", [])
-                return []
-            time.sleep(1)
-        return None
+        save_node_id = DEFAULT_NODE_MAPPING["SAVE_IMAGE"]
+        outputs = wait_for_outputs(self.api, prompt_id, self.listener,
+                                   is_running=lambda: self.is_running, required_node=save_node_id)
+        if outputs is None:
+            return None
+        if save_node_id in outputs:
+            return outputs[save_node_id].get("images", [])
+        return []
 
     def _download_and_save(self, img_data_list, image_out_dir, clean_stem, raw_title):
         for img_data in img_data_list:
@@ -0,0 +1,168 @@
+import json
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+from websockets.sync.client import connect
+
+from core.logger import logger
+
+STATUS_SUCCESS = "success"
+STATUS_ERROR = "error"
+STATUS_INTERRUPTED = "interrupted"
+
+
+class ComfyEventListener:
+    """
+    Listens on the ComfyUI WebSocket (/ws?clientId=...) and resolves one
+    Future per prompt_id when the server reports it finished.
+
+    Future result: {"status": "success" | "error" | "interrupted",
+                    "outputs": {node_id: output}, "error": str}
+
+    Outputs are collected from 'executed' messages; nodes served from the
+    server cache don't send one, so callers may still need /history.
+    """
+    FINISHED_MEMORY = 256  # prompts that finished before anyone watched them
+
+    def __init__(self, api, open_timeout: float = 3.0):
+        self.api = api
+        self.open_timeout = open_timeout
+        self._ws = None
+        self._thread = None
+        self._connected = threading.Event()
+        self._lock = threading.Lock()
+        self._futures = {}   # prompt_id -> Future
+        self._outputs = {}   # prompt_id -> {node_id: output}
+        self._finished = {}  # prompt_id -> result (resolved before watch())
+
+    @property
+    def url(self) -> str:
+        base = self.api.base_url
+        scheme = "wss" if base.startswith("https") else "ws"
+        return f"{scheme}://{base.split('://', 1)[-1]}/ws?clientId={self.api.client_id}"
+
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    def start(self) -> bool:
+        """Connects and starts the reader thread. Returns False if the socket is unavailable."""
+        try:
+            self._ws = connect(self.url, open_timeout=self.open_timeout, max_size=None)
+        except Exception as e:
+            logger.warning(f"[ComfyWS] WebSocket unavailable ({e}), using history polling")
+            return False
+
+        self._connected.set()
+        self._thread = threading.Thread(target=self._run, name="ComfyWS", daemon=True)
+        self._thread.start()
+        return True
+
+    def close(self):
+        self._connected.clear()
+        if self._ws:
+            try:
+                self._ws.close()
+            except Exception:
+                pass
+        if self._thread:
+            self._thread.join(timeout=2)
+
+    def watch(self, prompt_id: str) -> Future:
+        """Returns the Future for prompt_id (already resolved if it finished first)."""
+        with self._lock:
+            future = self._futures.get(prompt_id)
+            if future is None:
+                future = Future()
+                self._futures[prompt_id] = future
+                if prompt_id in self._finished:
+                    future.set_result(self._finished.pop(prompt_id))
+                    del self._futures[prompt_id]
+            return future
+
+    # --- Internal ---
+
+    def _run(self):
+        try:
+            for message in self._ws:
+                if isinstance(message, bytes):
+                    continue  # binary preview frames
+                try:
+                    self._handle(json.loads(message))
+                except ValueError:
+                    continue
+        except Exception as e:
+            if self.connected:
+                logger.warning(f"[ComfyWS] Connection lost: {e}")
+        finally:
+            self._connected.clear()
+
+    def _handle(self, msg: dict):
+        msg_type = msg.get("type")
+        data = msg.get("data") or {}
+        prompt_id = data.get("prompt_id")
+        if not prompt_id:
+            return
+
+        if msg_type == "executed":
+            with self._lock:
+                self._outputs.setdefault(prompt_id, {})[str(data.get("node"))] = data.get("output") or {}
+        elif msg_type == "execution_success":
+            self._resolve(prompt_id, STATUS_SUCCESS)
+        elif msg_type == "executing" and data.get("node") is None:
+            # Older servers signal the end of a prompt this way
+            self._resolve(prompt_id, STATUS_SUCCESS)
+        elif msg_type == "execution_error":
+            self._resolve(prompt_id, STATUS_ERROR, data.get("exception_message", "Execution error"))
+        elif msg_type == "execution_interrupted":
+            self._resolve(prompt_id, STATUS_INTERRUPTED, "Interrupted")
+
+    def _resolve(self, prompt_id: str, status: str, error: str = ""):
+        with self._lock:
+            result = {"status": status, "outputs": self._outputs.pop(prompt_id, {}), "error": error}
+            future = self._futures.pop(prompt_id, None)
+            if future is None:
+                self._finished[prompt_id] = result
+                while len(self._finished) > self.FINISHED_MEMORY:
+                    self._finished.pop(next(iter(self._finished)))
+        if future and not future.done():
+            future.set_result(result)
+
+
+def wait_for_outputs(api, prompt_id: str, listener=None, is_running=lambda: True,
+                     required_node: str = None, poll_min: float = 0.5, poll_max: float = 8.0):
+    """
+    Waits until prompt_id finishes and returns its outputs ({node_id: output}).
+    Returns {} if the prompt failed and None if is_running() turned False.
+
+    Uses the WebSocket listener when connected; otherwise (or if the socket
+    drops mid-wait) polls /history with exponential backoff.
+    """
+    if listener and listener.connected:
+        future = listener.watch(prompt_id)
+        while is_running() and listener.connected:
+            try:
+                result = future.result(timeout=0.5)
+            except FutureTimeout:
+                continue
+            if result["status"] != STATUS_SUCCESS:
+                logger.error(f"[ComfyWS] Prompt {prompt_id} {result['status']}: {result['error']}")
+                return {}
+            outputs = result["outputs"]
+            if required_node is None or required_node in outputs:
+                return outputs
+            break  # cached node: fall through to a /history lookup
+        if not is_running():
+            return None
+
+    delay = poll_min
+    while is_running():
+        hist = api.get_history(prompt_id)
+        if hist and prompt_id in hist:
+            return hist[prompt_id].get("outputs", {})
+        deadline = time.monotonic() + delay
+        while is_running() and time.monotonic() < deadline:
+            time.sleep(min(0.25, delay))
+        delay = min(poll_max, delay * 2)
+    return None
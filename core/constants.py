@@ -28,6 +28,11 @@ ASSETS_DIR_NAME = "assets"
 ICON_FILENAME = "icon.png"
 GENERATED_IMAGES_DIR_NAME = "Generated_Images"
 THUMBNAILS_DIR_NAME = ".cache/thumbnails"
+TASK_JOURNAL_FILE_NAME = ".nanopapl_journal.jsonl"
+RESULT_CACHE_DIR_NAME = ".cache/results"
+COMFY_UPLOAD_CACHE_FILE_NAME = ".cache/comfy_uploads.json"
+GEMINI_FILE_CACHE_FILE_NAME = ".cache/gemini_files.json"
+HISTORY_INDEX_FILE_NAME = ".history_index.db"
 IMAGE_FORMATS = ["PNG", "JPG"]
 
 # Default Values
@@ -1,47 +1,93 @@
+import re
 from abc import ABC, abstractmethod
 from pathlib import Path
 from PIL import Image
-import google.genai as genai
 from google.genai import types
+from core.services.client_registry import get_genai_client
+from core.services.gemini_files import get_file_cache
+from core.services.context_cache import get_context_cache
+from core.logger import logger
 from core.utils import image_utils
 
+# A referenced upload or cache that is gone comes back as "404 NOT_FOUND" or "400 INVALID_ARGUMENT" naming it
+STALE_REFERENCE_STATUS_CODES = {400, 404}
+STALE_REFERENCE_STATUSES = {"INVALID_ARGUMENT", "NOT_FOUND"}
+_LEADING_STATUS_CODE = re.compile(r"^\s*(\d{3})\b")
+
+
+def _is_stale_reference_error(error: Exception, references) -> bool:
+    """
+    True when the request was rejected because one of the referenced
+    resource names ("files/abc", "caches/xyz") was not found or has expired.
+    Anything else (network, quota, safety...) is not worth a resend.
+    """
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        stale = code in STALE_REFERENCE_STATUS_CODES
+    elif getattr(error, "status", None) in STALE_REFERENCE_STATUSES:
+        stale = True
+    else:
+        match = _LEADING_STATUS_CODE.match(str(error))
+        stale = bool(match) and int(match.group(1)) in STALE_REFERENCE_STATUS_CODES
+    message = str(error)
+    return stale and any(ref and ref in message for ref in references)
+
+class _ReplyCollector:
+    """
+    Joins a reply's parts into (text, image) the same way for streamed and
+    blocking responses. Text parts are concatenated as they come (a stream
+    splits one part across chunks); text that follows an image starts on a
+    new line.
+    """
+    def __init__(self):
+        self.text = ""
+        self.image = None
+        self._after_image = False
+
+    def add(self, part) -> str:
+        """Takes one part; returns the text it added to the reply ("" if none)."""
+        delta = ""
+        if part.text:
+            delta = ("\n" if self._after_image and self.text else "") + part.text
+            self.text += delta
+            self._after_image = False
+        if part.inline_data and part.inline_data.data:
+            self.image = part.inline_data.data
+            self._after_image = True
+        return delta
+
+    def result(self):
+        return self.text.strip(), self.image
+
 class LLMProvider(ABC):
     """Abstract base class for LLM providers."""
     @abstractmethod
-    def generate_chat(self, history: list, message: str, image_paths: list, system_instruction: str, config: dict):
+    def generate_chat(self, history: list, message: str, image_paths: list, system_instruction: str, config: dict, on_chunk=None):
+        """Returns (text, image_bytes). With on_chunk, streams and calls it with each text delta."""
         pass
 
 class GeminiProvider(LLMProvider):
     """Gemini implementation of LLMProvider."""
-    def __init__(self, api_key, model_id):
+    def __init__(self, api_key, model_id, file_cache=None, context_cache=None):
         self.api_key = api_key
         self.model_id = model_id
-        if self.api_key:
-            self.client = genai.Client(api_key=self.api_key)
-        else:
-            self.client = None
+        self.last_usage = {}  # Token counts reported for the last request
+        # Shared client (and connection pool) from the process-wide registry
+        self.client = get_genai_client(self.api_key)
+        # Attachments are uploaded once and referenced by URI (None = always inline)
+        self.file_cache = file_cache if file_cache is not None else get_file_cache()
+        # Explicit context caches for system instruction + pinned images (used when config asks)
+        self.context_cache = context_cache if context_cache is not None else get_context_cache()
 
-    def generate_chat(self, history, message, image_paths, system_instruction, config):
+    def generate_chat(self, history, message, image_paths, system_instruction, config, on_chunk=None):
+        self.last_usage = {}
         if not self.client:
             return "Error: Gemini API Key missing.", None
 
-        # 1. Prepare User Content
-        current_parts = [types.Part.from_text(text=message)]
-        for path in image_paths:
-            p = Path(path)
-            if p.exists():
-                img_data = p.read_bytes()
-                mime = image_utils.get_mime_type(p)
-                current_parts.append(types.Part.from_bytes(data=img_data, mime_type=mime))
-
-        # 2. History Conversion
-        google_history = []
-        for msg in history:
-            role = "model" if msg["role"] == "model" else "user"
-            parts = [types.Part.from_text(text=msg.get("text", ""))]
-            google_history.append(types.Content(role=role, parts=parts))
+        # 1. Pinned reference images (kept in the context cache, or sent with every message)
+        pinned_images = [p for p in config.get("pinned_images", []) if Path(p).exists()]
 
-        # 3. Config (Ratio Logic)
+        # 2. Config (Ratio Logic)
         resolution = config.get("resolution", "1K")
         aspect_ratio = config.get("ratio", "1:1")
         
@@ -59,8 +105,7 @@ class GeminiProvider(LLMProvider):
         # gemini-3-flash-preview is text/multimodal-input but NOT image-output
         
         gen_config_args = {
-            "temperature": 0.7,
-            "system_instruction": system_instruction
+            "temperature": 0.7
         }
 
         if is_flash_model:
@@ -76,31 +121,147 @@ class GeminiProvider(LLMProvider):
             gen_config_args["response_modalities"] = ["TEXT", "IMAGE"]
             gen_config_args["image_config"] = types.ImageConfig(**image_config_params)
 
-        gen_config = types.GenerateContentConfig(**gen_config_args)
+        # Images go to the Files API only when the user opted in; otherwise they are inlined
+        file_cache = self.file_cache if config.get("file_uploads") else None
+
+        # 3. Context Cache: system instruction + pinned images referenced by handle
+        cache_name = None
+        if config.get("context_cache") and self.context_cache:
+            cache_name = self.context_cache.get(
+                self.client, self.api_key, self.model_id, system_instruction, pinned_images, file_cache
+            )
 
         # 4. Chat Creation & Sending
-        chat = self.client.chats.create(
-            model=self.model_id,
-            config=gen_config,
-            history=google_history
-        )
+        streamed = False
+        if on_chunk:
+            user_on_chunk = on_chunk
+
+            def on_chunk(text):
+                nonlocal streamed
+                streamed = True
+                user_on_chunk(text)
 
         try:
-            response = chat.send_message(current_parts)
-            
-            text_out = ""
-            img_bytes = None
+            used_files = {} if file_cache else None  # content hash -> file name
+            chat, current_parts = self._prepare_chat(
+                history, message, image_paths, pinned_images, system_instruction, gen_config_args, cache_name, used_files
+            )
+            try:
+                response = self._send(chat, current_parts, on_chunk)
+            except Exception as e:
+                # Resend only when the cache or a referenced file is gone, and never after output was shown
+                if streamed or not _is_stale_reference_error(e, [cache_name, *(used_files or {}).values()]):
+                    raise
+                # Expired or deleted server-side: forget them, resend plainly
+                logger.warning(f"[Gemini] Request with cached content / uploaded files failed ({e}); retrying without")
+                if cache_name and cache_name in str(e):
+                    self.context_cache.invalidate(cache_name)
+                for digest in used_files or ():
+                    self.file_cache.forget(self.api_key, digest)
+                # History images that went by reference are inlined, so the resend keeps them
+                chat, current_parts = self._prepare_chat(
+                    history, message, image_paths, pinned_images, system_instruction, gen_config_args, None, None,
+                    inline_history=used_files is not None
+                )
+                response = self._send(chat, current_parts, on_chunk)
+
+            if on_chunk:
+                return response
             
-            if response.parts:
-                for part in response.parts:
-                    if part.text: text_out += part.text + "\n"
-                    if part.inline_data: img_bytes = part.inline_data.data
+            reply = _ReplyCollector()
+            for part in response.parts or []:
+                reply.add(part)
+
+            self._record_usage(response)
             
-            return text_out.strip(), img_bytes
+            return reply.result()
 
         except Exception as e:
             return f"Gemini Error: {e}", None
 
+    def _prepare_chat(self, history, message, image_paths, pinned_images, system_instruction, gen_config_args, cache_name, used_files,
+                      inline_history=False):
+        """
+        Creates the chat and the parts of the new message. With cache_name the
+        system instruction and pinned images live in the cache; without it they
+        go in the config and with the message (pinned images by reference).
+        """
+        current_parts, google_history = self._build_contents(history, message, image_paths, used_files, inline_history)
+        if cache_name:
+            gen_config = types.GenerateContentConfig(cached_content=cache_name, **gen_config_args)
+        else:
+            gen_config = types.GenerateContentConfig(system_instruction=system_instruction, **gen_config_args)
+            for path in pinned_images:
+                part = self._image_part(path, used_files)
+                if part:
+                    current_parts.append(part)
+        chat = self.client.chats.create(model=self.model_id, config=gen_config, history=google_history)
+        return chat, current_parts
+
+    def _build_contents(self, history, message, image_paths, used_files, inline_history=False):
+        """
+        Returns (current_parts, history_contents). used_files collects the
+        content hashes referenced by URI (with their file names); pass None
+        to inline the current images. Earlier user images are sent only by
+        reference unless inline_history is set.
+        """
+        current_parts = [types.Part.from_text(text=message)]
+        for path in image_paths:
+            part = self._image_part(path, used_files)
+            if part:
+                current_parts.append(part)
+
+        google_history = []
+        for msg in history:
+            role = "model" if msg["role"] == "model" else "user"
+            parts = [types.Part.from_text(text=msg.get("text", ""))]
+            if role == "user":
+                # Attachments of earlier turns stay in context by reference, re-inlined only on request
+                parts += [p for p in (self._image_part(path, used_files, inline=inline_history) for path in msg.get("images") or []) if p]
+            google_history.append(types.Content(role=role, parts=parts))
+        return current_parts, google_history
+
+    def _image_part(self, path, used_files, inline=True):
+        p = Path(path)
+        if not p.exists():
+            return None
+        if used_files is not None and self.file_cache:
+            handle = self.file_cache.upload(self.client, self.api_key, p)
+            if handle:
+                used_files[self.file_cache.content_hash(p)] = handle["name"]
+                return types.Part.from_uri(file_uri=handle["uri"], mime_type=handle["mime_type"])
+        if not inline:
+            return None
+        return types.Part.from_bytes(data=p.read_bytes(), mime_type=image_utils.get_mime_type(p))
+
+    def _send(self, chat, parts, on_chunk):
+        """Streamed: (text, image_bytes). Blocking: the raw response."""
+        if on_chunk:
+            return self._send_streaming(chat, parts, on_chunk)
+        return chat.send_message(parts)
+
+    def _send_streaming(self, chat, parts, on_chunk):
+        """Text deltas go to on_chunk as they arrive; the image part is kept once complete."""
+        reply = _ReplyCollector()
+        for chunk in chat.send_message_stream(parts):
+            for part in chunk.parts or []:
+                delta = reply.add(part)
+                if delta:
+                    on_chunk(delta)
+            # Usage is reported on the final chunk
+            self._record_usage(chunk)
+        return reply.result()
+
+    def _record_usage(self, response):
+        usage = getattr(response, "usage_metadata", None)
+        if usage:
+            self.last_usage = {
+                "prompt_tokens": usage.prompt_token_count or 0,
+                "output_tokens": usage.candidates_token_count or 0,
+                "total_tokens": usage.total_token_count or 0,
+                "cached_tokens": getattr(usage, "cached_content_token_count", None) or 0,
+            }
+
 class LLMProviderFactory:
     """Factory to create LLM Providers."""
     @staticmethod
@@ -3,10 +3,38 @@ import os
 import uuid
 import datetime
 import shutil
+import threading
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from core.constants import HISTORY_INDEX_FILE_NAME
+from core.logger import logger
+from core.services.history_index import HistoryIndex
+
+# Change event kinds (see HistoryManager.subscribe)
+SESSION_CREATED = "session_created"
+SESSION_UPDATED = "session_updated"  # renamed, new message, settings...
+SESSION_MOVED = "session_moved"
+SESSION_DELETED = "session_deleted"
+FOLDER_CREATED = "folder_created"
+FOLDER_DELETED = "folder_deleted"
+RESET = "reset"  # index rebuilt: listeners should re-read list_sessions()
+
+
+@dataclass(frozen=True)
+class HistoryEvent:
+    kind: str
+    session_id: str = ""
+    info: Optional[Dict] = None  # Index row (id, title, folder, created_at, updated_at) for created/updated/moved
+    folder: str = ""
+
 
 class HistoryManager:
-    def __init__(self, base_dir=None):
+    # Log records after which a session's log is folded into its snapshot
+    COMPACT_AFTER = 50
+
+    def __init__(self, base_dir=None, watch_interval=0.0):
         if base_dir is None:
             # Default to User Documents/NanoPapl/History
             docs = Path(os.path.expanduser("~")) / "Documents" / "NanoPapl" / "History"
@@ -15,6 +43,28 @@ class HistoryManager:
             self.base_dir = Path(base_dir)
             
         self.base_dir.mkdir(parents=True, exist_ok=True)
+        self._log_counts = {}  # session_id -> records in its current log
+        self._lock = threading.RLock()
+        self._subscribers = []
+
+        # Session metadata for listing lives in SQLite; messages stay in the JSON files.
+        # Existing history folders are imported in full on first launch.
+        self.index = HistoryIndex(self.base_dir / HISTORY_INDEX_FILE_NAME)
+        if not self.index.populated:
+            self.rebuild_index()
+
+        # session_id -> snapshot path, built with one walk and kept up to date by every write.
+        # The first sync compares that walk with the index, which picks up files
+        # added or deleted while the app was closed.
+        self._paths = {}
+        self._dir_mtimes = {}  # directory -> mtime_ns seen by the last scan
+        self.sync_with_disk()
+
+        # Optional polling watcher for changes made outside the app (0 = off)
+        self._watch_stop = threading.Event()
+        self._watch_thread = None
+        if watch_interval:
+            self.start_watching(watch_interval)
 
     def _get_path(self, session_id, folder_name=None):
         """Returns the file path for a session. 
@@ -29,10 +79,18 @@ class HistoryManager:
             else:
                 return self.base_dir / f"{session_id}.json"
         
-        # Search for existing file if folder is unknown (loading case)
+        # Folder unknown (loading case): O(1) via the path index
+        with self._lock:
+            path = self._paths.get(session_id)
+        if path is not None and path.exists():
+            return path
+
+        # Unknown or stale entry: search once and remember the answer
         for p in self.base_dir.rglob(f"{session_id}.json"):
+            self._remember_path(session_id, p)
             return p
-            
+
+        self._forget_path(session_id)
         return self.base_dir / f"{session_id}.json"
 
     def create_session(self, folder_name=""):
@@ -47,11 +105,20 @@ class HistoryManager:
             "updated_at": timestamp,
             "messages": []
         }
-        self.save_session(session_id, data, folder_name)
+        info = self._save(session_id, data, folder_name)
+        self._notify(SESSION_CREATED, session_id, info)
         return session_id, data
 
     def save_session(self, session_id, data, folder_name=None):
-        """Saves session data to JSON."""
+        """
+        Writes a full snapshot of the session (atomically) and drops its message log.
+        Use append_message / update_session for incremental changes.
+        """
+        info = self._save(session_id, data, folder_name)
+        self._notify(SESSION_UPDATED, session_id, info)
+
+    def _save(self, session_id, data, folder_name=None):
+        """Snapshot write shared by create_session / save_session; returns the index row."""
         # Update timestamp
         data["updated_at"] = datetime.datetime.now().isoformat()
         
@@ -61,76 +128,139 @@ class HistoryManager:
             
         # Auto-title if "New Chat" and messages exist
         if data["title"] == "New Chat" and data["messages"]:
-            first_msg = data["messages"][0]["text"]
-            # Take first 30 chars or first line
-            title = first_msg.split('\n')[0][:30]
-            if len(first_msg) > 30: title += "..."
-            data["title"] = title
+            data["title"] = self._auto_title(data["messages"][0].get("text", ""))
             
         path = self._get_path(session_id, folder_name)
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        with self._lock:
+            self._write_snapshot(path, data)
+            self._remove_logs(session_id, path)
+            self._remember_path(session_id, path)
+        info = self._index_row(session_id, data, folder_name)
+        self.index.upsert(info)
+        if folder_name:
+            self.index.add_folder(folder_name)
+        return info
+
+    def append_message(self, session_id, message, session=None):
+        """
+        Appends one message to the session's log: O(message), the snapshot is not rewritten.
+        `session` (the caller's in-memory copy, if any) receives the same update.
+        """
+        info = self.index.get(session_id)
+        if info is None:
+            # Not indexed (e.g. files copied in by hand): fall back to a full save
+            data = session if session is not None else self.load_session(session_id)
+            if data is None:
+                return
+            data["messages"].append(message)
+            self.save_session(session_id, data)
+            return
+
+        fields = {}
+        if info["title"] == "New Chat":
+            fields["title"] = self._auto_title(message.get("text", ""))
+        self._append_record(session_id, info, {"op": "append", "message": message, "fields": fields}, session)
+        if session is not None:
+            session["messages"].append(message)
+
+    def update_session(self, session_id, session=None, **fields):
+        """Records changed top-level fields (title, settings...) in the session's log."""
+        info = self.index.get(session_id)
+        if info is None:
+            data = session if session is not None else self.load_session(session_id)
+            if data is None:
+                return
+            data.update(fields)
+            self.save_session(session_id, data)
+            return
+        self._append_record(session_id, info, {"op": "set", "fields": fields}, session)
+
+    def compact_session(self, session_id):
+        """Folds the session's message log into its snapshot."""
+        info = self.index.get(session_id)
+        path = self._get_path(session_id, info["folder"] if info else None)
+        log_path, compacting_path = self._log_paths(session_id, path)
+        self._log_counts.pop(session_id, None)
+
+        # Move the live log aside first, so appends during/after this go to a fresh log
+        if log_path.exists() and not compacting_path.exists():
+            os.replace(log_path, compacting_path)
+        if not compacting_path.exists():
+            return
+
+        data = self._read_snapshot(path)
+        if data is None:
+            return
+        absorbed = data.pop("compacted_log", None)
+        log_id = self._replay(data, compacting_path, absorbed)
+        # The snapshot names the log it absorbed, so a crash before the unlink can't replay it twice
+        data["compacted_log"] = log_id
+        self._write_snapshot(path, data)
+        compacting_path.unlink(missing_ok=True)
 
     def load_session(self, session_id):
-        """Loads a session by ID searching recursively."""
+        """Loads a session by ID (snapshot plus its message log)."""
         path = self._get_path(session_id)
         if not path or not path.exists():
             return None
-        try:
-            with open(path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception:
+        data = self._read_snapshot(path)
+        if data is None:
             return None
+        absorbed = data.pop("compacted_log", None)
+        log_path, compacting_path = self._log_paths(session_id, path)
+        for log in (compacting_path, log_path):
+            self._replay(data, log, absorbed)
+        return data
 
     def list_sessions(self):
-        """Returns a nested structure of folders and sessions."""
-        structure = {"folders": {}, "sessions": []}
-        
-        # 1. Initialize folders from physical directories (to show empty folders)
-        for d in self.base_dir.iterdir():
-            if d.is_dir():
-                structure["folders"][d.name] = []
+        """Returns a nested structure of folders and sessions (from the index, newest first)."""
+        structure = {"folders": {name: [] for name in self.index.folders()}, "sessions": []}
 
-        # 2. Fill with sessions
-        # Use rglob to find all sessions including those in folders
+        for session_info in self.index.sessions():
+            folder_name = session_info["folder"]
+            if folder_name:
+                structure["folders"].setdefault(folder_name, []).append(session_info)
+            else:
+                structure["sessions"].append(session_info)
+
+        return structure
+
+    def rebuild_index(self):
+        """Re-imports all session files and folders into the index (one full scan)."""
+        sessions = []
         for f in self.base_dir.rglob("*.json"):
             try:
                 # Determine folder relative to base_dir
                 rel_path = f.parent.relative_to(self.base_dir)
                 folder_name = str(rel_path) if str(rel_path) != "." else ""
-                
-                with open(f, 'r', encoding='utf-8') as file:
-                    data = json.load(file)
-                    session_info = {
-                        "id": data.get("id", f.stem),
-                        "title": data.get("title", "Untitled"),
-                        "updated_at": data.get("updated_at", ""),
-                        "folder": folder_name
-                    }
-                    
-                    if folder_name:
-                        if folder_name not in structure["folders"]:
-                            structure["folders"][folder_name] = []
-                        structure["folders"][folder_name].append(session_info)
-                    else:
-                        structure["sessions"].append(session_info)
-            except:
+
+                data = self._read_snapshot(f)
+                absorbed = data.pop("compacted_log", None)
+                for log in self._log_paths(data.get("id", f.stem), f):
+                    self._replay(data, log, absorbed)
+                sessions.append({
+                    "id": data.get("id", f.stem),
+                    "title": data.get("title", "Untitled"),
+                    "created_at": data.get("created_at", ""),
+                    "updated_at": data.get("updated_at", ""),
+                    "folder": folder_name
+                })
+            except Exception:
                 continue
-        
-        # Sort internal lists by updated_at desc
-        structure["sessions"].sort(key=lambda x: x["updated_at"], reverse=True)
-        for folder in structure["folders"]:
-            structure["folders"][folder].sort(key=lambda x: x["updated_at"], reverse=True)
-            
-        return structure
+
+        folders = [d.name for d in self.base_dir.iterdir() if d.is_dir()]
+        self.index.replace_all(sessions, folders)
+        self._notify(RESET)
 
     def create_folder(self, folder_name):
         """Create a physical folder in history directory."""
         if not folder_name: return
         (self.base_dir / folder_name).mkdir(parents=True, exist_ok=True)
+        self.index.add_folder(folder_name)
+        self._notify(FOLDER_CREATED, folder=folder_name)
 
     def move_session(self, session_id, target_folder):
-        """Move session file to another folder."""
+        """Move session (snapshot and log, written out as one snapshot) to another folder."""
         old_path = self._get_path(session_id)
         if not old_path or not old_path.exists():
             return False
@@ -140,30 +270,306 @@ class HistoryManager:
         # If folder changed, move file
         if old_path != new_path:
             try:
-                with open(old_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
+                data = self.load_session(session_id)
                 data["folder"] = target_folder
-                with open(new_path, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
-                old_path.unlink()
+                with self._lock:
+                    self._write_snapshot(new_path, data)
+                    old_path.unlink()
+                    self._remove_logs(session_id, old_path)
+                    self._remember_path(session_id, new_path)
+                info = self._index_row(session_id, data, target_folder)
+                self.index.upsert(info)
+                if target_folder:
+                    self.index.add_folder(target_folder)
+                self._notify(SESSION_MOVED, session_id, info)
                 return True
-            except:
+            except Exception:
                 return False
         return True
 
     def get_folders(self):
         """Returns list of folder names."""
-        return [str(d.relative_to(self.base_dir)) for d in self.base_dir.iterdir() if d.is_dir()]
+        return self.index.folders()
 
     def delete_session(self, session_id: str) -> None:
         """Permanently delete a session file."""
         path = self._get_path(session_id)
-        if path and path.exists():
-            path.unlink()
+        with self._lock:
+            if path and path.exists():
+                path.unlink()
+                self._remove_logs(session_id, path)
+            self._forget_path(session_id)
+        self.index.remove(session_id)
+        self._notify(SESSION_DELETED, session_id)
 
     def delete_folder(self, folder_name: str) -> None:
         """Recursively delete folder and all contents."""
         if not folder_name: return
         folder_path = self.base_dir / folder_name
-        if folder_path.exists() and folder_path.is_dir():
-            shutil.rmtree(folder_path)
+        with self._lock:
+            if folder_path.exists() and folder_path.is_dir():
+                shutil.rmtree(folder_path)
+            for sid, path in list(self._paths.items()):
+                if path.parent == folder_path or folder_path in path.parents:
+                    self._forget_path(sid)
+        self.index.remove_folder(folder_name)
+        self._notify(FOLDER_DELETED, folder=folder_name)
+
+    # --- Change events ---
+
+    def subscribe(self, callback: Callable[[HistoryEvent], None]) -> Callable[[], None]:
+        """
+        Adds a change listener; returns a function that removes it.
+        Callbacks run on the thread that made the change (the watcher thread
+        for sync_with_disk), so UI listeners must hop to their own thread.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def _notify(self, kind, session_id="", info=None, folder=""):
+        event = HistoryEvent(kind, session_id, info, folder)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"[HistoryManager] '{kind}' listener failed: {e}")
+
+    # --- Path index & watcher ---
+
+    def _remember_path(self, session_id, path):
+        with self._lock:
+            self._paths[session_id] = path
+
+    def _forget_path(self, session_id):
+        with self._lock:
+            self._paths.pop(session_id, None)
+
+    def _index_file(self, session_id, path):
+        """Reads a session file written outside the app into the index. Returns its row, or None if unreadable."""
+        data = self._read_snapshot(path)
+        if data is None:
+            return None
+        absorbed = data.pop("compacted_log", None)
+        for log in self._log_paths(session_id, path):
+            self._replay(data, log, absorbed)
+        folder = self._folder_of(path)
+        info = self._index_row(session_id, data, folder)
+        self.index.upsert(info)
+        if folder:
+            self.index.add_folder(folder)
+        return info
+
+    def _folder_of(self, path):
+        rel = path.parent.relative_to(self.base_dir)
+        return "" if str(rel) == "." else str(rel)
+
+    def sync_with_disk(self) -> bool:
+        """
+        Picks up session files added, moved or deleted outside the app.
+        The first call walks the whole tree and compares it with the index;
+        after that only directories whose mtime changed are re-listed.
+        Returns True if anything changed.
+        """
+        with self._lock:
+            if not self._dir_mtimes:
+                # No scan yet: everything is new, measured against what the index holds
+                self._dir_mtimes[self.base_dir] = None
+                before = {s["id"]: self.base_dir / s["folder"] / f"{s['id']}.json" for s in self.index.sessions()}
+                changed_dirs = [self.base_dir]
+            else:
+                changed_dirs = [d for d, mtime in self._dir_mtimes.items() if self._mtime(d) != mtime]
+                if not changed_dirs:
+                    return False
+                before = dict(self._paths)
+            pending = list(changed_dirs)
+            while pending:
+                d = pending.pop()
+                if not d.is_dir():
+                    # Directory removed: drop it and everything below it
+                    for known in [k for k in self._dir_mtimes if k == d or d in k.parents]:
+                        del self._dir_mtimes[known]
+                    for sid, path in list(self._paths.items()):
+                        if path.parent == d or d in path.parents:
+                            del self._paths[sid]
+                    continue
+
+                self._dir_mtimes[d] = self._mtime(d)
+                present = {}
+                for entry in os.scandir(d):
+                    if entry.is_dir():
+                        sub = Path(entry.path)
+                        if sub not in self._dir_mtimes:
+                            self._dir_mtimes[sub] = None  # new: list it in this pass
+                            pending.append(sub)
+                    elif entry.name.endswith(".json"):
+                        present[entry.name[:-5]] = Path(entry.path)
+                for sid, path in list(self._paths.items()):
+                    if path.parent == d and sid not in present:
+                        del self._paths[sid]
+                self._paths.update(present)
+
+            added = {sid: p for sid, p in self._paths.items() if before.get(sid) != p}
+            removed = [sid for sid in before if sid not in self._paths]
+
+        # Mirror external changes into the listing index
+        for sid in removed:
+            self.index.remove(sid)
+            self._notify(SESSION_DELETED, sid)
+        for sid, path in added.items():
+            info = self._index_file(sid, path)
+            if info is None:
+                continue
+            self._notify(SESSION_MOVED if sid in before else SESSION_CREATED, sid, info)
+        return bool(added or removed)
+
+    def start_watching(self, interval=5.0):
+        """Polls the history tree every `interval` seconds on a daemon thread."""
+        if self._watch_thread:
+            return
+        self._watch_stop.clear()
+
+        def loop():
+            while not self._watch_stop.wait(interval):
+                try:
+                    self.sync_with_disk()
+                except Exception:
+                    continue
+
+        self._watch_thread = threading.Thread(target=loop, name="HistoryWatcher", daemon=True)
+        self._watch_thread.start()
+
+    def stop_watching(self):
+        self._watch_stop.set()
+        if self._watch_thread:
+            self._watch_thread.join(timeout=2)
+            self._watch_thread = None
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    # --- Storage internals ---
+    # <id>.json is a snapshot; <id>.jsonl is the append-only log of changes since then.
+    # The log's first line is a header with a random log_id; compaction renames the
+    # log to <id>.compacting.jsonl, writes a snapshot recording that log_id and then
+    # deletes it. A torn last line (crash mid-append) is skipped when replaying.
+
+    def _log_paths(self, session_id, snapshot_path):
+        return (snapshot_path.parent / f"{session_id}.jsonl",
+                snapshot_path.parent / f"{session_id}.compacting.jsonl")
+
+    def _remove_logs(self, session_id, snapshot_path):
+        self._log_counts.pop(session_id, None)
+        for log in self._log_paths(session_id, snapshot_path):
+            log.unlink(missing_ok=True)
+
+    def _append_record(self, session_id, info, record, session=None):
+        record["at"] = datetime.datetime.now().isoformat()
+        path = self._get_path(session_id, info["folder"])
+        log_path, _ = self._log_paths(session_id, path)
+
+        with open(log_path, "ab+") as f:
+            if f.tell() == 0:
+                f.write(self._encode({"op": "header", "log_id": uuid.uuid4().hex}))
+            else:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")  # terminate a torn line so this record stays readable
+            f.write(self._encode(record))
+
+        fields = record.get("fields", {})
+        if session is not None:
+            session.update(fields)
+            session["updated_at"] = record["at"]
+        row = {**info, **{k: v for k, v in fields.items() if k == "title"}, "updated_at": record["at"]}
+        self.index.upsert(row)
+        self._notify(SESSION_UPDATED, session_id, row)
+
+        count = self._log_counts.get(session_id)
+        if count is None:
+            count = self._count_records(log_path)
+        else:
+            count += 1
+        self._log_counts[session_id] = count
+        if count >= self.COMPACT_AFTER:
+            self.compact_session(session_id)
+
+    @staticmethod
+    def _index_row(session_id, data, folder):
+        return {
+            "id": session_id,
+            "title": data.get("title", "Untitled"),
+            "folder": folder or "",
+            "created_at": data.get("created_at", ""),
+            "updated_at": data.get("updated_at", ""),
+        }
+
+    @staticmethod
+    def _encode(record):
+        return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+    @staticmethod
+    def _count_records(log_path):
+        with open(log_path, "rb") as f:
+            return max(0, sum(1 for _ in f) - 1)  # minus the header
+
+    @staticmethod
+    def _auto_title(text):
+        # Take first 30 chars or first line
+        title = text.split('\n')[0][:30]
+        if len(text) > 30: title += "..."
+        return title
+
+    @staticmethod
+    def _read_snapshot(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    @staticmethod
+    def _write_snapshot(path, data):
+        """Temp file + rename: a crash leaves either the old or the new snapshot, never half of one."""
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    @staticmethod
+    def _replay(data, log_path, absorbed=None):
+        """Applies a log's records to data. Returns the log's id (None if missing)."""
+        if not log_path.exists():
+            return None
+        log_id = None
+        with open(log_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn line
+                op = record.get("op")
+                if op == "header":
+                    log_id = record.get("log_id")
+                    if log_id and log_id == absorbed:
+                        return log_id  # already folded into the snapshot
+                    continue
+                if op == "append":
+                    data.setdefault("messages", []).append(record["message"])
+                data.update(record.get("fields", {}))
+                if record.get("at"):
+                    data["updated_at"] = record["at"]
+        return log_id
@@ -0,0 +1,276 @@
+"""
+Qt-free job engine: cancellation tokens, jobs with an event stream, and a
+bounded executor shared by all background work (chat, batch, resize...).
+
+A job is a callable taking the Job itself, so it can report through
+job.emit(kind, *args) and poll job.token for cancellation:
+
+    def work(job):
+        for i, item in enumerate(items):
+            if job.cancelled: return
+            ...
+            job.progress((i + 1) / len(items) * 100)
+
+    job = get_executor().submit(Job(work, name="resize"))
+    job.subscribe(lambda event: print(event.kind, event.args))
+
+Subscribers are called on the job's thread; UI code goes through the Qt
+adapter in core.workers.base_worker instead of subscribing directly.
+"""
+import itertools
+import queue
+import threading
+import traceback
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Tuple
+
+from core.logger import logger
+
+# Standard event kinds; jobs may emit any other kind too (e.g. "preview")
+STARTED = "started"
+PROGRESS = "progress"
+LOG = "log"
+RESULT = "result"
+ERROR = "error"
+FINISHED = "finished"
+
+DEFAULT_MAX_JOBS = 4
+
+
+class CancellationToken:
+    """Thread-safe cancel flag; callbacks registered with on_cancel() run once on cancel()."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                logger.error(f"[Jobs] Cancel callback failed: {e}")
+
+    def on_cancel(self, callback: Callable[[], None]):
+        """Registers callback; runs it right away if already cancelled."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Sleeps up to timeout; returns True as soon as the token is cancelled."""
+        return self._event.wait(timeout)
+
+
+@dataclass(frozen=True)
+class JobEvent:
+    job_id: int
+    kind: str
+    args: Tuple = ()
+
+
+class Job:
+    """
+    One unit of background work and its event stream.
+
+    Lifecycle events: STARTED, then RESULT (only if fn returned something
+    other than None) or ERROR (with the exception), then always FINISHED.
+    """
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    _ids = itertools.count(1)
+
+    def __init__(self, fn: Callable[["Job"], Any], name: str = "", token: Optional[CancellationToken] = None):
+        self.id = next(Job._ids)
+        self.fn = fn
+        self.name = name or getattr(fn, "__name__", "job")
+        self.token = token or CancellationToken()
+        self.state = Job.PENDING
+        self.result = None
+        self.error = None
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.token.cancelled
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def cancel(self):
+        self.token.cancel()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until the job finished (all FINISHED subscribers ran). False on timeout."""
+        return self._done.wait(timeout)
+
+    # --- Event stream ---
+
+    def subscribe(self, callback: Callable[[JobEvent], None]) -> Callable[[], None]:
+        """Adds an event callback; returns a function that removes it."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def emit(self, kind: str, *args):
+        event = JobEvent(self.id, kind, args)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"[Jobs] {self.name}: '{kind}' subscriber failed: {e}")
+
+    def progress(self, value: float):
+        self.emit(PROGRESS, value)
+
+    def log(self, message: str):
+        self.emit(LOG, message)
+
+    # --- Execution ---
+
+    def run(self):
+        """Runs the job on the calling thread (the executor's, or the caller's for inline use)."""
+        try:
+            if self.cancelled:
+                self.state = Job.CANCELLED
+                return
+            self.state = Job.RUNNING
+            self.emit(STARTED)
+            try:
+                self.result = self.fn(self)
+            except Exception as e:
+                self.state = Job.FAILED
+                self.error = e
+                logger.error(f"[Jobs] {self.name} failed:\n{traceback.format_exc()}")
+                self.emit(ERROR, e)
+                return
+            self.state = Job.CANCELLED if self.cancelled else Job.DONE
+            if self.result is not None:
+                self.emit(RESULT, self.result)
+        finally:
+            self.emit(FINISHED)
+            self._done.set()
+
+
+class JobExecutor:
+    """
+    Runs jobs on at most max_workers daemon threads; extra jobs wait in FIFO order.
+    Threads are daemons so a running job never blocks application exit.
+
+    A job cancelled mid-run (e.g. stuck in a network call) no longer counts
+    against max_workers: another thread takes its slot while it drains, and
+    the surplus thread retires once the pool is back within the bound.
+    """
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_JOBS, name: str = "Job"):
+        self.max_workers = max(1, int(max_workers))
+        self.name = name
+        self._queue = queue.Queue()
+        self._threads = []
+        self._active = set()  # queued or running
+        self._lock = threading.Lock()
+        self._shutdown = False
+
+    def submit(self, job: Job) -> Job:
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("JobExecutor has been shut down")
+            self._active.add(job)
+            self._grow()
+        self._queue.put(job)
+        job.token.on_cancel(self._on_job_cancelled)
+        return job
+
+    @property
+    def active_jobs(self):
+        """Jobs queued or running, oldest first."""
+        with self._lock:
+            return sorted(self._active, key=lambda j: j.id)
+
+    def cancel_all(self):
+        for job in self.active_jobs:
+            job.cancel()
+
+    def shutdown(self, cancel: bool = True, timeout: Optional[float] = None):
+        """Stops accepting jobs; optionally cancels the active ones and waits for them."""
+        with self._lock:
+            self._shutdown = True
+            threads = list(self._threads)
+        if cancel:
+            self.cancel_all()
+        for _ in threads:
+            self._queue.put(None)
+        for thread in threads:
+            thread.join(timeout)
+
+    def _on_job_cancelled(self):
+        with self._lock:
+            if not self._shutdown:
+                self._grow()
+
+    def _draining(self) -> int:
+        """Cancelled jobs still running on their thread (caller holds the lock)."""
+        return sum(1 for job in self._active if job.cancelled and job.state == Job.RUNNING)
+
+    def _grow(self):
+        """Starts a thread if fewer are free than jobs waiting for one (caller holds the lock)."""
+        draining = self._draining()
+        if len(self._threads) - draining < min(self.max_workers, len(self._active) - draining):
+            thread = threading.Thread(target=self._work, name=f"{self.name}-{len(self._threads) + 1}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            try:
+                job.run()
+            finally:
+                with self._lock:
+                    self._active.discard(job)
+                    surplus = len(self._threads) > self.max_workers + self._draining()
+                    if surplus:
+                        self._threads.remove(threading.current_thread())
+            if surplus:
+                return
+
+
+_default_executor = None
+_default_lock = threading.Lock()
+
+
+def get_executor() -> JobExecutor:
+    """The application-wide executor shared by all workers."""
+    global _default_executor
+    with _default_lock:
+        if _default_executor is None:
+            _default_executor = JobExecutor(DEFAULT_MAX_JOBS, name="NanoPaplJob")
+        return _default_executor
@@ -8,18 +8,37 @@ class LLMClient:
     def __init__(self, provider_name, model_id, api_key=None):
         self.provider = LLMProviderFactory.get_provider(provider_name, api_key, model_id)
 
-    def generate_chat(self, history_messages, new_text, image_paths=[], system_instruction="", resolution="1K", ratio="1:1"):
+    @property
+    def last_usage(self):
+        """Token counts the provider reported for the last request ({} if none)."""
+        return getattr(self.provider, "last_usage", None) or {}
+
+    def generate_chat(self, history_messages, new_text, image_paths=[], system_instruction="", resolution="1K", ratio="1:1", on_chunk=None,
+                      pinned_images=None, context_cache=False, file_uploads=False):
         """
         Generic generation method exposed to Workers.
+        Pass on_chunk to stream: it receives each text delta as it arrives.
+        pinned_images are reference images sent with every turn; with
+        context_cache the provider may keep them and the system instruction
+        in a server-side cache instead. With file_uploads images are uploaded
+        once to the provider's file store and referenced instead of inlined.
         """
         config = {
             "resolution": resolution,
             "ratio": ratio
         }
+        if pinned_images:
+            config["pinned_images"] = list(pinned_images)
+        if context_cache:
+            config["context_cache"] = True
+        if file_uploads:
+            config["file_uploads"] = True
+        stream_args = {"on_chunk": on_chunk} if on_chunk else {}
         return self.provider.generate_chat(
             history_messages, 
             new_text, 
             image_paths, 
             system_instruction, 
-            config
+            config,
+            **stream_args
         )
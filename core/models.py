@@ -105,7 +105,17 @@ class AppConfig:
     api_key: str = ""
     comfy_url: str = "http://127.0.0.1:8188"
     comfy_api_key: str = ""
+    comfy_queue_depth: int = 3  # Prompts kept queued on the ComfyUI server (1 = serial)
+    comfy_extra_urls: List[str] = field(default_factory=list)  # Additional render nodes (load balanced)
     api_timeout: int = 600  # Default 600 seconds (10 mins)
+    gemini_rpm: int = 20  # Requests Per Minute budget for batch calls
+    gemini_rpd: int = 0  # Requests Per Day budget (0 = unlimited, opt-in)
+    chat_context_tokens: int = 32000  # Token budget for history sent with a chat message (0 = unlimited)
+    chat_keep_turns: int = 6  # Latest chat turns always sent verbatim
+    chat_streaming: bool = True  # Show chat replies as they are generated
+    chat_context_cache: bool = False  # Cache system instruction + pinned images server-side (billed per hour)
+    chat_file_uploads: bool = False  # Upload chat images to the Gemini Files API and send them by reference
+    chat_max_parallel: int = 3  # Chat sessions generating at once; further sends wait in line
     
     # UI & Appearance
     theme_color: str = "#0078d4"
@@ -116,6 +126,8 @@ class AppConfig:
     # Batch & Logging
     auto_save_logs: bool = False
     batch_save_logs: bool = True
+    batch_concurrency: int = 4  # Parallel Gemini requests in batch mode
+    result_cache_max_mb: int = 2048  # Size cap of the generated-results cache
     
     # Project & State (Constructor tab)
     constructor_project_name: str = "New Project"
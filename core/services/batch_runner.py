@@ -0,0 +1,291 @@
+"""Qt-free execution of a Gemini batch: planning, resume, parallel requests and reporting."""
+import datetime
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+
+from core.services.generation_service import GenerationService
+from core.services.task_journal import TaskJournal
+from core.services.task_planner import BatchSummary, plan_batch
+from core.utils.path_provider import PathProvider
+from core.utils import naming
+from core.constants import API_PRICING
+from core.logger import logger
+
+
+class BatchRunner:
+    """
+    Runs a Gemini batch on the calling thread and reports through plain callbacks,
+    so it can be driven by BatchWorker (Qt signals) or the headless CLI.
+    """
+    def __init__(self, api_key, input_path, output_path, resolution, ratio, output_format, model_id, check_logs,
+                 timeout=600, max_concurrency=1, rate_limiter=None, resume=True, result_cache=None,
+                 log_callback=None, progress_callback=None, preview_callback=None,
+                 eta_callback=None, api_call_callback=None):
+        self.api_key = api_key
+        self.input_path = Path(input_path)
+        # Use PathProvider for default output if not provided, but here we prioritize user arg
+        self.output_path = Path(output_path) if output_path else PathProvider().get_renders_dir(self.input_path)
+
+        self.resolution = resolution
+        self.ratio = ratio
+        self.output_format = output_format
+        self.model_id = model_id
+        self.check_logs = check_logs
+        self.timeout = timeout
+        # Number of generation requests allowed in flight at once (1 = sequential)
+        self.max_concurrency = max(1, int(max_concurrency))
+        # Optional RateLimiter (RPM/RPD budget, AIMD backoff)
+        self.rate_limiter = rate_limiter
+        # Skip tasks already recorded as done in the output folder's journal
+        self.resume = resume
+        self.journal = None
+        # Optional ResultCache shared with GenerationService
+        self.result_cache = result_cache
+
+        self.log_callback = log_callback or (lambda x: None)
+        self.progress_callback = progress_callback or (lambda x: None)
+        self.preview_callback = preview_callback or (lambda x, y, z: None)  # input, output, prompt
+        self.eta_callback = eta_callback or (lambda x: None)
+        self.api_call_callback = api_call_callback or (lambda: None)
+
+        self.path_provider = PathProvider()
+        self.is_running = True
+        self.summary = BatchSummary()
+
+    def log(self, message):
+        self.log_callback(message)
+
+    def stop(self):
+        """Stops submitting new requests; also wakes requests waiting on the rate limiter."""
+        self.is_running = False
+        if self.rate_limiter:
+            self.rate_limiter.cancel()
+
+    def get_unified_filename(self, stem, title, ext):
+        return naming.generate_filename(stem, title, ext)
+
+    def run(self) -> BatchSummary:
+        """Plans and executes the batch. Returns the run's BatchSummary."""
+        self.log("--- INITIALIZING BATCH PROCESS ---")
+        self.summary = BatchSummary()
+
+        # Initialize Service
+        gen_service = GenerationService(
+            self.api_key, self.model_id, self.timeout,
+            rate_limiter=self.rate_limiter,
+            result_cache=self.result_cache,
+            prepared_cache_size=max(4, self.max_concurrency)
+        )
+
+        # --- Planning Phase (single scan of all projects) ---
+        self.log("Calculating workload...")
+        plan = self.build_plan()
+
+        if not plan.projects:
+            self.log("WARNING: No project folders found (checked for prompts.md).")
+
+        self.log(f"Total tasks found: {plan.total}")
+
+        if plan.total == 0:
+            self.log("Nothing to process.")
+            return self.summary
+
+        pending = self._filter_completed(plan)
+        self.summary.total = len(pending)
+        self.log(f"Estimated cost: ~${plan.estimate_cost(self.resolution, len(pending)):.2f} ({len(pending)} request(s) at {self.resolution})")
+
+        if self.max_concurrency > 1:
+            self.log(f"Parallel requests: {self.max_concurrency}")
+
+        # Only projects with work left get an output folder (not skipped or fully resumed ones)
+        for project_dir in {task.project_dir for task, _ in pending}:
+            (self.output_path / project_dir.name).mkdir(parents=True, exist_ok=True)
+
+        self._start_time = datetime.datetime.now()
+        self._total_operations = len(pending)
+        self._processed_count = 0
+        self._durations = []
+        self._api_durations = []
+        self._cache_hits = 0
+
+        # --- Processing Phase ---
+        # At most max_concurrency requests are ever submitted; stop() simply
+        # stops submitting new ones while the running requests are drained.
+        tasks = iter(pending)
+        in_flight = {}
+        exhausted = False
+        stop_logged = False
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="BatchRequest") as executor:
+            while True:
+                while self.is_running and not exhausted and len(in_flight) < self.max_concurrency:
+                    entry = next(tasks, None)
+                    if entry is None:
+                        exhausted = True
+                        break
+                    future = executor.submit(self._run_task, gen_service, entry[0])
+                    in_flight[future] = entry
+                    # The full block follows when it finishes; this shows what is running meanwhile
+                    task = entry[0]
+                    self.log(f"  [START] [{task.project_dir.name}] {task.image_path.name} | {task.title}")
+
+                if not in_flight:
+                    break
+
+                if not self.is_running and not stop_logged:
+                    self.log(f"Waiting for {len(in_flight)} in-flight request(s) to finish...")
+                    stop_logged = True
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task, key = in_flight.pop(future)
+                    try:
+                        result, duration = future.result()
+                    except Exception as e:
+                        result, duration = {'success': False, 'error': str(e)}, 0.0
+                    self._report_task(task, key, result, duration)
+
+        if self.result_cache:
+            self._log_cache_summary()
+
+        if not self.is_running:
+            self.summary.stopped = True
+            self.log("--- PROCESS STOPPED BY USER ---")
+        else:
+            self.log("--- BATCH PROCESS COMPLETED ---")
+            self.progress_callback(100)
+        return self.summary
+
+    def build_plan(self):
+        """
+        Scans the input folder once and returns an immutable TaskPlan.
+        Also usable on its own for previews and cost estimates.
+        """
+        return plan_batch(
+            self.input_path,
+            self.path_provider,
+            log=self.log,
+            should_stop=lambda: not self.is_running
+        )
+
+    def _filter_completed(self, plan):
+        """
+        Returns [(task, journal_key)] for tasks still to run.
+        With resume enabled, tasks recorded as done in the journal are dropped.
+        """
+        if not self.resume:
+            return [(task, None) for task in plan.tasks]
+
+        self.journal = TaskJournal(self.output_path)
+        pending = []
+        for task in plan.tasks:
+            key = self.journal.task_key(task.project_dir.name, task.image_path, task.prompt, self.resolution, self.ratio)
+            if not self.journal.is_done(key):
+                pending.append((task, key))
+
+        skipped = plan.total - len(pending)
+        if skipped:
+            self.log(f"[RESUME] Skipping {skipped} already completed task(s), {len(pending)} remaining")
+        return pending
+
+    def _run_task(self, gen_service, task):
+        """
+        Executes a single generation request. Runs on a pool thread,
+        so it must not call the callbacks; returns (result, duration_seconds).
+        """
+        # Prepare Config for Service
+        config = {
+            'resolution': self.resolution,
+            'ratio': self.ratio,
+            'format': self.output_format,
+            'project_out_dir': self.output_path / task.project_dir.name,
+            'save_log': self.check_logs,
+            'naming_func': self.get_unified_filename
+        }
+
+        img_start = datetime.datetime.now()
+        result = gen_service.generate_image(task.prompt_data, task.image_path, config)
+        duration = (datetime.datetime.now() - img_start).total_seconds()
+        return result, duration
+
+    def _report_task(self, task, key, result, duration):
+        """
+        Reports the log block, preview and progress for a finished task.
+        Called on the runner's thread so each task's lines stay together.
+        """
+        img_path = task.image_path
+        self.log(f"  [{task.project_dir.name}] {img_path.name} -> {task.title}")
+
+        # Calculate Metrics
+        self._durations.append(duration)
+        avg_duration = sum(self._durations) / len(self._durations)
+        total_elapsed = (datetime.datetime.now() - self._start_time).total_seconds()
+
+        # Format strings
+        t_str = f"{int(total_elapsed // 60)}m {int(total_elapsed % 60)}s"
+
+        if result['success']:
+            self.summary.succeeded += 1
+            if result.get('is_diff_resolution'):
+                self.log(f"    [WARN] Resolution Mismatch! (marked as _diff)")
+
+            self.log(f"    [OK] Saved: {result['saved_path'].name}")
+            self.log(f"    [TIME] Last: {duration:.1f}s | Avg: {avg_duration:.1f}s | Total: {t_str}")
+
+            if result.get('cache_hit'):
+                # Served from the result cache: no API call was made
+                self._cache_hits += 1
+                self.log(f"    [CACHE] Hit - reused identical previous generation")
+            else:
+                self._api_durations.append(duration)
+                if result.get('cache_hit') is False:
+                    self.log(f"    [CACHE] Miss - result stored")
+
+                # Track API Usage
+                from core.utils import config_helper
+                config_helper.config_manager.track_api_usage(self.resolution)
+                self.api_call_callback()
+
+            if self.journal:
+                self.journal.mark_done(key, result['saved_path'])
+
+            self.preview_callback(str(img_path), str(result['saved_path']), task.prompt)
+        elif result.get('cancelled'):
+            self.log(f"    [SKIP] {result['error']}")
+        else:
+            self.summary.failed += 1
+            if self.journal:
+                self.journal.mark_failed(key)
+            self.log(f"    [ERROR] {result['error']}")
+            self.log(f"    [TIME] Failed in {duration:.1f}s | Total: {t_str}")
+            logger.error(f"DEBUG: Failed prompt:\n{task.prompt}")
+
+            if result.get('quota_exhausted') and self.is_running:
+                self.log("    [QUOTA] Daily request limit reached. Stopping batch.")
+                self.stop()
+
+        # --- Progress & ETA Update ---
+        self._processed_count += 1
+        processed_count = self._processed_count
+        total_operations = self._total_operations
+
+        progress_val = (processed_count / max(total_operations, 1)) * 100
+        self.progress_callback(progress_val)
+
+        # ETA Calculation
+        elapsed = (datetime.datetime.now() - self._start_time).total_seconds()
+        avg_time_per_item = elapsed / processed_count
+        remaining_items = total_operations - processed_count
+        self.eta_callback(f"ETA: {naming.format_eta(int(avg_time_per_item * remaining_items))}")
+
+    def _log_cache_summary(self):
+        """Reports result cache hits and the estimated API cost/time they saved."""
+        hits = self._cache_hits
+        misses = len(self._api_durations)
+        price = API_PRICING.get(self.resolution, API_PRICING["DEFAULT"])
+        avg_api = sum(self._api_durations) / misses if misses else 0.0
+        saved_s = int(avg_api * hits)
+        self.log(
+            f"[CACHE] {hits} hit(s) / {misses} miss(es) | "
+            f"Saved ~${hits * price:.2f} and ~{saved_s // 60}m {saved_s % 60}s"
+        )
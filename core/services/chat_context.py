@@ -0,0 +1,143 @@
+"""Token-budgeted chat context: decides which history is sent with each message."""
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+# Rough English/Ukrainian average for Gemini tokenizers; only used for budgeting
+CHARS_PER_TOKEN = 4
+# Gemini bills a small image at 258 tokens; attachments are resized, so use that flat cost
+IMAGE_TOKENS = 258
+# Overhead per content entry (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+DEFAULT_MAX_TOKENS = 32000
+DEFAULT_KEEP_TURNS = 6
+SUMMARY_SHARE = 0.1  # Part of the budget the condensed older turns may use
+SUMMARY_SNIPPET_CHARS = 160
+
+SUMMARY_HEADER = "Earlier in this conversation (condensed):"
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (no API call): ~4 characters per token, rounded up."""
+    if not text:
+        return 0
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+@dataclass
+class ChatContext:
+    """What goes out with one request, plus the numbers for reporting."""
+    history: List[Dict] = field(default_factory=list)
+    system_instruction: str = ""  # Base instruction plus the condensed older turns
+    base_instruction: str = ""
+    summary: str = ""
+    estimated_tokens: int = 0
+    kept: int = 0
+    summarized: int = 0
+    dropped: int = 0
+
+    def history_with_summary(self) -> List[Dict]:
+        """
+        History with the condensed turns folded into its first user message,
+        for callers that must keep the system instruction unchanged between
+        turns (a context-cached instruction).
+        """
+        if not self.summary:
+            return list(self.history)
+        if not self.history:
+            return [{"role": "user", "text": self.summary}]
+        first = {**self.history[0], "text": f"{self.summary}\n\n{self.history[0].get('text', '')}"}
+        return [first] + self.history[1:]
+
+    def to_dict(self) -> Dict:
+        return {
+            "estimated_tokens": self.estimated_tokens,
+            "history_sent": self.kept,
+            "history_summarized": self.summarized,
+            "history_dropped": self.dropped,
+        }
+
+
+class ChatContextManager:
+    """
+    Fits chat history into a token budget so the cost of a message stays flat
+    however long the session gets.
+
+    The last keep_turns turns (user + model message pairs) are always sent
+    verbatim. Older messages are added newest-first while they fit in the
+    budget minus the summary share; the ones that don't are condensed into
+    one-line snippets appended to the system instruction (up to SUMMARY_SHARE
+    of the budget), and whatever is left after that is dropped.
+    max_tokens=0 sends everything.
+    """
+
+    def __init__(self, max_tokens: int = DEFAULT_MAX_TOKENS, keep_turns: int = DEFAULT_KEEP_TURNS):
+        self.max_tokens = max(0, int(max_tokens))
+        self.keep_turns = max(0, int(keep_turns))
+
+    def build(self, history: List[Dict], message: str, system_instruction: str = "", image_count: int = 0) -> ChatContext:
+        fixed = estimate_tokens(system_instruction) + estimate_tokens(message) + image_count * IMAGE_TOKENS
+        costs = [self._message_tokens(msg) for msg in history]
+
+        if not self.max_tokens:
+            return ChatContext(list(history), system_instruction, base_instruction=system_instruction,
+                               estimated_tokens=fixed + sum(costs), kept=len(history))
+
+        # Newest messages first: the protected tail, then whatever fits next to the summary share
+        verbatim_budget = self.max_tokens - int(self.max_tokens * SUMMARY_SHARE)
+        start = len(history)
+        used = fixed
+        protected = min(len(history), self.keep_turns * 2)
+        for i in range(len(history) - 1, -1, -1):
+            if len(history) - i > protected and used + costs[i] > verbatim_budget:
+                break
+            used += costs[i]
+            start = i
+
+        # History must open with a user message
+        while start < len(history) and history[start].get("role") == "model":
+            used -= costs[start]
+            start += 1
+
+        summary_lines, summarized = self._summarize(history[:start])
+        instruction = system_instruction
+        summary = ""
+        if summary_lines:
+            summary = "\n".join([SUMMARY_HEADER] + summary_lines)
+            instruction = f"{system_instruction}\n\n{summary}" if system_instruction else summary
+            used += estimate_tokens(summary) + (1 if system_instruction else 0)
+
+        return ChatContext(
+            history=list(history[start:]),
+            system_instruction=instruction,
+            base_instruction=system_instruction,
+            summary=summary,
+            estimated_tokens=used,
+            kept=len(history) - start,
+            summarized=summarized,
+            dropped=start - summarized,
+        )
+
+    def _summarize(self, older: List[Dict]):
+        """Newest-first one-line snippets of the older messages within the summary share."""
+        budget = int(self.max_tokens * SUMMARY_SHARE) - estimate_tokens(SUMMARY_HEADER) - 2
+        lines = []
+        for msg in reversed(older):
+            text = " ".join(msg.get("text", "").split())
+            if not text:
+                continue
+            if len(text) > SUMMARY_SNIPPET_CHARS:
+                text = text[:SUMMARY_SNIPPET_CHARS - 3].rstrip() + "..."
+            role = "Assistant" if msg.get("role") == "model" else "User"
+            line = f"- {role}: {text}"
+            cost = estimate_tokens(line) + 1
+            if cost > budget:
+                break
+            budget -= cost
+            lines.append(line)
+        lines.reverse()
+        return lines, len(lines)
+
+    @staticmethod
+    def _message_tokens(msg: Dict) -> int:
+        return estimate_tokens(msg.get("text", "")) + len(msg.get("images") or []) * IMAGE_TOKENS + MESSAGE_OVERHEAD_TOKENS
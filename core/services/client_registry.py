@@ -0,0 +1,50 @@
+"""Process-wide registry of shared Google GenAI clients."""
+import threading
+from typing import Optional
+
+import google.genai as genai
+from google.genai import types
+
+from core.logger import logger
+
+_clients = {}  # (api_key, timeout_seconds) -> genai.Client
+_lock = threading.Lock()
+
+
+def get_genai_client(api_key: str, timeout: Optional[int] = None) -> Optional[genai.Client]:
+    """
+    Returns the shared client for this API key (and optional client-wide
+    timeout in seconds), creating it on first use.
+
+    A genai.Client owns its HTTP connection pool, so sharing one instance
+    keeps TLS connections alive across chat messages, batch runs and workers.
+    Per-request timeouts can still be set via GenerateContentConfig.http_options.
+    """
+    if not api_key:
+        return None
+
+    sig = (api_key, timeout)
+    with _lock:
+        client = _clients.get(sig)
+        if client is None:
+            if timeout is None:
+                client = genai.Client(api_key=api_key)
+            else:
+                client = genai.Client(api_key=api_key, http_options=types.HttpOptions(timeout=timeout * 1000))
+            _clients[sig] = client
+        return client
+
+
+def invalidate_clients(api_key: Optional[str] = None) -> None:
+    """
+    Drops cached clients (all of them, or only those for api_key).
+
+    Clients are not closed here: workers that already hold one finish their
+    requests normally and the old pool is released once they let go of it.
+    """
+    with _lock:
+        stale = [sig for sig in _clients if api_key is None or sig[0] == api_key]
+        for sig in stale:
+            del _clients[sig]
+    if stale:
+        logger.info(f"[ClientRegistry] Invalidated {len(stale)} GenAI client(s)")
@@ -1,11 +1,36 @@
 import json
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass
 from pathlib import Path
 
 from core.comfy_api import ComfyAPI
+from core.comfy_ws import ComfyEventListener, wait_for_outputs
+from core.services.task_journal import TaskJournal
+from core.services.result_cache import ResultCache
+from core.services.task_planner import BatchSummary, BatchTask, plan_batch
+from core.services.upload_cache import ComfyUploadCache
+from core.services.comfy_pool import ComfyNode, ComfyNodePool
+from core.services.workflow_template import WorkflowTemplate
 from core.constants import DEFAULT_NODE_MAPPING
 from core.utils.path_provider import PathProvider
-from core.utils import prompt_parser, image_utils, naming
+from core.utils import image_utils, naming
+
+# Returned instead of a result when a task must be retried on another node
+REQUEUE = object()
+
+
+@dataclass
+class QueuedPrompt:
+    """A task whose workflow has been queued on the server and awaits its output."""
+    task: BatchTask
+    prompt_id: str
+    image_out_dir: Path
+    cache_key: str | None = None
+    node: ComfyNode | None = None
+
 
 class ComfyOrchestrator:
     """
@@ -18,24 +43,50 @@ class ComfyOrchestrator:
         self.progress_callback = progress_callback or (lambda x: None)
         self.preview_callback = preview_callback or (lambda x, y, z: None) # input, output, prompt
         
-        self.api = ComfyAPI(base_url=settings.get("comfy_url", "http://127.0.0.1:8188"))
+        # Render nodes: "comfy_urls" (pool) or the single "comfy_url"
+        urls = settings.get("comfy_urls") or [settings.get("comfy_url", "http://127.0.0.1:8188")]
+        self.nodes = [ComfyNode(ComfyAPI(base_url=url)) for url in dict.fromkeys(urls)]
+        self.api = self.nodes[0].api
+        self.pool = ComfyNodePool(self.nodes, log=self.log, health_interval=settings.get("health_interval", 10.0))
         self.is_running = True
         self.project_provider = PathProvider() 
         
         # Dynamic Node Mapping
         self.node_mapping = node_mapping or DEFAULT_NODE_MAPPING
 
+        # Prompts queued on a server and not yet collected (cancelled on stop)
+        self._outstanding = {}  # prompt_id -> ComfyNode
+        self._completed = 0
+        self._lock = threading.Lock()
+        self.summary = BatchSummary()
+
+        # Optional result cache (opt-in via settings)
+        self._workflow_hash = ""
+        self.result_cache = None
+        if settings.get("result_cache", False):
+            max_mb = settings.get("result_cache_max_mb", 2048)
+            self.result_cache = ResultCache(self.project_provider.get_result_cache_dir(), max_mb * 1024 * 1024)
+
+        # Source uploads: once per run by content hash, remembered across runs
+        self._source_hashes = {}  # Path -> sha1
+        self._uploaded = {}       # (server, sha1) -> server filename (this run)
+        self.upload_cache = None
+        if settings.get("upload_cache", True):
+            self.upload_cache = ComfyUploadCache(self.project_provider.get_comfy_upload_cache_file())
+
     def log(self, message):
         self.log_callback(message)
 
     def stop(self):
         self.is_running = False
 
-    def process_batch(self) -> None:
+    def process_batch(self) -> BatchSummary:
         """
         Main entry point for processing the batch.
         Iterates through projects, creates tasks, and executes them.
+        Returns the run's BatchSummary.
         """
+        self.summary = BatchSummary()
         # Input path from settings (UI) or PathProvider?
         input_path_str = self.settings.get("input_path", "")
         output_path_str = self.settings.get("output_path", "")
@@ -51,82 +102,193 @@ class ComfyOrchestrator:
         # 1. Load Workflow Template
         try:
             with open(workflow_path, 'r', encoding='utf-8') as f:
-                workflow_template = json.load(f)
+                workflow_template = WorkflowTemplate(json.load(f), self.node_mapping)
         except Exception as e:
             self.log(f"Error: Failed to load workflow template: {e}")
-            return
+            self.summary.error = f"Failed to load workflow template: {e}"
+            return self.summary
+        self._workflow_hash = workflow_template.hash
 
-        # 2. Project Detection
-        projects = []
-        prompt_file = self.project_provider.get_prompts_file(input_path) 
-        
-        if prompt_file.exists():
-            self.log(f"Detected Single Project Mode: {input_path.name}")
-            projects = [input_path]
-        else:
-            projects = [d for d in input_path.iterdir() if d.is_dir()]
+        # 2. Workload Calculation (single scan of all projects)
+        plan = plan_batch(input_path, self.project_provider, log=self.log, should_stop=lambda: not self.is_running)
 
-        if not projects:
+        if not plan.projects:
             self.log(f"Error: No project folders found in {input_path} (checked for prompts.md).")
-            return
+            self.summary.error = f"No project folders found in {input_path}"
+            return self.summary
 
-        # Use standard supported formats, convert set to tuple for suffix checking
-        valid_exts = tuple(image_utils.SUPPORTED_IMAGE_FORMATS)
+        total_tasks = plan.total
+        if total_tasks == 0:
+            self.log("Error: Nothing to process.")
+            return self.summary
 
-        # 3. Workload Calculation
-        task_list = [] # List of (project_dir, img_path, prompt_data)
+        self.log(f"Total tasks found: {total_tasks}")
 
-        for project_dir in projects:
-            if not self.is_running: break
-            
-            # Use PathProvider for optimized Check
-            image_source_dir = self.project_provider.get_optimized_dir(project_dir)
-            if not image_source_dir.exists():
-                image_source_dir = project_dir
+        # 3. Resume: drop tasks the journal already records as done
+        task_list = list(plan.tasks)
+        journal = None
+        keys = {}
+        if self.settings.get("resume", True):
+            journal = TaskJournal(output_path)
+            resolution = self.settings.get("resolution", "1K")
+            ratio = self.settings.get("ratio", "1:1")
+            pending = []
+            for task in task_list:
+                keys[task] = journal.task_key(task.project_dir.name, task.image_path, task.prompt, resolution, ratio)
+                if not journal.is_done(keys[task]):
+                    pending.append(task)
 
-            prompt_path = self.project_provider.get_prompts_file(project_dir)
-            prompts_data = prompt_parser.parse_markdown_prompts(prompt_path)
-            
-            if not prompts_data:
-                self.log(f"Skipping '{project_dir.name}': No valid prompts found.")
-                continue
+            if len(pending) < total_tasks:
+                self.log(f"Resuming: {total_tasks - len(pending)} task(s) already completed, {len(pending)} remaining.")
+            task_list = pending
+            total_tasks = len(task_list)
 
-            images = [f for f in image_source_dir.iterdir() if f.suffix.lower() in valid_exts]
-            
-            if not images:
-                self.log(f"Skipping '{project_dir.name}': No images found.")
-                continue
+        # 4. Execution Loop
+        self.summary.total = total_tasks
+        depth = max(1, int(self.settings.get("queue_depth", 1)))
+        self._completed = 0
+        self._start_listener()
+        self.pool.start()
+        try:
+            if len(self.nodes) > 1:
+                self.log(f"Load balancing across {len(self.nodes)} servers, up to {depth} prompt(s) queued on each")
+                self._run_pipelined(task_list, total_tasks, workflow_template, output_path, journal, keys, depth)
+            elif depth > 1:
+                self.log(f"Pipelined mode: up to {depth} prompt(s) queued on the server")
+                self._run_pipelined(task_list, total_tasks, workflow_template, output_path, journal, keys, depth)
+            else:
+                for i, task in enumerate(task_list):
+                    if not self.is_running: break
+                    
+                    try:
+                        saved_file = self._process_single_task(task, i, total_tasks, workflow_template, output_path)
+                    except Exception as e:
+                        saved_file = None
+                        self.log(f"Critical Error processing task {i}: {e}")
 
-            for img_path in images:
-                for p_data in prompts_data:
-                    task_list.append({
-                        "project": project_dir,
-                        "image": img_path,
-                        "prompt": p_data
-                    })
+                    self._record_result(journal, keys.get(task), saved_file)
+        finally:
+            self.pool.stop()
+            if not self.is_running:
+                self._cancel_outstanding()
+            self._stop_listener()
+            if self.upload_cache:
+                self.upload_cache.save()
 
-        total_tasks = len(task_list)
-        if total_tasks == 0:
-            self.log("Error: Nothing to process.")
-            return
+        if self._uploaded:
+            self.log(f"Uploads: {len(self._uploaded)} unique source image(s) for {total_tasks} task(s)")
 
-        self.log(f"Total tasks found: {total_tasks}")
+        if len(self.nodes) > 1:
+            self.log("Per-server throughput:")
+            for line in self.pool.report():
+                self.log(line)
 
-        # 4. Execution Loop
-        for i, task in enumerate(task_list):
-            if not self.is_running: break
-            
-            try:
-                self._process_single_task(task, i, total_tasks, workflow_template, output_path)
-            except Exception as e:
-                self.log(f"Critical Error processing task {i}: {e}")
+        if self.result_cache:
+            self.log(f"Result cache: {self.result_cache.hits} hit(s) / {self.result_cache.misses} miss(es)")
 
+        self.summary.stopped = not self.is_running
         self.log("Batch Cycle Completed.")
+        return self.summary
+
+    def _process_single_task(self, task: BatchTask, index: int, total_tasks: int, workflow_template: "WorkflowTemplate | dict", output_path: Path) -> Path | None:
+        """Runs one task end-to-end. Returns the saved file path, or None on failure."""
+        queued = self._submit_task(task, index, total_tasks, workflow_template, output_path)
+        if queued is REQUEUE:
+            return None
+        if not isinstance(queued, QueuedPrompt):
+            return queued
+        self.pool.acquire(queued.node)  # _collect_task releases it
+        saved_file = self._collect_task(queued, total_tasks)
+        return None if saved_file is REQUEUE else saved_file
+
+    def _run_pipelined(self, task_list, total_tasks, workflow_template, output_path, journal, keys, depth):
+        """
+        Keeps up to `depth` prompts queued on each server: the next tasks are
+        uploaded and queued here while earlier ones execute, and finished
+        outputs are downloaded on collector threads.
+
+        Each task goes to the node with the shortest queue; tasks whose node
+        dies are put back and dispatched elsewhere.
+        """
+        pending = deque(enumerate(task_list))
+        in_flight = {}  # future -> (index, task)
 
-    def _process_single_task(self, task: dict, index: int, total_tasks: int, workflow_template: dict, output_path: Path) -> None:
-        project_dir = task["project"]
-        img_path = task["image"]
-        p_data = task["prompt"]
+        def drain():
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                i, task = in_flight.pop(future)
+                try:
+                    saved_file = future.result()
+                except Exception as e:
+                    saved_file = None
+                    self.log(f"Critical Error collecting {task.image_path.name}: {e}")
+                if saved_file is REQUEUE:
+                    if self.is_running:
+                        self.log(f"Re-queueing {task.image_path.name} -> {task.title} on another server")
+                        pending.appendleft((i, task))
+                    continue
+                self._record_result(journal, keys.get(task), saved_file)
+
+        workers = depth * len(self.nodes)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ComfyCollect") as executor:
+            while self.is_running and (pending or in_flight):
+                if not pending:
+                    drain()  # may put tasks from a dead node back into pending
+                    continue
+
+                node = self.pool.select(depth)
+                if node is None:
+                    if in_flight:
+                        drain()
+                        continue
+                    self.log("Error: No ComfyUI server available. Stopping batch.")
+                    break
+
+                i, task = pending.popleft()
+                try:
+                    queued = self._submit_task(task, i, total_tasks, workflow_template, output_path, node)
+                except Exception as e:
+                    queued = None
+                    self.log(f"Critical Error processing task {i}: {e}")
+
+                if queued is REQUEUE:
+                    pending.appendleft((i, task))
+                elif isinstance(queued, QueuedPrompt):
+                    self.pool.acquire(node)
+                    in_flight[executor.submit(self._collect_task, queued, total_tasks)] = (i, task)
+                else:
+                    self._record_result(journal, keys.get(task), queued)
+
+            while in_flight:
+                drain()
+
+    def _record_result(self, journal, key, saved_file):
+        if saved_file:
+            self.summary.succeeded += 1
+        elif self.is_running:
+            self.summary.failed += 1  # results cut short by stop() count as skipped
+        if journal and self.is_running:
+            if saved_file:
+                journal.mark_done(key, saved_file)
+            else:
+                journal.mark_failed(key)
+
+    def _task_finished(self, total_tasks: int):
+        with self._lock:
+            self._completed += 1
+            done = self._completed
+        self.progress_callback(done / total_tasks * 100)
+
+    def _submit_task(self, task: BatchTask, index: int, total_tasks: int, workflow_template: "WorkflowTemplate | dict", output_path: Path, node: ComfyNode = None):
+        """
+        Upload + queue stage. Returns a QueuedPrompt, the final result if
+        nothing was queued (saved Path on a cache hit, None on failure), or
+        REQUEUE if the node turned out to be down.
+        """
+        node = node or self.nodes[0]
+        project_dir = task.project_dir
+        img_path = task.image_path
+        p_data = task.prompt_data
         
         self.log(f"\nProcessing [{index+1}/{total_tasks}]: {img_path.name} -> {p_data['title']}")
         
@@ -139,17 +301,32 @@ class ComfyOrchestrator:
         image_out_dir = project_out / image_subfolder_name
         image_out_dir.mkdir(exist_ok=True)
         
-        # Step A: Upload Image
+        # Step 0: Result Cache (skips upload and generation on a hit)
+        cache_key = self._cache_key(img_path, p_data) if self.result_cache else None
+        if cache_key:
+            cached = self.result_cache.get(cache_key)
+            if cached:
+                saved_file = self._save_cached_result(cached, image_out_dir, img_path.stem, p_data)
+                self.log(f"Cache hit: reused {saved_file.name} (no generation)")
+                self.preview_callback(str(img_path), str(saved_file), p_data['prompt'])
+                self._task_finished(total_tasks)
+                return saved_file
+
+        # Step A: Upload Image (once per unique source content)
         unique_filename = f"{project_dir.name}_{img_path.name}"
         
-        comfy_server_filename = self.api.upload_image(img_path, unique_filename)
+        comfy_server_filename = self._upload_source(img_path, unique_filename, node.api)
         
         if not comfy_server_filename:
+            if self._node_is_down(node):
+                return REQUEUE
             self.log(f"Skipping due to upload failure (or server unavailable).")
-            return
+            self._task_finished(total_tasks)
+            return None
 
-        # Step B: Prepare Workflow
-        current_workflow = json.loads(json.dumps(workflow_template))
+        # Step B: Prepare Workflow (only the patched nodes are copied)
+        if not isinstance(workflow_template, WorkflowTemplate):
+            workflow_template = WorkflowTemplate(workflow_template, self.node_mapping)
         
         # Calculate Ratio
         ratio_setting = self.settings.get("ratio", "1:1")
@@ -159,68 +336,196 @@ class ComfyOrchestrator:
             self.log(f">> Manual Ratio Calculated: {current_ratio}")
 
         # Update Nodes
-        load_node_id = self.node_mapping.get("LOAD_IMAGE")
-        if load_node_id in current_workflow:
-            current_workflow[load_node_id]["inputs"]["image"] = comfy_server_filename or unique_filename
-        
-        prompt_node_id = self.node_mapping.get("GEMINI_PROMPT")
-        if prompt_node_id in current_workflow:
-            inputs = current_workflow[prompt_node_id]["inputs"]
-            inputs["prompt"] = p_data["prompt"]
-            inputs["resolution"] = self.settings.get("resolution", "1K")
-            inputs["aspect_ratio"] = current_ratio
+        prompt_inputs = {
+            "prompt": p_data["prompt"],
+            "resolution": self.settings.get("resolution", "1K"),
+            "aspect_ratio": current_ratio
+        }
+        if self.settings.get("use_random_seed", True):
+            prompt_inputs["seed"] = int(time.time() * 1000) % 1000000000
+        else:
+            prompt_inputs["seed"] = self.settings.get("seed_value", 0)
             
-            if self.settings.get("use_random_seed", True):
-                inputs["seed"] = int(time.time() * 1000) % 1000000000
-            else:
-                inputs["seed"] = self.settings.get("seed_value", 0)
-                
-            sys_prompt = self.settings.get("system_prompt", "")
-            if sys_prompt.strip():
-                inputs["system_prompt"] = sys_prompt
+        sys_prompt = self.settings.get("system_prompt", "")
+        if sys_prompt.strip():
+            prompt_inputs["system_prompt"] = sys_prompt
         
-        # 3. Save Image Prefix
         # We set a temp prefix; naming.py handles the final filename after download.
-        save_node_id = self.node_mapping.get("SAVE_IMAGE")
-        if save_node_id in current_workflow:
-            temp_prefix = f"TEMP_{clean_stem}"
-            current_workflow[save_node_id]["inputs"]["filename_prefix"] = temp_prefix
+        current_workflow = workflow_template.render({
+            "LOAD_IMAGE": {"image": comfy_server_filename or unique_filename},
+            "GEMINI_PROMPT": prompt_inputs,
+            "SAVE_IMAGE": {"filename_prefix": f"TEMP_{clean_stem}"}
+        })
 
         # Step C: Execution
         api_key = self.settings.get("api_key", "")
-        prompt_id = self.api.queue_prompt(current_workflow, api_key)
+        prompt_id = node.api.queue_prompt(current_workflow, api_key)
         
         if not prompt_id:
+            if self._node_is_down(node):
+                return REQUEUE
             self.log("Failed to queue prompt.")
-            return
+            self._task_finished(total_tasks)
+            return None
+
+        with self._lock:
+            self._outstanding[prompt_id] = node
+        if len(self.nodes) > 1:
+            self.log(f">> Queued on {node.name}")
+        return QueuedPrompt(task, prompt_id, image_out_dir, cache_key, node)
+
+    def _collect_task(self, queued: QueuedPrompt, total_tasks: int) -> Path | None:
+        """
+        Wait + download stage. Returns the saved file path, None on failure,
+        or REQUEUE if the node died while the prompt was pending.
+        """
+        node = queued.node or self.nodes[0]
+        success = None
+        try:
+            saved_file = self._collect_from_node(queued, node, total_tasks)
+            if saved_file is not REQUEUE and self.is_running:
+                success = saved_file is not None
+            return saved_file
+        finally:
+            if queued.node:
+                self.pool.release(node, success)
+
+    def _collect_from_node(self, queued: QueuedPrompt, node: ComfyNode, total_tasks: int):
+        img_path = queued.task.image_path
+        p_data = queued.task.prompt_data
+        cache_key = queued.cache_key
+
+        img_data_list = self._wait_for_completion_managed(queued.prompt_id, node)
+        if img_data_list is None:
+            if self.is_running and not node.healthy:
+                with self._lock:
+                    self._outstanding.pop(queued.prompt_id, None)
+                return REQUEUE
+            return None  # stopped: the prompt stays outstanding and is cancelled
+        with self._lock:
+            self._outstanding.pop(queued.prompt_id, None)
 
-        img_data_list = self._wait_for_completion_managed(prompt_id)
         if not img_data_list:
-            self.log("Generation failed or timed out.")
-            return
+            self.log(f"Generation failed or timed out: {img_path.name} -> {p_data['title']}")
+            self._task_finished(total_tasks)
+            return None
         
         # Download and Rename to Unified Format
         # Pass full prompt string for saving
-        saved_file = self._download_and_save(img_data_list, image_out_dir, img_path.stem, p_data['title'], p_data['prompt'])
+        saved_file = self._download_and_save(img_data_list, queued.image_out_dir, img_path.stem, p_data['title'], p_data['prompt'], node.api)
         
         if saved_file:
+             if cache_key:
+                 self.result_cache.put(cache_key, saved_file.read_bytes())
              self.preview_callback(str(img_path), str(saved_file), p_data['prompt'])
         
-        self.progress_callback((index + 1) / total_tasks * 100)
+        self._task_finished(total_tasks)
+        return saved_file
+
+    def _source_hash(self, img_path: Path) -> str:
+        """Content hash of a source image, computed once per run."""
+        digest = self._source_hashes.get(img_path)
+        if digest is None:
+            digest = image_utils.hash_file(img_path)
+            self._source_hashes[img_path] = digest
+        return digest
+
+    def _upload_source(self, img_path: Path, fallback_name: str, api: ComfyAPI = None) -> str | None:
+        """
+        Uploads a source image unless identical bytes are already on the server.
+        Returns the server filename, or None on failure.
+        """
+        api = api or self.api
+        try:
+            digest = self._source_hash(img_path)
+        except Exception as e:
+            self.log(f"Warning: Cannot hash {img_path.name}, uploading as-is: {e}")
+            return api.upload_image(img_path, fallback_name)
+
+        server = api.base_url
+        name = self._uploaded.get((server, digest))
+        if name:
+            return name
 
-    def _wait_for_completion_managed(self, prompt_id):
+        known = self.upload_cache.get(server, digest) if self.upload_cache else None
+        if known:
+            if api.has_input_image(known):
+                self.log(f"Upload skipped: {img_path.name} already on server as {known}")
+                self._uploaded[(server, digest)] = known
+                return known
+            self.upload_cache.forget(server, digest)
+
+        # Content-addressed name: same name on the server <=> same bytes
+        name = api.upload_image(img_path, f"nanopapl_{digest[:20]}{img_path.suffix.lower()}")
+        if name:
+            self._uploaded[(server, digest)] = name
+            if self.upload_cache:
+                self.upload_cache.put(server, digest, name)
+        return name
+
+    def _cancel_outstanding(self):
+        """Removes our still-pending prompts from each server queue and interrupts our running ones."""
+        with self._lock:
+            outstanding = dict(self._outstanding)
+            self._outstanding.clear()
+        if not outstanding:
+            return
+
+        for node in self.nodes:
+            prompt_ids = [pid for pid, n in outstanding.items() if n is node]
+            if not prompt_ids or not node.healthy:
+                continue
+            queue = node.api.get_queue() or {}
+            running = {item[1] for item in queue.get("queue_running", []) if len(item) > 1}
+            queued = [pid for pid in prompt_ids if pid not in running]
+            if queued:
+                node.api.delete_queued(queued)
+            for pid in prompt_ids:
+                if pid in running:
+                    node.api.interrupt(pid)
+        self.log(f"Cancelled {len(outstanding)} prompt(s) on the server.")
+
+    def _node_is_down(self, node: ComfyNode) -> bool:
+        """After a failed call in multi-server mode: True (and out of rotation) if the node is unreachable."""
+        if len(self.nodes) < 2:
+            return False
+        if node.api.get_system_stats() is None:
+            self.pool.mark_dead(node, "not responding")
+            return True
+        return False
+
+    def _start_listener(self):
+        if not self.settings.get("comfy_websocket", True):
+            return
+        for node in self.nodes:
+            listener = ComfyEventListener(node.api)
+            if listener.start():
+                node.listener = listener
+            else:
+                self.log(f"WebSocket unavailable on {node.name}, tracking completion by polling.")
+
+    def _stop_listener(self):
+        for node in self.nodes:
+            if node.listener:
+                node.listener.close()
+                node.listener = None
+
+    def _wait_for_completion_managed(self, prompt_id, node: ComfyNode = None):
+        node = node or self.nodes[0]
         save_node_id = self.node_mapping.get("SAVE_IMAGE")
-        while self.is_running:
-            hist = self.api.get_history(prompt_id)
-            if hist and prompt_id in hist:
-                outputs = hist[prompt_id].get("outputs", {})
-                if save_node_id in outputs:
-                    return outputs[save_node_id].get("images", [])
-                return []
-            time.sleep(1)
-        return None
-
-    def _download_and_save(self, img_data_list, image_out_dir, original_stem, prompt_title, prompt_text=None):
+        outputs = wait_for_outputs(
+            node.api, prompt_id, node.listener,
+            is_running=lambda: self.is_running and node.healthy,
+            required_node=save_node_id
+        )
+        if outputs is None:
+            return None
+        if save_node_id in outputs:
+            return outputs[save_node_id].get("images", [])
+        return []
+
+    def _download_and_save(self, img_data_list, image_out_dir, original_stem, prompt_title, prompt_text=None, api: ComfyAPI = None):
+        api = api or self.api
         last_saved = None
         for img_data in img_data_list:
             fname = img_data['filename']
@@ -230,7 +535,7 @@ class ComfyOrchestrator:
             target_name = naming.generate_filename(original_stem, prompt_title, ext)
             save_path = image_out_dir / target_name
             
-            success = self.api.download_image(
+            success = api.download_image(
                 filename=fname,
                 subfolder=img_data.get("subfolder", ""),
                 img_type=img_data.get("type", "output"),
@@ -242,13 +547,50 @@ class ComfyOrchestrator:
                 last_saved = save_path
                 
                 # Save Prompt Text
-                if prompt_text and self.settings.get("save_logs", True):
-                    txt_name = Path(target_name).stem + ".txt"
-                    txt_path = image_out_dir / txt_name
-                    try:
-                        full_log = f"PROMPT:\n{prompt_text}"
-                        txt_path.write_text(full_log, encoding="utf-8")
-                    except Exception as e:
-                        self.log(f"Warning: Failed to save prompt txt: {e}")
+                if prompt_text:
+                    self._save_prompt_log(save_path, prompt_text)
                         
         return last_saved
+
+    def _save_prompt_log(self, image_path: Path, prompt_text: str) -> None:
+        if not self.settings.get("save_logs", True):
+            return
+        txt_path = image_path.with_suffix(".txt")
+        try:
+            full_log = f"PROMPT:\n{prompt_text}"
+            txt_path.write_text(full_log, encoding="utf-8")
+        except Exception as e:
+            self.log(f"Warning: Failed to save prompt txt: {e}")
+
+    def _cache_key(self, img_path: Path, p_data: dict) -> str | None:
+        """
+        Cache key over the source bytes and every setting that shapes the output.
+        A random seed is deliberately left out: a cached result is an accepted
+        sample for that request.
+        """
+        try:
+            image_hash = self._source_hash(img_path)
+        except OSError as e:
+            self.log(f"Warning: Cannot hash {img_path.name} for cache: {e}")
+            return None
+        params = {
+            "engine": "comfy",
+            "workflow": self._workflow_hash,
+            "prompt": p_data["prompt"].strip(),
+            "resolution": self.settings.get("resolution", "1K"),
+            "ratio": self.settings.get("ratio", "1:1"),
+            "system_prompt": self.settings.get("system_prompt", "").strip(),
+        }
+        if not self.settings.get("use_random_seed", True):
+            params["seed"] = self.settings.get("seed_value", 0)
+        return self.result_cache.make_key(image_hash, params)
+
+    def _save_cached_result(self, data: bytes, image_out_dir: Path, original_stem: str, p_data: dict) -> Path:
+        """Materialises cached bytes under the same unified name a download would get."""
+        # Cache entries are raw bytes: the download's format (PNG/JPEG/WebP) comes from the header
+        ext = image_utils.get_extension_from_bytes(data)
+        target_name = naming.generate_filename(original_stem, p_data['title'], ext)
+        save_path = image_out_dir / target_name
+        save_path.write_bytes(data)
+        self._save_prompt_log(save_path, p_data['prompt'])
+        return save_path
@@ -0,0 +1,127 @@
+"""Pool of ComfyUI render nodes: shortest-queue dispatch and health checks."""
+import threading
+import time
+from typing import Callable, List, Optional
+
+from core.logger import logger
+
+
+class ComfyNode:
+    """One ComfyUI server plus the bookkeeping the pool needs for it."""
+
+    def __init__(self, api):
+        self.api = api
+        self.name = str(api.base_url).split("://", 1)[-1]
+        self.listener = None  # Optional ComfyEventListener
+        self.healthy = True
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+
+
+class ComfyNodePool:
+    """
+    Picks the node with the shortest server queue (GET /queue, which also
+    counts other users' jobs) among healthy nodes with spare capacity.
+
+    A background thread pings /system_stats; nodes that stop answering are
+    taken out of rotation and put back once they respond again.
+    """
+
+    def __init__(self, nodes: List[ComfyNode], log: Optional[Callable[[str], None]] = None, health_interval: float = 10.0):
+        self.nodes = nodes
+        self.log = log or (lambda msg: None)
+        self.health_interval = health_interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._started_at = time.monotonic()
+
+    def healthy_nodes(self) -> List[ComfyNode]:
+        return [n for n in self.nodes if n.healthy]
+
+    def select(self, depth: int) -> Optional[ComfyNode]:
+        """
+        Returns the least loaded healthy node with fewer than `depth` of our
+        prompts in flight, or None if every node is full (or down).
+        """
+        with self._lock:
+            candidates = [n for n in self.nodes if n.healthy and n.in_flight < depth]
+        if len(candidates) <= 1:
+            return candidates[0] if candidates else None
+
+        best, best_load = None, None
+        for node in candidates:
+            queue = node.api.get_queue()
+            if queue is None:
+                self.mark_dead(node, "queue unavailable")
+                continue
+            load = (len(queue.get("queue_running", [])) + len(queue.get("queue_pending", [])), node.in_flight)
+            if best_load is None or load < best_load:
+                best, best_load = node, load
+        return best
+
+    def acquire(self, node: ComfyNode):
+        with self._lock:
+            node.in_flight += 1
+
+    def release(self, node: ComfyNode, success: Optional[bool] = None):
+        """Frees a slot; success True/False updates the node's stats (None = not finished)."""
+        with self._lock:
+            node.in_flight -= 1
+            if success is True:
+                node.completed += 1
+            elif success is False:
+                node.failed += 1
+
+    def mark_dead(self, node: ComfyNode, reason: str = ""):
+        with self._lock:
+            was_healthy = node.healthy
+            node.healthy = False
+        if was_healthy:
+            self.log(f"[NODE] {node.name} taken out of rotation{f' ({reason})' if reason else ''}")
+
+    def check_health(self):
+        for node in self.nodes:
+            alive = node.api.get_system_stats() is not None
+            if not alive:
+                self.mark_dead(node, "health check failed")
+            elif not node.healthy:
+                with self._lock:
+                    node.healthy = True
+                self.log(f"[NODE] {node.name} is back in rotation")
+
+    # --- Health-check thread ---
+
+    def start(self):
+        self._started_at = time.monotonic()
+        if len(self.nodes) < 2:
+            return  # single server: failures surface through the calls themselves
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ComfyHealth", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.health_interval):
+            try:
+                self.check_health()
+            except Exception as e:
+                logger.error(f"[ComfyPool] Health check error: {e}")
+
+    # --- Reporting ---
+
+    def report(self) -> List[str]:
+        """Per-node throughput lines for the batch log."""
+        minutes = max((time.monotonic() - self._started_at) / 60, 1e-6)
+        lines = []
+        for node in self.nodes:
+            state = "" if node.healthy else " [down]"
+            lines.append(f"  {node.name}: {node.completed} done, {node.failed} failed, "
+                         f"{node.completed / minutes:.1f} img/min{state}")
+        return lines
@@ -0,0 +1,147 @@
+"""Gemini explicit context caching for the stable prefix of chat requests."""
+import hashlib
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Sequence
+
+from google.genai import types
+
+from core.logger import logger
+from core.services.chat_context import IMAGE_TOKENS, estimate_tokens
+from core.services.gemini_files import key_fingerprint
+from core.utils import image_utils
+
+DEFAULT_TTL_SECONDS = 3600
+# Caches closer than this to expiry get their TTL extended before use
+REFRESH_MARGIN_SECONDS = 300
+# Gemini rejects caches below a model-dependent minimum (1024 tokens at the lowest)
+MIN_CACHE_TOKENS = 1024
+# After a failed create (model without caching, prefix too small...) retry no sooner than this
+UNAVAILABLE_RETRY_SECONDS = 1800
+
+
+class ContextCache:
+    """
+    Keeps one server-side cached content per (API key, model, system
+    instruction, pinned images) and hands out its name for
+    GenerateContentConfig.cached_content, so that prefix is sent and billed
+    at the full input rate once per TTL instead of on every turn.
+
+    Caching is best effort: get() returns None whenever a cache cannot be
+    used (prefix below the minimum size, model without caching support,
+    API error) and callers then send the prefix normally. Failures are
+    remembered for UNAVAILABLE_RETRY_SECONDS so they cost one call, not one
+    per message. Caches are not deleted explicitly; they lapse with their TTL.
+    """
+
+    def __init__(self, ttl_seconds: int = DEFAULT_TTL_SECONDS, min_tokens: int = MIN_CACHE_TOKENS):
+        self.ttl_seconds = ttl_seconds
+        self.min_tokens = min_tokens
+        self._entries = {}      # signature -> {"name", "expires_at"}
+        self._unavailable = {}  # signature -> retry-after timestamp
+        self._lock = threading.Lock()
+
+    def get(self, client, api_key: str, model_id: str, system_instruction: str,
+            pinned_images: Sequence[str] = (), file_cache=None) -> Optional[str]:
+        """Name of a live cache for this prefix, creating or extending it as needed; None to send uncached."""
+        if not client or not (system_instruction or pinned_images):
+            return None
+        if estimate_tokens(system_instruction) + len(pinned_images) * IMAGE_TOKENS < self.min_tokens:
+            return None
+
+        try:
+            sig = self._signature(api_key, model_id, system_instruction, pinned_images, file_cache)
+        except OSError as e:
+            logger.warning(f"[ContextCache] Cannot read pinned image: {e}")
+            return None
+
+        now = time.time()
+        with self._lock:
+            if self._unavailable.get(sig, 0) > now:
+                return None
+            entry = self._entries.get(sig)
+
+        if entry and entry["expires_at"] > now + REFRESH_MARGIN_SECONDS:
+            return entry["name"]
+        if entry and entry["expires_at"] > now and self._extend(client, sig, entry):
+            return entry["name"]
+        return self._create(client, sig, model_id, system_instruction, pinned_images, api_key, file_cache)
+
+    def invalidate(self, name: str) -> None:
+        """Drops a cache the server rejected (deleted, expired early); the next get() recreates it."""
+        with self._lock:
+            for sig in [s for s, e in self._entries.items() if e["name"] == name]:
+                del self._entries[sig]
+
+    # --- Internal ---
+
+    def _create(self, client, sig, model_id, system_instruction, pinned_images, api_key, file_cache):
+        contents = []
+        if pinned_images:
+            contents = [types.Content(role="user", parts=[
+                self._image_part(client, api_key, path, file_cache) for path in pinned_images
+            ])]
+        try:
+            cache = client.caches.create(model=model_id, config=types.CreateCachedContentConfig(
+                system_instruction=system_instruction or None,
+                contents=contents or None,
+                ttl=f"{self.ttl_seconds}s",
+                display_name="nano-papl-chat",
+            ))
+        except Exception as e:
+            logger.warning(f"[ContextCache] Caching unavailable for {model_id}, sending prefix uncached: {e}")
+            with self._lock:
+                self._unavailable[sig] = time.time() + UNAVAILABLE_RETRY_SECONDS
+            return None
+
+        expires = getattr(cache, "expire_time", None)
+        entry = {"name": cache.name, "expires_at": expires.timestamp() if expires else time.time() + self.ttl_seconds}
+        with self._lock:
+            self._entries[sig] = entry
+        logger.info(f"[ContextCache] Created {cache.name} ({len(pinned_images)} pinned image(s), ttl {self.ttl_seconds}s)")
+        return cache.name
+
+    def _extend(self, client, sig, entry) -> bool:
+        try:
+            cache = client.caches.update(name=entry["name"], config=types.UpdateCachedContentConfig(ttl=f"{self.ttl_seconds}s"))
+        except Exception as e:
+            logger.warning(f"[ContextCache] Could not extend {entry['name']}, recreating: {e}")
+            with self._lock:
+                self._entries.pop(sig, None)
+            return False
+        expires = getattr(cache, "expire_time", None)
+        entry["expires_at"] = expires.timestamp() if expires else time.time() + self.ttl_seconds
+        return True
+
+    @staticmethod
+    def _image_part(client, api_key, path, file_cache):
+        p = Path(path)
+        handle = file_cache.upload(client, api_key, p) if file_cache else None
+        if handle:
+            return types.Part.from_uri(file_uri=handle["uri"], mime_type=handle["mime_type"])
+        return types.Part.from_bytes(data=p.read_bytes(), mime_type=image_utils.get_mime_type(p))
+
+    @staticmethod
+    def _signature(api_key, model_id, system_instruction, pinned_images, file_cache) -> str:
+        h = hashlib.sha1()
+        for piece in (key_fingerprint(api_key), model_id, system_instruction):
+            h.update(piece.encode("utf-8"))
+            h.update(b"\0")
+        for path in pinned_images:
+            digest = file_cache.content_hash(path) if file_cache else image_utils.hash_file(path)
+            h.update(digest.encode("ascii"))
+        return h.hexdigest()
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_context_cache() -> ContextCache:
+    """The application-wide context cache registry."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ContextCache()
+        return _default_cache
@@ -0,0 +1,149 @@
+"""Upload-once Gemini Files API handles for chat attachments."""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from core.logger import logger
+from core.utils import image_utils
+from core.utils.path_provider import PathProvider
+
+# Gemini keeps uploaded files for 48 hours
+DEFAULT_TTL_SECONDS = 48 * 3600
+# Handles this close to expiring are re-uploaded rather than risked in a request
+EXPIRY_MARGIN_SECONDS = 3600
+
+
+def key_fingerprint(api_key: str) -> str:
+    """Files belong to the API key's project; the key itself is never stored."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+
+class GeminiFileCache:
+    """
+    Maps (API key fingerprint, source content hash) -> Files API handle:
+
+        {"<key fp>": {"<sha1>": {"name": "files/abc", "uri": "https://...",
+                                 "mime_type": "image/png", "expires_at": 1767225600.0}}}
+
+    An attachment is uploaded once and later turns (and history entries)
+    refer to it by URI instead of inlining megabytes of image bytes.
+    Content hashes are memoised per (path, size, mtime), so an unchanged
+    file is read once per process. Saved atomically like ComfyUploadCache.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._keys = {}
+        self._hashes = {}  # (path, size, mtime) -> sha1
+        self._lock = threading.Lock()
+        self._load()
+
+    def get(self, api_key: str, content_hash: str) -> Optional[Dict]:
+        """The handle if it is known and not about to expire."""
+        with self._lock:
+            handle = self._keys.get(key_fingerprint(api_key), {}).get(content_hash)
+        if handle and handle.get("expires_at", 0) - EXPIRY_MARGIN_SECONDS > time.time():
+            return handle
+        return None
+
+    def put(self, api_key: str, content_hash: str, handle: Dict) -> None:
+        with self._lock:
+            self._keys.setdefault(key_fingerprint(api_key), {})[content_hash] = handle
+            self._prune_expired()
+        self.save()
+
+    def forget(self, api_key: str, content_hash: str) -> None:
+        with self._lock:
+            removed = self._keys.get(key_fingerprint(api_key), {}).pop(content_hash, None)
+        if removed:
+            self.save()
+
+    def content_hash(self, path: Path) -> str:
+        path = Path(path)
+        stat = path.stat()
+        sig = (str(path), stat.st_size, stat.st_mtime_ns)
+        digest = self._hashes.get(sig)
+        if digest is None:
+            digest = image_utils.hash_file(path)
+            self._hashes[sig] = digest
+        return digest
+
+    def upload(self, client, api_key: str, path: Path) -> Optional[Dict]:
+        """
+        Returns the handle for this file's content, uploading it only if no
+        live handle exists. None if the upload fails (caller inlines the bytes).
+        """
+        path = Path(path)
+        try:
+            digest = self.content_hash(path)
+        except OSError as e:
+            logger.warning(f"[GeminiFiles] Cannot hash {path.name}: {e}")
+            return None
+
+        handle = self.get(api_key, digest)
+        if handle:
+            return handle
+
+        mime = image_utils.get_mime_type(path)
+        try:
+            uploaded = client.files.upload(file=str(path), config={"mime_type": mime, "display_name": path.name})
+        except Exception as e:
+            logger.warning(f"[GeminiFiles] Upload of {path.name} failed, sending inline: {e}")
+            return None
+
+        expires = getattr(uploaded, "expiration_time", None)
+        handle = {
+            "name": uploaded.name,
+            "uri": uploaded.uri,
+            "mime_type": uploaded.mime_type or mime,
+            "expires_at": expires.timestamp() if expires else time.time() + DEFAULT_TTL_SECONDS,
+        }
+        self.put(api_key, digest, handle)
+        logger.info(f"[GeminiFiles] Uploaded {path.name} as {uploaded.name}")
+        return handle
+
+    def save(self) -> None:
+        with self._lock:
+            data = json.dumps(self._keys, indent=1)
+
+        tmp = self.path.with_suffix(".tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(data, encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.error(f"[GeminiFiles] Failed to save {self.path}: {e}")
+
+    # --- Internal ---
+
+    def _prune_expired(self):
+        now = time.time()
+        for handles in self._keys.values():
+            for digest in [d for d, h in handles.items() if h.get("expires_at", 0) <= now]:
+                del handles[digest]
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self._keys = {fp: dict(handles) for fp, handles in data.items() if isinstance(handles, dict)}
+        except Exception as e:
+            logger.warning(f"[GeminiFiles] Ignoring unreadable {self.path}: {e}")
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_file_cache() -> GeminiFileCache:
+    """The application-wide cache, stored next to the other caches."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = GeminiFileCache(PathProvider().get_gemini_file_cache_file())
+        return _default_cache
@@ -1,26 +1,55 @@
 import datetime
+import hashlib
+import random
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
 from pathlib import Path
 from PIL import Image
 import io
-import google.genai as genai
 from google.genai import types
 from core.utils.path_provider import PathProvider
 from core.utils import image_utils
+from core.services.client_registry import get_genai_client
+from core.services.rate_limiter import is_retryable_error, get_retry_delay_hint
 from core.logger import logger
 
+@dataclass
+class PreparedImage:
+    """Source image ready for upload: original file bytes plus header metadata."""
+    data: bytes
+    mime_type: str
+    size: tuple  # (width, height) read from the header only
+    _sha1: str = field(default="", repr=False)
+
+    @property
+    def sha1(self) -> str:
+        if not self._sha1:
+            self._sha1 = hashlib.sha1(self.data).hexdigest()
+        return self._sha1
+
+
 class GenerationService:
     """
     Service responsible for generating images using AI providers (currently Google GenAI).
     Handles API communication, image processing, and file saving.
     """
-    def __init__(self, api_key, model_id="gemini-3-pro-image-preview", timeout=600):
+    def __init__(self, api_key, model_id="gemini-3-pro-image-preview", timeout=600, rate_limiter=None, max_retries=5, result_cache=None, prepared_cache_size=4):
         self.api_key = api_key
         self.model_id = model_id
         self.timeout = timeout
-        if self.api_key:
-            self.client = genai.Client(api_key=self.api_key)
-        else:
-            self.client = None
+        # Optional RateLimiter shared by all request threads of a batch
+        self.rate_limiter = rate_limiter
+        self.max_retries = max_retries
+        # Optional ResultCache: identical requests are served from disk
+        self.result_cache = result_cache
+        # Small LRU of prepared source images: all prompts for one view share it
+        self.prepared_cache_size = prepared_cache_size
+        self._prepared = OrderedDict()
+        self._prepared_lock = threading.Lock()
+        # Shared client (and connection pool) from the process-wide registry
+        self.client = get_genai_client(self.api_key)
         
         self.path_provider = PathProvider()
 
@@ -50,30 +79,43 @@ class GenerationService:
             return {'success': False, 'error': "API Key missing"}
 
         try:
-            # 1. Prepare Image
-            with Image.open(image_path) as img:
-                img_data = io.BytesIO()
-                img.save(img_data, format=img.format)
-                img_bytes = img_data.getvalue()
-                
-                # Input resolution for comparison
-                in_w, in_h = img.size
-
-            # 2. Mime Type
-            mime_type = image_utils.get_mime_type(image_path)
-
-            # 3. Config
+            # 1. Prepare Image (original bytes, no re-encode; shared across prompts)
+            prepared = self.prepare_image(image_path)
+            img_bytes = prepared.data
+            mime_type = prepared.mime_type
+
+            # Input resolution for comparison
+            in_w, in_h = prepared.size
+
+            # 2. Config
             resolution = output_config.get('resolution', '1K')
             ratio_mode = output_config.get('ratio', '1:1')
             
             image_config_params = {"image_size": resolution}
             
             if ratio_mode == "Manual":
-                ratio_val = image_utils.get_smart_ratio(image_path)
-                image_config_params["aspect_ratio"] = ratio_val
+                image_config_params["aspect_ratio"] = image_utils.ratio_from_size(in_w, in_h)
             elif ratio_mode != "Auto": # If not Auto and not Manual, it's specific
                  image_config_params["aspect_ratio"] = ratio_mode
 
+            # 2.1 Result Cache (skips the API call entirely on a hit)
+            cache_key = None
+            if self.result_cache:
+                cache_key = self.result_cache.make_key(
+                    prepared.sha1,
+                    {
+                        "engine": "gemini",
+                        "model": self.model_id,
+                        "prompt": prompt_data['prompt'].strip(),
+                        **image_config_params
+                    }
+                )
+                cached = self.result_cache.get(cache_key)
+                if cached:
+                    result = self._save_generated_image(cached, prompt_data, image_path, output_config, (in_w, in_h))
+                    result['cache_hit'] = True
+                    return result
+
             # Correct way to set timeout in v1.0+ SDK via http_options
             gen_config = types.GenerateContentConfig(
                 response_modalities=["IMAGE", "TEXT"],
@@ -92,39 +134,89 @@ class GenerationService:
                 )
             ]
 
-            # 4. API Call
-            from core.logger import logger
-            logger.info(f"Sending request to Google API (model={self.model_id})...")
-            
-            try:
-                response = self.client.models.generate_content(
-                    model=self.model_id,
-                    contents=contents,
-                    config=gen_config
-                )
-                logger.info("Google API response received.")
-            except Exception as e:
-                logger.error(f"Google API Error/Timeout: {e}")
-                return {'success': False, 'error': f"API Error: {str(e)}"}
+            # 3. API Call (rate limited, retried on 429/503)
+            attempt = 0
+            while True:
+                # Only the first attempt counts against the daily budget
+                if self.rate_limiter and not self.rate_limiter.acquire(charge=attempt == 0):
+                    if self.rate_limiter.is_exhausted:
+                        return {'success': False, 'error': "Daily request limit (RPD) reached", 'quota_exhausted': True}
+                    return {'success': False, 'error': "Cancelled before sending", 'cancelled': True}
 
-            # 5. Process Response
+                logger.info(f"Sending request to Google API (model={self.model_id})...")
+                try:
+                    response = self.client.models.generate_content(
+                        model=self.model_id,
+                        contents=contents,
+                        config=gen_config
+                    )
+                    logger.info("Google API response received.")
+                    if self.rate_limiter:
+                        self.rate_limiter.on_success()
+                    break
+                except Exception as e:
+                    if is_retryable_error(e) and attempt < self.max_retries:
+                        if self.rate_limiter:
+                            self.rate_limiter.on_throttled(attempt, get_retry_delay_hint(e))
+                        else:
+                            time.sleep(min(60, 2 ** (attempt + 1)) * random.uniform(0.5, 1.0))
+                        attempt += 1
+                        continue
+                    logger.error(f"Google API Error/Timeout: {e}")
+                    return {'success': False, 'error': f"API Error: {str(e)}"}
+
+            # 4. Process Response
             if response.parts:
                 for part in response.parts:
                     if part.inline_data:
-                        # 6. Save & Verify
-                         return self._save_generated_image(
+                        if cache_key:
+                            self.result_cache.put(cache_key, part.inline_data.data)
+
+                        # 5. Save & Verify
+                        result = self._save_generated_image(
                             part.inline_data.data, 
                             prompt_data, 
                             image_path, 
                             output_config,
                             (in_w, in_h)
                         )
+                        if cache_key:
+                            result['cache_hit'] = False
+                        return result
             
             return {'success': False, 'error': "No image in response"}
 
         except Exception as e:
             return {'success': False, 'error': str(e)}
 
+    def prepare_image(self, image_path: Path) -> PreparedImage:
+        """
+        Reads a source image once and returns its original bytes unchanged,
+        with the pixel size taken from the header (no full decode).
+        Memoised by (path, size, mtime) so repeated prompts on the same view
+        reuse the same buffer.
+        """
+        image_path = Path(image_path)
+        st = image_path.stat()
+        sig = (str(image_path), st.st_size, st.st_mtime_ns)
+
+        with self._prepared_lock:
+            prepared = self._prepared.get(sig)
+            if prepared:
+                self._prepared.move_to_end(sig)
+                return prepared
+
+        data = image_path.read_bytes()
+        with Image.open(io.BytesIO(data)) as img:
+            size = img.size  # header only, pixels are never decoded
+        prepared = PreparedImage(data, image_utils.get_mime_type(image_path), size)
+
+        with self._prepared_lock:
+            self._prepared[sig] = prepared
+            while len(self._prepared) > self.prepared_cache_size:
+                self._prepared.popitem(last=False)
+        return prepared
+
     def _save_generated_image(self, img_data: bytes, prompt_data: dict, source_path: Path, config: dict, input_size: tuple) -> dict:
         try:
             generated_img = Image.open(io.BytesIO(img_data))
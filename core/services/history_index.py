@@ -0,0 +1,137 @@
+"""SQLite index of chat session metadata (the sidebar's data source)."""
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from core.logger import logger
+
+SCHEMA_VERSION = 1
+
+
+class HistoryIndex:
+    """
+    One small row per session (id, title, folder, timestamps) plus the list of
+    folders. Messages stay in the session files; HistoryManager keeps this
+    index in step with every write, so listing never opens a session file.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        try:
+            self._conn = self._open()
+        except sqlite3.DatabaseError as e:
+            # Only derived data lives here: start over and let the caller re-import
+            logger.warning(f"[HistoryIndex] Recreating unreadable index {self.db_path}: {e}")
+            self.db_path.unlink(missing_ok=True)
+            self._conn = self._open()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                title TEXT NOT NULL,
+                folder TEXT NOT NULL DEFAULT '',
+                created_at TEXT NOT NULL DEFAULT '',
+                updated_at TEXT NOT NULL DEFAULT ''
+            );
+            CREATE INDEX IF NOT EXISTS idx_sessions_folder_updated ON sessions (folder, updated_at DESC);
+            CREATE TABLE IF NOT EXISTS folders (name TEXT PRIMARY KEY);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+        """)
+        return conn
+
+    # --- Migration state ---
+
+    @property
+    def populated(self) -> bool:
+        """True once an initial import has been recorded for this schema version."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        return row is not None and int(row["value"]) == SCHEMA_VERSION
+
+    def replace_all(self, sessions: Iterable[Dict], folders: Iterable[str]) -> None:
+        """Rebuilds the index in one transaction and marks it populated."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sessions")
+            self._conn.execute("DELETE FROM folders")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO sessions (id, title, folder, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                [self._row(s) for s in sessions]
+            )
+            self._conn.executemany("INSERT OR IGNORE INTO folders (name) VALUES (?)", [(f,) for f in folders])
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+
+    # --- Sessions ---
+
+    def upsert(self, session: Dict) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, title, folder, created_at, updated_at) VALUES (?, ?, ?, ?, ?)",
+                self._row(session)
+            )
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, title, folder, created_at, updated_at FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def remove(self, session_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def sessions(self) -> List[Dict]:
+        """All sessions as {'id', 'title', 'updated_at', 'folder'}, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, title, updated_at, folder FROM sessions ORDER BY updated_at DESC"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    # --- Folders ---
+
+    def add_folder(self, name: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO folders (name) VALUES (?)", (name,))
+
+    def remove_folder(self, name: str) -> None:
+        """Drops the folder and every session in it (or in its subfolders)."""
+        prefix = name.rstrip("/\\")
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM folders WHERE name = ?", (name,))
+            self._conn.execute(
+                "DELETE FROM sessions WHERE folder = ? OR folder LIKE ? ESCAPE '!' OR folder LIKE ? ESCAPE '!'",
+                (prefix, self._like_prefix(prefix, "/"), self._like_prefix(prefix, "\\"))
+            )
+
+    def folders(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT name FROM folders ORDER BY name").fetchall()
+        return [row["name"] for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # --- Internal ---
+
+    @staticmethod
+    def _row(session: Dict):
+        return (
+            session["id"],
+            session.get("title", "Untitled"),
+            session.get("folder", "") or "",
+            session.get("created_at", ""),
+            session.get("updated_at", ""),
+        )
+
+    @staticmethod
+    def _like_prefix(prefix: str, sep: str) -> str:
+        escaped = prefix.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+        return f"{escaped}{sep}%"
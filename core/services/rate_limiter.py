@@ -0,0 +1,160 @@
+"""Quota-aware request scheduler for Gemini API calls."""
+import random
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from core.logger import logger
+
+# HTTP codes that mean "slow down" rather than "this request is wrong"
+RETRYABLE_STATUS_CODES = {429, 503}
+RETRYABLE_STATUSES = {"RESOURCE_EXHAUSTED", "UNAVAILABLE"}
+# google.genai errors render as "<code> <STATUS>. {...}"; only that leading code counts
+_LEADING_STATUS_CODE = re.compile(r"^\s*(\d{3})\b")
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """
+    Returns True for quota / overload errors that are safe to retry.
+    These are rejected before generation, so retrying does not re-bill.
+    """
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code in RETRYABLE_STATUS_CODES
+    if getattr(error, "status", None) in RETRYABLE_STATUSES:
+        return True
+    match = _LEADING_STATUS_CODE.match(str(error))
+    return bool(match) and int(match.group(1)) in RETRYABLE_STATUS_CODES
+
+
+def get_retry_delay_hint(error: Exception) -> Optional[float]:
+    """Extracts the server-suggested 'retryDelay' (e.g. '37s') if present."""
+    match = re.search(r"retryDelay['\"]?\s*:\s*['\"]?(\d+(?:\.\d+)?)s", str(error))
+    return float(match.group(1)) if match else None
+
+
+class RateLimiter:
+    """
+    Token-bucket scheduler with AIMD rate adaptation and a daily budget.
+
+    - RPM: tokens refill at the current rate; the rate starts at the RPM
+      ceiling, is halved on every 429/503 and grows back additively on success.
+    - RPD: requests issued today (including the count already stored in
+      AppConfig.api_usage) are never allowed to exceed the daily budget.
+      A request is charged once; its retries (acquire(charge=False)) are not,
+      matching track_api_usage, which counts one response per request.
+    - Backoff: a throttle pauses *all* callers, since the quota is shared.
+
+    Thread-safe; one instance is shared by all request threads of a batch.
+    """
+
+    def __init__(self, rpm: int = 20, rpd: int = 0, used_today: int = 0,
+                 burst: Optional[int] = None, base_backoff: float = 2.0, max_backoff: float = 60.0):
+        self.max_rate = max(1, rpm) / 60.0  # tokens per second
+        self.min_rate = self.max_rate / 16
+        self.rate = self.max_rate
+        self.capacity = burst if burst else max(1, round(rpm / 10))
+        self.tokens = float(self.capacity)
+
+        self.rpd = rpd  # 0 = unlimited
+        self.used_today = used_today
+        self.day = datetime.now().strftime("%Y-%m-%d")
+
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._cancelled = False
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_config(cls, config) -> "RateLimiter":
+        """Builds a limiter from AppConfig limits and today's usage counter."""
+        usage = config.api_usage if isinstance(config.api_usage, dict) else {}
+        used = usage.get("count", 0) if usage.get("date") == datetime.now().strftime("%Y-%m-%d") else 0
+        return cls(rpm=config.gemini_rpm, rpd=config.gemini_rpd, used_today=used)
+
+    # --- Scheduling ---
+
+    def acquire(self, charge: bool = True) -> bool:
+        """
+        Blocks until a request may be sent.
+        charge=False for a retry of a request already counted against the RPD budget.
+        Returns False if the daily budget is exhausted or cancel() was called.
+        """
+        with self._cond:
+            while True:
+                if self._cancelled:
+                    return False
+                self._roll_day()
+                if charge and self.rpd and self.used_today >= self.rpd:
+                    return False
+
+                now = time.monotonic()
+                self._refill(now)
+
+                if now < self._paused_until:
+                    wait_time = self._paused_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    if charge:
+                        self.used_today += 1
+                    return True
+                else:
+                    wait_time = (1 - self.tokens) / self.rate
+
+                self._cond.wait(timeout=min(wait_time, 1.0))
+
+    def on_success(self):
+        """Additive increase: recover towards the RPM ceiling."""
+        with self._cond:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+    def on_throttled(self, attempt: int, hint: Optional[float] = None) -> float:
+        """
+        Multiplicative decrease plus a shared, jittered pause.
+        Returns the chosen backoff delay in seconds.
+        """
+        with self._cond:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+
+            ceiling = min(self.max_backoff, self.base_backoff * (2 ** attempt))
+            delay = random.uniform(ceiling / 2, ceiling)
+            if hint:
+                delay = max(delay, hint)
+
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self._cond.notify_all()
+
+        logger.warning(f"[RateLimiter] Throttled (attempt {attempt + 1}). "
+                       f"Backing off {delay:.1f}s, rate now {self.rate * 60:.1f} RPM")
+        return delay
+
+    def cancel(self):
+        """Wakes all waiting callers and makes further acquire() calls fail."""
+        with self._cond:
+            self._cancelled = True
+            self._cond.notify_all()
+
+    @property
+    def is_exhausted(self) -> bool:
+        with self._cond:
+            self._roll_day()
+            return bool(self.rpd) and self.used_today >= self.rpd
+
+    # --- Internal ---
+
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+
+    def _roll_day(self):
+        today = datetime.now().strftime("%Y-%m-%d")
+        if today != self.day:
+            self.day = today
+            self.used_today = 0
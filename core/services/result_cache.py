@@ -0,0 +1,124 @@
+"""Content-addressed on-disk cache of generated images."""
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from core.logger import logger
+
+
+class ResultCache:
+    """
+    Stores generated image bytes keyed by a hash of the source image content
+    and the normalized request parameters, so identical requests are never
+    sent (and billed) twice.
+
+    Eviction is LRU by file mtime (touched on every hit) and bounded by
+    max_bytes. The index is rebuilt from a single directory scan at startup.
+    Thread-safe.
+    """
+    EXTENSION = ".bin"
+
+    def __init__(self, cache_dir: Path, max_bytes: int = 2 * 1024 ** 3):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._entries = {}  # key -> (size, last_used)
+        self._total_bytes = 0
+        self._clock = 0.0
+        self._scan()
+
+    @staticmethod
+    def make_key(image_hash: str, params: dict) -> str:
+        """Key = sha256(source image hash + canonical JSON of request params)."""
+        canonical = json.dumps(params, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(f"{image_hash}|{canonical}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Returns cached bytes (and marks them recently used) or None."""
+        path = self._path(key)
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._forget(key)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self._entries[key] = (len(data), self._tick())
+            self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Stores bytes atomically (temp file + rename), then evicts LRU entries."""
+        path = self._path(key)
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        try:
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            logger.error(f"[ResultCache] Failed to store {key}: {e}")
+            tmp.unlink(missing_ok=True)
+            return
+
+        with self._lock:
+            self._forget(key)
+            self._entries[key] = (len(data), self._tick())
+            self._total_bytes += len(data)
+            self._evict()
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    # --- Internal ---
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{self.EXTENSION}"
+
+    def _scan(self):
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(self.EXTENSION):
+                    st = entry.stat()
+                    key = entry.name[:-len(self.EXTENSION)]
+                    self._entries[key] = (st.st_size, st.st_mtime)
+                    self._total_bytes += st.st_size
+                    self._clock = max(self._clock, st.st_mtime)
+        with self._lock:
+            self._evict()
+
+    def _tick(self) -> float:
+        """Strictly increasing 'last used' stamp (wall clock, tie-broken)."""
+        self._clock = max(time.time(), self._clock + 1e-6)
+        return self._clock
+
+    def _forget(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry:
+            self._total_bytes -= entry[0]
+
+    def _evict(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        for key, _ in sorted(self._entries.items(), key=lambda kv: kv[1][1]):
+            if self._total_bytes <= self.max_bytes:
+                break
+            self._forget(key)
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
@@ -0,0 +1,130 @@
+"""Append-only journal of finished batch tasks, used to resume interrupted runs."""
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from core import constants
+from core.utils.image_utils import hash_file
+from core.logger import logger
+
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+
+class TaskJournal:
+    """
+    One JSONL file per output directory. Every line is a small record:
+
+        {"t": "task", "key": "...", "status": "done", "path": "...", "ts": 1740003322}
+        {"t": "hash", "path": "...", "size": 123, "mtime": 456, "sha1": "..."}
+
+    Appending costs one short write; loading is a single sequential scan where
+    the last record per key wins. A torn last line (crash mid-write) is ignored.
+    Hash records memoise source image digests so unchanged files are not
+    re-read on the next run.
+    """
+
+    def __init__(self, output_dir: Path):
+        self.path = Path(output_dir) / constants.TASK_JOURNAL_FILE_NAME
+        self._tasks = {}   # key -> record
+        self._hashes = {}  # (path, size, mtime_ns) -> sha1
+        self._lock = threading.Lock()
+        self._needs_newline = False
+        self._load()
+
+    @staticmethod
+    def make_key(project: str, image_hash: str, prompt: str, resolution: str, ratio: str) -> str:
+        """Stable task identity: (project, source image hash, prompt hash, resolution, ratio)."""
+        prompt_hash = hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+        raw = "|".join([project, image_hash, prompt_hash, resolution, ratio])
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+    def task_key(self, project_name: str, image_path: Path, prompt: str, resolution: str, ratio: str) -> Optional[str]:
+        """
+        Returns the journal key for a task, or None if the source image can't be
+        hashed (such tasks simply always run and are never recorded).
+        """
+        try:
+            return self.make_key(project_name, self.image_hash(image_path), prompt, resolution, ratio)
+        except Exception as e:
+            logger.warning(f"[TaskJournal] Cannot hash {image_path}: {e}")
+            return None
+
+    def image_hash(self, image_path: Path) -> str:
+        """Content hash of a source image, memoised by (path, size, mtime)."""
+        st = image_path.stat()
+        sig = (str(image_path.resolve()), st.st_size, st.st_mtime_ns)
+        with self._lock:
+            cached = self._hashes.get(sig)
+        if cached:
+            return cached
+
+        digest = hash_file(image_path)
+        with self._lock:
+            self._hashes[sig] = digest
+        self._append({"t": "hash", "path": sig[0], "size": sig[1], "mtime": sig[2], "sha1": digest})
+        return digest
+
+    def is_done(self, key: str) -> bool:
+        """True if the task finished successfully and its output still exists."""
+        if key is None:
+            return False
+        with self._lock:
+            record = self._tasks.get(key)
+        if not record or record.get("status") != STATUS_DONE:
+            return False
+        saved = record.get("path")
+        return not saved or Path(saved).exists()
+
+    def mark(self, key: str, status: str, saved_path: Optional[Path] = None) -> None:
+        if key is None:
+            return
+        record = {"t": "task", "key": key, "status": status, "ts": int(time.time())}
+        if saved_path:
+            record["path"] = str(saved_path)
+        with self._lock:
+            self._tasks[key] = record
+        self._append(record)
+
+    def mark_done(self, key: str, saved_path: Optional[Path] = None) -> None:
+        self.mark(key, STATUS_DONE, saved_path)
+
+    def mark_failed(self, key: str) -> None:
+        self.mark(key, STATUS_FAILED)
+
+    # --- Internal ---
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    self._needs_newline = not line.endswith("\n")
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn write
+                    if record.get("t") == "hash":
+                        sig = (record["path"], record["size"], record["mtime"])
+                        self._hashes[sig] = record["sha1"]
+                    elif "key" in record:
+                        self._tasks[record["key"]] = record
+        except Exception as e:
+            logger.error(f"[TaskJournal] Failed to read {self.path}: {e}")
+
+    def _append(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._needs_newline:
+                line = "\n" + line
+                self._needs_newline = False
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+            except Exception as e:
+                logger.error(f"[TaskJournal] Failed to append to {self.path}: {e}")
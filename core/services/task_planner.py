@@ -0,0 +1,126 @@
+"""Single-pass workload planning for batch generation (Gemini and ComfyUI)."""
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from core.constants import API_PRICING
+from core.utils import prompt_parser
+from core.utils.image_utils import SUPPORTED_IMAGE_FORMATS
+from core.utils.path_provider import PathProvider
+
+
+@dataclass(frozen=True)
+class BatchTask:
+    """One (source image, prompt block) pair to generate."""
+    project_dir: Path
+    image_path: Path
+    title: str
+    prompt: str
+
+    @property
+    def prompt_data(self) -> Dict:
+        """Prompt block in the {'title', 'prompt'} shape used by the services."""
+        return {"title": self.title, "prompt": self.prompt}
+
+
+@dataclass(frozen=True)
+class TaskPlan:
+    """
+    Immutable result of scanning the input folder once.
+    Feeds the progress total, the executor, dry-run previews and cost estimates.
+    """
+    projects: Tuple[Path, ...] = ()
+    tasks: Tuple[BatchTask, ...] = ()
+
+    @property
+    def total(self) -> int:
+        return len(self.tasks)
+
+    def estimate_cost(self, resolution: str, task_count: Optional[int] = None) -> float:
+        """Estimated API cost in USD (see constants.API_PRICING)."""
+        count = self.total if task_count is None else task_count
+        return count * API_PRICING.get(resolution, API_PRICING["DEFAULT"])
+
+    def count_by_project(self) -> Dict[str, int]:
+        counts = {}
+        for task in self.tasks:
+            counts[task.project_dir.name] = counts.get(task.project_dir.name, 0) + 1
+        return counts
+
+
+@dataclass
+class BatchSummary:
+    """Outcome of one batch run, shared by the Gemini runner and the ComfyUI orchestrator."""
+    total: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    stopped: bool = False
+    error: Optional[str] = None  # set when the batch could not start at all
+
+    @property
+    def skipped(self) -> int:
+        """Tasks never attempted (stopped early)."""
+        return max(0, self.total - self.succeeded - self.failed)
+
+
+def find_projects(input_path: Path, path_provider: PathProvider) -> Tuple[Path, ...]:
+    """
+    Smart folder logic: the input is either a project itself (has prompts.md)
+    or a root folder whose subdirectories are projects.
+    """
+    if path_provider.get_prompts_file(input_path).exists():
+        return (input_path,)
+    return tuple(d for d in input_path.iterdir() if d.is_dir())
+
+
+def plan_batch(
+    input_path: Path,
+    path_provider: Optional[PathProvider] = None,
+    log: Optional[Callable[[str], None]] = None,
+    should_stop: Optional[Callable[[], bool]] = None
+) -> TaskPlan:
+    """
+    Walks every project exactly once: one prompts.md parse and one image
+    directory listing per project.
+
+    Args:
+        input_path: Single project folder or root of several projects.
+        path_provider: PathProvider used for the standard folder layout.
+        log: Optional callback for user-facing messages.
+        should_stop: Optional callback; planning aborts early when it returns True.
+    """
+    path_provider = path_provider or PathProvider()
+    log = log or (lambda msg: None)
+    should_stop = should_stop or (lambda: False)
+
+    projects = find_projects(input_path, path_provider)
+    if len(projects) == 1 and projects[0] == input_path:
+        log(f"Detected Single Project Mode: {input_path.name}")
+
+    tasks = []
+    for project_dir in projects:
+        if should_stop(): break
+
+        # Smart Image Source
+        image_source_dir = path_provider.get_optimized_dir(project_dir)
+        if not image_source_dir.exists():
+            image_source_dir = project_dir
+        else:
+            log(f"  [INFO] '{project_dir.name}': using optimized images from 'optimized' subfolder")
+
+        prompt_path = path_provider.get_prompts_file(project_dir)
+        prompts_data = prompt_parser.parse_markdown_prompts(prompt_path)
+        if not prompts_data:
+            log(f"Skipping '{project_dir.name}': Prompts file empty or missing valid prompt blocks.")
+            continue
+
+        images = [f for f in image_source_dir.iterdir() if f.suffix.lower() in SUPPORTED_IMAGE_FORMATS]
+        if not images:
+            log(f"Skipping '{project_dir.name}': No images found.")
+            continue
+
+        for img_path in images:
+            for data in prompts_data:
+                tasks.append(BatchTask(project_dir, img_path, data["title"], data["prompt"]))
+
+    return TaskPlan(projects=projects, tasks=tuple(tasks))
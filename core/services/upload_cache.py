@@ -0,0 +1,67 @@
+"""Persistent record of source images already uploaded to ComfyUI servers."""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+from core.logger import logger
+
+
+class ComfyUploadCache:
+    """
+    Maps (server URL, source content hash) -> filename in the server's input folder.
+
+        {"http://127.0.0.1:8188": {"<sha1>": "nanopapl_<sha1[:20]>.png"}}
+
+    Upload names are content-addressed, so a name that still exists on the
+    server holds identical bytes and the upload can be skipped on later runs.
+    Saved atomically (temp file + rename) and only when something changed.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._servers = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def get(self, server_url: str, content_hash: str) -> Optional[str]:
+        with self._lock:
+            return self._servers.get(server_url, {}).get(content_hash)
+
+    def put(self, server_url: str, content_hash: str, server_name: str) -> None:
+        with self._lock:
+            self._servers.setdefault(server_url, {})[content_hash] = server_name
+            self._dirty = True
+
+    def forget(self, server_url: str, content_hash: str) -> None:
+        with self._lock:
+            if self._servers.get(server_url, {}).pop(content_hash, None):
+                self._dirty = True
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self._servers, indent=1)
+            self._dirty = False
+
+        tmp = self.path.with_suffix(".tmp")
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(data, encoding="utf-8")
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logger.error(f"[ComfyUploadCache] Failed to save {self.path}: {e}")
+
+    # --- Internal ---
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self._servers = {url: dict(names) for url, names in data.items() if isinstance(names, dict)}
+        except Exception as e:
+            logger.warning(f"[ComfyUploadCache] Ignoring unreadable {self.path}: {e}")
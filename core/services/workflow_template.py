@@ -0,0 +1,44 @@
+"""Precompiled ComfyUI workflow template with known patch points."""
+import hashlib
+import json
+from typing import Dict, Optional
+
+
+class WorkflowTemplate:
+    """
+    A workflow loaded once per batch. render() builds the per-task payload by
+    copying only the nodes that get patched (LOAD_IMAGE / GEMINI_PROMPT /
+    SAVE_IMAGE from node_mapping); every other node is shared with the
+    template instead of being deep-copied.
+
+    Payloads are meant to be serialised and sent, not edited: mutate only the
+    patched nodes' inputs.
+    """
+    ROLES = ("LOAD_IMAGE", "GEMINI_PROMPT", "SAVE_IMAGE")
+
+    def __init__(self, workflow: Dict, node_mapping: Dict):
+        self.workflow = workflow
+        # role -> node id, for roles whose node actually exists in this workflow
+        self.patch_points = {
+            role: node_mapping.get(role) for role in self.ROLES
+            if node_mapping.get(role) in workflow
+        }
+        self.hash = hashlib.sha1(json.dumps(workflow, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def node_id(self, role: str) -> Optional[str]:
+        return self.patch_points.get(role)
+
+    def render(self, patches: Dict[str, Dict]) -> Dict:
+        """
+        Returns a payload with `patches` ({role: {input_name: value}}) applied.
+        Roles missing from the workflow are ignored.
+        """
+        payload = dict(self.workflow)
+        for role, inputs in patches.items():
+            node_id = self.patch_points.get(role)
+            if node_id is None:
+                continue
+            node = dict(self.workflow[node_id])
+            node["inputs"] = {**node.get("inputs", {}), **inputs}
+            payload[node_id] = node
+        return payload
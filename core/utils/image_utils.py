@@ -2,6 +2,7 @@ from PIL import Image
 import os
 import re
 import hashlib
+from io import BytesIO
 from pathlib import Path
 from typing import Tuple, Optional, Union
 from core.utils.path_provider import PathProvider
@@ -17,26 +18,40 @@ def get_smart_ratio(image_path):
     Returns string format "W:H" (e.g., "16:9").
     """
     with Image.open(image_path) as img:
-        w, h = img.size
-        # If w or h is 0, avoid division by zero (unlikely for valid image)
-        if h == 0: return "1:1" 
-        
-        target = w / h
-        # Get ratios from the central truth table
-        common = []
-        for ratio_str in RESOLUTION_TABLE.keys():
-            try:
-                rw, rh = map(int, ratio_str.split(':'))
-                common.append((rw, rh))
-            except ValueError:
-                continue
+        return ratio_from_size(*img.size)
+
+def ratio_from_size(w: int, h: int) -> str:
+    """Closest standard aspect ratio ("W:H") for the given pixel size."""
+    # If w or h is 0, avoid division by zero (unlikely for valid image)
+    if h == 0: return "1:1" 
+    
+    target = w / h
+    # Get ratios from the central truth table
+    common = []
+    for ratio_str in RESOLUTION_TABLE.keys():
+        try:
+            rw, rh = map(int, ratio_str.split(':'))
+            common.append((rw, rh))
+        except ValueError:
+            continue
 
-        if not common:
-            # Fallback to standard 10 if table parsing fails
-            common = [(1, 1), (16, 9), (9, 16), (4, 3), (3, 4), (3, 2), (2, 3), (5, 4), (4, 5), (21, 9)]
+    if not common:
+        # Fallback to standard 10 if table parsing fails
+        common = [(1, 1), (16, 9), (9, 16), (4, 3), (3, 4), (3, 2), (2, 3), (5, 4), (4, 5), (21, 9)]
 
-        best = min(common, key=lambda r: abs(target - r[0]/r[1]))
-        return f"{best[0]}:{best[1]}"
+    best = min(common, key=lambda r: abs(target - r[0]/r[1]))
+    return f"{best[0]}:{best[1]}"
+
+def hash_file(path: Union[str, Path], chunk_size: int = 1024 * 1024) -> str:
+    """
+    Returns the SHA-1 hex digest of a file's content, read in chunks.
+    Used as a content identity for source images (journal, result cache).
+    """
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
 
 def get_or_create_thumbnail(image_path: Union[str, Path], target_width: int = 400) -> str:
     """
@@ -206,6 +221,25 @@ def get_mime_type(file_path) -> str:
     return mime_map.get(file_path.suffix.lower(), 'image/png')
 
 
+def get_extension_from_bytes(data: bytes, default: str = ".png") -> str:
+    """
+    File extension matching the encoded image (reads the header only).
+    
+    Args:
+        data: Encoded image bytes
+        default: Returned when the format is not recognised
+        
+    Returns:
+        Extension with dot (e.g., '.png', '.jpg', '.webp')
+    """
+    ext_map = {'PNG': '.png', 'JPEG': '.jpg', 'WEBP': '.webp', 'BMP': '.bmp', 'TIFF': '.tif'}
+    try:
+        with Image.open(BytesIO(data)) as img:
+            return ext_map.get(img.format, default)
+    except Exception:
+        return default
+
+
 def clean_stem(stem: str) -> str:
     """
     Remove common suffixes like '_optimized' from filename stems.
@@ -33,3 +33,14 @@ def generate_filename(original_stem: str, prompt_title: str, extension: str = ""
         filename += extension
         
     return filename
+
+def format_eta(seconds: int) -> str:
+    """Compact remaining-time label: '45s', '3m 20s', '1h 5m'."""
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        m, s = divmod(seconds, 60)
+        return f"{m}m {s}s"
+    h, rem = divmod(seconds, 3600)
+    m, s = divmod(rem, 60)
+    return f"{h}h {m}m"
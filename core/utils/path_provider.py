@@ -57,3 +57,17 @@ class PathProvider:
         path = self.default_project_dir / constants.THUMBNAILS_DIR_NAME
         path.mkdir(parents=True, exist_ok=True)
         return path
+
+    def get_result_cache_dir(self) -> Path:
+        """Returns the on-disk cache of generated results (content-addressed)."""
+        path = self.default_project_dir / constants.RESULT_CACHE_DIR_NAME
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def get_comfy_upload_cache_file(self) -> Path:
+        """Returns the record of source images already uploaded to ComfyUI servers."""
+        return self.default_project_dir / constants.COMFY_UPLOAD_CACHE_FILE_NAME
+
+    def get_gemini_file_cache_file(self) -> Path:
+        """Returns the record of chat attachments uploaded to the Gemini Files API."""
+        return self.default_project_dir / constants.GEMINI_FILE_CACHE_FILE_NAME
@@ -1,40 +1,76 @@
-from PySide6.QtCore import QThread, Signal
-import traceback
+from PySide6.QtCore import QObject, Signal
+from core.jobs import Job, CancellationToken, get_executor, ERROR, FINISHED, PROGRESS, RESULT
 
-class BaseWorker(QThread):
+class BaseWorker(QObject):
     """
     Standard base class for all background tasks.
-    Provides uniform signaling and error handling.
+    Thin Qt adapter over core.jobs: execute() runs as a Job on the shared
+    executor and the job's events are re-emitted as Qt signals
+    (cross-thread emits are queued to the receivers' thread).
+
+    Keeps the QThread-style start() / isRunning() / wait() used by the pages.
     """
     progress_signal = Signal(float)
     result_signal = Signal(object)
     error_signal = Signal(str)
     finished_signal = Signal()
 
-    def __init__(self, parent=None):
+    # Job event kind -> signal attribute name
+    EVENT_SIGNALS = {
+        PROGRESS: "progress_signal",
+        RESULT: "result_signal",
+        ERROR: "error_signal",
+        FINISHED: "finished_signal",
+    }
+
+    def __init__(self, parent=None, executor=None):
         super().__init__(parent)
-        self.is_running = True
+        self.token = CancellationToken()
+        self.executor = executor
+        self.job = None
+        self._finished = False
+
+    @property
+    def is_running(self):
+        """False once stop() was requested or the job has finished."""
+        return not self.token.cancelled and not self._finished
 
     def stop(self):
         """Request the worker to stop gracefully."""
-        self.is_running = False
+        self.token.cancel()
+
+    def start(self):
+        """Submits execute() to the executor (shared one unless given)."""
+        if self.isRunning():
+            return
+        self._finished = False
+        self.job = Job(lambda job: self.execute(), name=type(self).__name__, token=self.token)
+        self.job.subscribe(self._on_job_event)
+        (self.executor or get_executor()).submit(self.job)
+
+    def isRunning(self):
+        return self.job is not None and not self.job.done
+
+    def wait(self, msecs=None):
+        """Blocks until the job finished; msecs=None waits forever. False on timeout."""
+        if self.job is None:
+            return True
+        return self.job.wait(None if msecs is None else msecs / 1000)
 
     def run(self):
-        """
-        Internal QThread run method. 
-        Calls the execute() method which must be overridden.
-        """
-        try:
-            self.execute()
-        except Exception as e:
-            # Capture full traceback for easier debugging if needed, 
-            # but emit a clean error message.
-            error_detail = traceback.format_exc()
-            print(f"Worker Error:\n{error_detail}")
-            self.error_signal.emit(str(e))
-        finally:
-            self.is_running = False
-            self.finished_signal.emit()
+        """Runs execute() inline on the calling thread, with the same signals."""
+        job = Job(lambda job: self.execute(), name=type(self).__name__, token=self.token)
+        job.subscribe(self._on_job_event)
+        job.run()
+
+    def _on_job_event(self, event):
+        if event.kind == FINISHED:
+            self._finished = True
+        name = self.EVENT_SIGNALS.get(event.kind)
+        if name is None:
+            return
+        args = tuple(str(a) for a in event.args) if event.kind == ERROR else event.args
+        getattr(self, name).emit(*args)
 
     def execute(self):
         """
@@ -1,3 +1,4 @@
+from PySide6.QtCore import Signal
 from core.workers.base_worker import BaseWorker
 from PIL import Image
 from core.llm_client import LLMClient
@@ -5,10 +6,13 @@ from core.utils import config_helper, image_utils
 from core.utils.path_provider import PathProvider
 from core import constants
 from core.models import GenerationConfig, GenerationResult
+from core.services.chat_context import ChatContextManager, DEFAULT_MAX_TOKENS, DEFAULT_KEEP_TURNS
+from core.logger import logger
 from pathlib import Path
 import os
 import datetime
 import time
+import uuid
 from io import BytesIO
 
 class ChatWorker(BaseWorker):
@@ -18,32 +22,57 @@ class ChatWorker(BaseWorker):
     """
     # Keep response_signal for compatibility with ChatInterface for now
     response_signal = BaseWorker.result_signal 
+    # Text delta of a streamed reply; partial_text holds everything received so far
+    chunk_signal = Signal(str)
 
-    def __init__(self, api_key: str, config: GenerationConfig, history: list, user_message: str, image_paths=None, session_id=None, parent=None):
-        super().__init__(parent)
+    def __init__(self, api_key: str, config: GenerationConfig, history: list, user_message: str, image_paths=None, session_id=None, parent=None, pinned_images=None, executor=None):
+        super().__init__(parent, executor=executor)
         self.api_key = api_key
         self.config = config
         self.history = history
         self.user_message = user_message
         self.image_paths = image_paths or []
+        self.pinned_images = pinned_images or []  # Session reference images, sent every turn
         self.session_id = session_id
+        self.partial_text = ""
         
         # Load System Instruction
         app_config = config_helper.load_config()
         self.system_instruction = app_config.get("system_instruction", config_helper.DEFAULT_SYSTEM_INSTRUCTION)
+        self.context_manager = ChatContextManager(
+            app_config.get("chat_context_tokens", DEFAULT_MAX_TOKENS),
+            app_config.get("chat_keep_turns", DEFAULT_KEEP_TURNS)
+        )
+        self.streaming = app_config.get("chat_streaming", True)
+        self.context_cache = app_config.get("chat_context_cache", False)
+        self.file_uploads = app_config.get("chat_file_uploads", False)
 
     def execute(self):
         start_time = time.time()
         client = LLMClient("gemini", self.config.model_id, self.api_key)
+
+        # Fit history into the token budget (older turns condensed or dropped)
+        context = self.context_manager.build(
+            self.history, self.user_message, self.system_instruction, len(self.image_paths) + len(self.pinned_images)
+        )
+        if self.context_cache:
+            # Keep the instruction identical across turns so its cache stays valid
+            history, instruction = context.history_with_summary(), context.base_instruction
+        else:
+            history, instruction = context.history, context.system_instruction
         
         # Call LLM
         response_text, img_bytes = client.generate_chat(
-            self.history, 
+            history, 
             self.user_message, 
             self.image_paths, 
-            system_instruction=self.system_instruction,
+            system_instruction=instruction,
             resolution=self.config.resolution,
-            ratio=self.config.aspect_ratio
+            ratio=self.config.aspect_ratio,
+            on_chunk=self._on_chunk if self.streaming else None,
+            pinned_images=self.pinned_images,
+            context_cache=self.context_cache,
+            file_uploads=self.file_uploads
         )
         
         if not self.is_running:
@@ -58,6 +87,12 @@ class ChatWorker(BaseWorker):
             config_helper.config_manager.track_api_usage(self.config.resolution)
 
         execution_time = int((time.time() - start_time) * 1000)
+        context_info = {**context.to_dict(), **client.last_usage}
+        logger.info(
+            f"[Chat] Sent {context_info.get('prompt_tokens', context.estimated_tokens)} prompt tokens, "
+            f"{context_info.get('cached_tokens', 0)} from cache "
+            f"({context.kept} history messages, {context.summarized} condensed, {context.dropped} dropped)"
+        )
         
         # Emit standardized GenerationResult
         result = GenerationResult.ok(
@@ -65,11 +100,18 @@ class ChatWorker(BaseWorker):
             image_path=response_image_path if response_image_path else None,
             session_id=self.session_id,
             model_id=self.config.model_id,
-            execution_time_ms=execution_time
+            execution_time_ms=execution_time,
+            metadata={"context": context_info}
         )
         
         self.result_signal.emit(result)
 
+    def _on_chunk(self, text: str):
+        if not self.is_running:
+            return
+        self.partial_text += text
+        self.chunk_signal.emit(text)
+
     def _save_generated_image(self, img_bytes: bytes) -> Path:
         app_config = config_helper.load_config()
         pp = PathProvider()
@@ -80,11 +122,11 @@ class ChatWorker(BaseWorker):
         out_dir = save_root / constants.GENERATED_IMAGES_DIR_NAME
         out_dir.mkdir(parents=True, exist_ok=True)
         
-        # Save file
-        ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Save file (sessions generate in parallel: microseconds + a random suffix keep names unique)
+        ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
         img = Image.open(BytesIO(img_bytes))
         ext = ".png" if self.config.image_format == "PNG" else ".jpg"
-        save_path = out_dir / f"gen_{ts}{ext}"
+        save_path = out_dir / f"gen_{ts}_{uuid.uuid4().hex[:8]}{ext}"
         
         image_utils.save_image_with_format(img, save_path, self.config.image_format)
         return save_path
@@ -28,11 +28,6 @@ class ComfyWorker(BaseWorker):
             progress_callback=self.progress_signal.emit,
             preview_callback=self.preview_signal.emit
         )
+        # Also covers a stop() that arrived before the orchestrator existed
+        self.token.on_cancel(self.manager.stop)
         self.manager.process_batch()
-
-    def stop(self):
-        """Standard stop with additional orchestrator cleanup."""
-        if self.manager:
-            self.manager.stop()
-        super().stop()
-        self.quit()
@@ -1,12 +1,13 @@
 """Background worker for batch image resizing."""
-from PySide6.QtCore import QThread, Signal
+from PySide6.QtCore import Signal
 
+from core.workers.base_worker import BaseWorker
 from core.services.image_resizer_service import ImageResizerService
 
 
-class ResizerWorker(QThread):
+class ResizerWorker(BaseWorker):
     """
-    Background thread for batch image resizing.
+    Background job for batch image resizing (runs on the shared job executor).
     
     Signals:
         progress: Emits (current, total) progress
@@ -39,9 +40,8 @@ class ResizerWorker(QThread):
         self.output_folder = output_folder
         self.target_width = target_width
         self.target_height = target_height
-        self._is_running = True
     
-    def run(self):
+    def execute(self):
         """Execute batch image resizing."""
         try:
             # Initialize service
@@ -66,7 +66,7 @@ class ResizerWorker(QThread):
             failed = 0
             
             for i, (input_path, output_path) in enumerate(image_pairs):
-                if not self._is_running:
+                if not self.is_running:
                     self.finished.emit(False, "Processing cancelled")
                     return
                 
@@ -94,7 +94,3 @@ class ResizerWorker(QThread):
             
         except Exception as e:
             self.finished.emit(False, f"Error: {str(e)}")
-    
-    def stop(self):
-        """Stop processing."""
-        self._is_running = False
@@ -0,0 +1,74 @@
+"""
+Micro-benchmark: per-task ComfyUI workflow payload construction.
+Compares the old json.loads(json.dumps(...)) deep copy + patch against
+the precompiled WorkflowTemplate.render().
+
+Usage: python scripts/bench_workflow_template.py [nodes] [tasks]
+"""
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.services.workflow_template import WorkflowTemplate
+
+MAPPING = {"LOAD_IMAGE": "10", "GEMINI_PROMPT": "20", "SAVE_IMAGE": "30"}
+
+
+def build_workflow(node_count: int) -> dict:
+    wf = {
+        "10": {"class_type": "LoadImage", "inputs": {"image": ""}},
+        "20": {"class_type": "GeminiImage", "inputs": {"prompt": "", "resolution": "", "aspect_ratio": "", "seed": 0}},
+        "30": {"class_type": "SaveImage", "inputs": {"filename_prefix": "", "images": ["20", 0]}},
+    }
+    for i in range(node_count):
+        wf[str(100 + i)] = {
+            "class_type": "KSampler",
+            "inputs": {"seed": i, "steps": 30, "cfg": 7.0, "model": [str(99 + i), 0], "positive": "x" * 200},
+            "_meta": {"title": f"Node {i}"}
+        }
+    return wf
+
+
+def legacy(workflow: dict) -> str:
+    wf = json.loads(json.dumps(workflow))
+    wf["10"]["inputs"]["image"] = "up.png"
+    inputs = wf["20"]["inputs"]
+    inputs.update(prompt="Sunny day", resolution="2K", aspect_ratio="16:9", seed=42)
+    wf["30"]["inputs"]["filename_prefix"] = "TEMP_view"
+    return json.dumps({"prompt": wf})
+
+
+def compiled(template: WorkflowTemplate) -> str:
+    wf = template.render({
+        "LOAD_IMAGE": {"image": "up.png"},
+        "GEMINI_PROMPT": {"prompt": "Sunny day", "resolution": "2K", "aspect_ratio": "16:9", "seed": 42},
+        "SAVE_IMAGE": {"filename_prefix": "TEMP_view"},
+    })
+    return json.dumps({"prompt": wf})
+
+
+def main():
+    nodes = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    tasks = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    workflow = build_workflow(nodes)
+    template = WorkflowTemplate(workflow, MAPPING)
+    assert legacy(workflow) == compiled(template)
+
+    # Each variant includes the final serialisation that queue_prompt performs
+    t_legacy = min(timeit.repeat(lambda: legacy(workflow), number=tasks, repeat=3))
+    t_compiled = min(timeit.repeat(lambda: compiled(template), number=tasks, repeat=3))
+    t_render = min(timeit.repeat(lambda: template.render({"LOAD_IMAGE": {"image": "up.png"}}), number=tasks, repeat=3))
+
+    print(f"Workflow: {nodes + 3} nodes, {tasks} tasks")
+    print(f"  deep copy + patch + dumps : {t_legacy * 1000:8.1f} ms  ({t_legacy / tasks * 1e6:7.1f} us/task)")
+    print(f"  template.render + dumps   : {t_compiled * 1000:8.1f} ms  ({t_compiled / tasks * 1e6:7.1f} us/task)")
+    print(f"  template.render only      : {t_render * 1000:8.1f} ms  ({t_render / tasks * 1e6:7.1f} us/task)")
+    print(f"  speedup (end-to-end)      : {t_legacy / t_compiled:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -11,11 +11,14 @@ def setup_test_env(tmp_path, monkeypatch):
     Global fixture to isolate tests from the real application state.
     - Redirects CONFIG_FILE and PRESETS_FILE to a temporary directory.
     - Mocks the keyring to prevent accidental API key overwrites.
-    - Resets the internal API key cache.
+    - Resets the internal API key cache and the shared GenAI clients.
     """
     from core.utils import config_helper
+    from core.services import client_registry
     import keyring
     
+    client_registry.invalidate_clients()
+    
     # 1. Create temp config files
     test_config_dir = tmp_path / "nano_papl_tests"
     test_config_dir.mkdir(parents=True, exist_ok=True)
@@ -47,6 +50,7 @@ def setup_test_env(tmp_path, monkeypatch):
     
     # Cleanup cache again after test
     config_helper._API_KEY_CACHE = None
+    client_registry.invalidate_clients()
 
 @pytest.fixture
 def mock_config(tmp_path):
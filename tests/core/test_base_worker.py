@@ -1,4 +1,5 @@
 import pytest
+from core.jobs import JobExecutor
 from core.workers.base_worker import BaseWorker
 
 class MockWorker(BaseWorker):
@@ -44,3 +45,25 @@ def test_base_worker_stop():
     assert worker.is_running is True
     worker.stop()
     assert worker.is_running is False
+
+def test_base_worker_maps_job_events(qtbot):
+    """Verify the Qt adapter re-emits engine events and stop() cancels the job's token."""
+    class ProgressWorker(BaseWorker):
+        def execute(self):
+            self.job.progress(50)
+            self.token.wait(2)
+
+    worker = ProgressWorker(executor=JobExecutor(max_workers=1, name="TestJob"))
+    progress = []
+    worker.progress_signal.connect(progress.append)
+
+    with qtbot.waitSignal(worker.progress_signal, timeout=3000):
+        worker.start()
+    assert worker.isRunning()
+
+    with qtbot.waitSignal(worker.finished_signal, timeout=3000):
+        worker.stop()
+
+    assert progress == [50]
+    assert worker.job.state == "cancelled"
+    assert not worker.isRunning()
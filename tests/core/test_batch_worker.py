@@ -0,0 +1,115 @@
+import threading
+import time
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+from core.workers.batch_worker import BatchWorker
+
+@pytest.fixture
+def project_dir(tmp_path):
+    """Single project with 3 images and 2 prompt blocks (6 tasks)."""
+    project = tmp_path / "P1"
+    project.mkdir()
+    (project / "prompts.md").write_text("### Day\nSunny day\n\n### Night\nDark night\n", encoding="utf-8")
+    for i in range(3):
+        (project / f"view{i}.png").write_bytes(f"fake{i}".encode())
+    return project
+
+def make_worker(project_dir, tmp_path, concurrency):
+    return BatchWorker(
+        "key", str(project_dir), str(tmp_path / "out"),
+        "1K", "1:1", "PNG", "model", False,
+        max_concurrency=concurrency
+    )
+
+def fake_result(task_out):
+    return {"success": True, "saved_path": Path(task_out) / "out.png"}
+
+@patch("core.services.batch_runner.GenerationService")
+def test_batch_worker_runs_requests_concurrently(mock_service_cls, project_dir, tmp_path, qtbot):
+    """Verify that up to max_concurrency requests are in flight at once."""
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0}
+
+    def generate(prompt_data, image_path, config):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        time.sleep(0.05)
+        with lock:
+            state["active"] -= 1
+        return fake_result(config["project_out_dir"])
+
+    mock_service_cls.return_value.generate_image.side_effect = generate
+
+    worker = make_worker(project_dir, tmp_path, concurrency=3)
+    logs, progress = [], []
+    worker.log_signal.connect(logs.append)
+    worker.progress_signal.connect(progress.append)
+    worker.execute()
+
+    assert mock_service_cls.return_value.generate_image.call_count == 6
+    assert 1 < state["peak"] <= 3
+    assert progress[-1] == 100
+    assert "--- BATCH PROCESS COMPLETED ---" in logs
+
+    # Each task's header is immediately followed by its own result line
+    headers = [i for i, line in enumerate(logs) if " -> " in line]
+    assert len(headers) == 6
+    assert all(logs[i + 1].strip().startswith("[OK]") for i in headers)
+    # ...and announced when its request was sent
+    starts = [i for i, line in enumerate(logs) if line.strip().startswith("[START]")]
+    assert len(starts) == 6
+    assert starts[2] < headers[0]  # three requests in flight before the first one finishes
+
+@patch("core.services.batch_runner.GenerationService")
+def test_batch_worker_stop_cancels_queued_tasks(mock_service_cls, project_dir, tmp_path, qtbot):
+    """Verify stop() lets in-flight requests finish but never starts queued ones."""
+    worker = make_worker(project_dir, tmp_path, concurrency=2)
+
+    def generate(prompt_data, image_path, config):
+        worker.stop()
+        time.sleep(0.02)
+        return fake_result(config["project_out_dir"])
+
+    mock_service_cls.return_value.generate_image.side_effect = generate
+
+    logs = []
+    worker.log_signal.connect(logs.append)
+    worker.execute()
+
+    assert mock_service_cls.return_value.generate_image.call_count <= 2
+    assert "--- PROCESS STOPPED BY USER ---" in logs
+
+@patch("core.services.batch_runner.GenerationService")
+def test_batch_worker_resumes_from_journal(mock_service_cls, project_dir, tmp_path, qtbot):
+    """Verify a second run skips tasks the journal records as done."""
+    def generate(prompt_data, image_path, config):
+        out = config["project_out_dir"] / f"{image_path.stem}_{prompt_data['title']}.png"
+        out.write_bytes(b"png")
+        return {"success": True, "saved_path": out}
+
+    mock_service_cls.return_value.generate_image.side_effect = generate
+
+    make_worker(project_dir, tmp_path, concurrency=2).execute()
+    assert mock_service_cls.return_value.generate_image.call_count == 6
+
+    mock_service_cls.return_value.generate_image.reset_mock()
+    make_worker(project_dir, tmp_path, concurrency=2).execute()
+    assert mock_service_cls.return_value.generate_image.call_count == 0
+
+@patch("core.services.batch_runner.GenerationService")
+def test_output_folders_only_for_pending_projects(mock_service_cls, tmp_path, qtbot):
+    """Verify projects without pending tasks get no output folder."""
+    root = tmp_path / "in"
+    for name, prompts in (("P1", "### Day\nSunny day\n"), ("Empty", "")):
+        project = root / name
+        project.mkdir(parents=True)
+        (project / "prompts.md").write_text(prompts, encoding="utf-8")
+        (project / "view0.png").write_bytes(b"fake")
+    mock_service_cls.return_value.generate_image.side_effect = lambda p, i, config: fake_result(config["project_out_dir"])
+
+    make_worker(root, tmp_path, concurrency=1).execute()
+
+    assert (tmp_path / "out" / "P1").is_dir()
+    assert not (tmp_path / "out" / "Empty").exists()
@@ -0,0 +1,61 @@
+from core.services.chat_context import ChatContextManager, SUMMARY_HEADER, estimate_tokens
+
+def _history(turns, text_len=400):
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "text": f"Question {i} " + "x" * text_len})
+        history.append({"role": "model", "text": f"Answer {i} " + "y" * text_len})
+    return history
+
+def test_short_history_is_sent_verbatim():
+    """Verify history that fits the budget goes out unchanged."""
+    history = _history(3)
+    ctx = ChatContextManager(max_tokens=10000, keep_turns=2).build(history, "Next", "Be helpful")
+
+    assert ctx.history == history
+    assert ctx.system_instruction == "Be helpful"
+    assert (ctx.kept, ctx.summarized, ctx.dropped) == (6, 0, 0)
+
+def test_budget_keeps_request_size_flat():
+    """Verify the estimate stays within budget however long the session is."""
+    manager = ChatContextManager(max_tokens=2000, keep_turns=2)
+    sizes = [manager.build(_history(turns), "Next").estimated_tokens for turns in (20, 200, 2000)]
+
+    assert all(size <= 2000 for size in sizes)
+    assert max(sizes) - min(sizes) < 200
+
+def test_older_turns_are_condensed_then_dropped():
+    """Verify older turns land in the system instruction as snippets, the rest are dropped."""
+    history = _history(100)
+    ctx = ChatContextManager(max_tokens=3000, keep_turns=2).build(history, "Next", "Be helpful")
+
+    assert ctx.history[-1]["text"].startswith("Answer 99")
+    assert ctx.history[0]["role"] == "user"
+    assert ctx.summarized > 0 and ctx.dropped > 0
+    assert ctx.kept + ctx.summarized + ctx.dropped == len(history)
+    assert ctx.system_instruction.startswith("Be helpful\n\n" + SUMMARY_HEADER)
+    assert "- Assistant: Answer" in ctx.system_instruction
+
+def test_recent_turns_are_kept_even_over_budget():
+    """Verify the last keep_turns turns are never cut, even when they exceed the budget."""
+    history = _history(5, text_len=4000)
+    ctx = ChatContextManager(max_tokens=500, keep_turns=2).build(history, "Next")
+
+    assert ctx.history == history[-4:]
+
+def test_zero_budget_sends_everything():
+    """Verify max_tokens=0 disables trimming."""
+    history = _history(50)
+    ctx = ChatContextManager(max_tokens=0).build(history, "Next", image_count=1)
+
+    assert ctx.history == history
+    assert ctx.estimated_tokens > sum(estimate_tokens(m["text"]) for m in history)
+
+def test_summary_can_move_into_history():
+    """Verify the condensed turns can ride in the first message, leaving the instruction unchanged."""
+    ctx = ChatContextManager(max_tokens=3000, keep_turns=2).build(_history(100), "Next", "Be helpful")
+    history = ctx.history_with_summary()
+
+    assert ctx.base_instruction == "Be helpful"
+    assert history[0]["text"].startswith(SUMMARY_HEADER)
+    assert history[1:] == ctx.history[1:]
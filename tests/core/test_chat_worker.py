@@ -66,3 +66,95 @@ class TestChatWorkerGenerationResult:
         
         result = results[0]
         assert result.execution_time_ms >= 0
+
+
+class TestChatWorkerContext:
+    """Tests for the token-budgeted history."""
+
+    def test_chat_worker_sends_budgeted_history(self, qtbot, mock_llm_client):
+        """Verify long history is trimmed before the call and token usage is reported."""
+        from core.workers.chat_worker import ChatWorker
+
+        mock_llm_client.return_value.last_usage = {"prompt_tokens": 1234}
+        history = []
+        for i in range(200):
+            history.append({"role": "user", "text": f"Question {i} " + "x" * 400})
+            history.append({"role": "model", "text": f"Answer {i} " + "y" * 400})
+
+        worker = ChatWorker(
+            api_key="test-key",
+            config=GenerationConfig(model_id="test-model"),
+            history=history,
+            user_message="Hello"
+        )
+        worker.context_manager.max_tokens = 4000
+
+        results = []
+        worker.result_signal.connect(lambda r: results.append(r))
+
+        with qtbot.waitSignal(worker.finished_signal, timeout=5000):
+            worker.start()
+
+        sent_history = mock_llm_client.return_value.generate_chat.call_args.args[0]
+        assert 0 < len(sent_history) < len(history)
+        assert sent_history[-1] == history[-1]
+
+        context = results[0].metadata["context"]
+        assert context["prompt_tokens"] == 1234
+        assert context["history_sent"] == len(sent_history)
+        assert context["estimated_tokens"] <= 4000
+
+
+class TestChatWorkerStreaming:
+    """Tests for streamed replies."""
+
+    def test_chat_worker_emits_chunks(self, qtbot, mock_llm_client):
+        """Verify text deltas are emitted through chunk_signal before the final result."""
+        from core.workers.chat_worker import ChatWorker
+
+        def fake_generate(*args, on_chunk=None, **kwargs):
+            for delta in ("Hel", "lo"):
+                on_chunk(delta)
+            return "Hello", None
+        mock_llm_client.return_value.generate_chat.side_effect = fake_generate
+
+        worker = ChatWorker(
+            api_key="test-key",
+            config=GenerationConfig(model_id="test-model"),
+            history=[],
+            user_message="Hi"
+        )
+        worker.streaming = True
+
+        chunks, results = [], []
+        worker.chunk_signal.connect(lambda t: chunks.append(t))
+        worker.result_signal.connect(lambda r: results.append(r))
+
+        with qtbot.waitSignal(worker.finished_signal, timeout=5000):
+            worker.start()
+
+        assert chunks == ["Hel", "lo"]
+        assert worker.partial_text == "Hello"
+        assert results[0].text_response == "Hello"
+
+
+class TestChatWorkerImages:
+    """Tests for saving generated images."""
+
+    def test_parallel_sessions_do_not_overwrite_images(self, tmp_path):
+        """Verify two images saved in the same second get distinct files."""
+        from io import BytesIO
+        from PIL import Image
+        from core.workers.chat_worker import ChatWorker
+
+        buf = BytesIO()
+        Image.new("RGB", (4, 4)).save(buf, format="PNG")
+        with patch('core.workers.chat_worker.config_helper.load_config', return_value={"data_root": str(tmp_path)}):
+            workers = [
+                ChatWorker(api_key="k", config=GenerationConfig(model_id="m"), history=[], user_message="Hi", session_id=sid)
+                for sid in ("a", "b")
+            ]
+            paths = [w._save_generated_image(buf.getvalue()) for w in workers]
+
+        assert paths[0] != paths[1]
+        assert all(p.exists() for p in paths)
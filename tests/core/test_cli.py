@@ -0,0 +1,73 @@
+import io
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+from core import cli
+from core.services.task_planner import BatchSummary
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+def test_cli_does_not_import_qt():
+    """Verify the CLI and both engines load without PySide6 or qfluentwidgets."""
+    code = (
+        "import sys, core.cli\n"
+        "import core.services.batch_runner, core.services.comfy_orchestrator\n"
+        "print(sorted({m.split('.')[0] for m in sys.modules} & {'PySide6', 'qfluentwidgets'}))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+def test_missing_input_is_usage_error(tmp_path):
+    """Verify a missing input folder exits with the usage code."""
+    assert cli.main(["batch", str(tmp_path / "missing")]) == cli.EXIT_USAGE
+
+@patch("core.services.batch_runner.BatchRunner")
+def test_gemini_exit_codes(mock_runner_cls, tmp_path, capsys):
+    """Verify the exit code reflects the summary: 0 all done, 1 any failure."""
+    mock_runner_cls.return_value.run.return_value = BatchSummary(total=3, succeeded=3)
+    assert cli.main(["batch", str(tmp_path), "--api-key", "k", "--concurrency", "2"]) == cli.EXIT_OK
+    assert mock_runner_cls.call_args.kwargs["max_concurrency"] == 2
+    assert "3 succeeded, 0 failed, 0 skipped" in capsys.readouterr().out
+
+    mock_runner_cls.return_value.run.return_value = BatchSummary(total=3, succeeded=1, failed=1, stopped=True)
+    assert cli.main(["batch", str(tmp_path), "--api-key", "k"]) == cli.EXIT_FAILED
+    assert "1 skipped" in capsys.readouterr().out
+
+@patch("core.services.batch_runner.BatchRunner")
+def test_gemini_requires_api_key(mock_runner_cls, tmp_path, monkeypatch):
+    """Verify a run without any API key source exits before starting."""
+    for var in cli.API_KEY_ENV_VARS:
+        monkeypatch.delenv(var, raising=False)
+    with patch("core.utils.config_helper.config_manager.config.api_key", ""):
+        assert cli.main(["batch", str(tmp_path)]) == cli.EXIT_USAGE
+    mock_runner_cls.assert_not_called()
+
+@patch("core.services.comfy_orchestrator.ComfyOrchestrator")
+def test_comfy_settings_and_start_error(mock_orch_cls, tmp_path):
+    """Verify CLI flags reach the orchestrator settings and a failed start exits 1."""
+    mock_orch_cls.return_value.process_batch.return_value = BatchSummary(error="Failed to load workflow template")
+
+    code = cli.main(["batch", str(tmp_path), "--engine", "comfy",
+                     "--comfy-url", "http://a:8188", "--comfy-url", "http://b:8188",
+                     "--queue-depth", "2", "--seed", "7"])
+
+    assert code == cli.EXIT_FAILED
+    settings = mock_orch_cls.call_args.args[0]
+    assert settings["comfy_urls"] == ["http://a:8188", "http://b:8188"]
+    assert settings["queue_depth"] == 2
+    assert settings["use_random_seed"] is False and settings["seed_value"] == 7
+
+def test_console_reporter_prints_eta():
+    """Verify progress lines carry elapsed time and ETA, and quiet hides log lines."""
+    stream = io.StringIO()
+    reporter = cli.ConsoleReporter(quiet=True, stream=stream)
+    reporter.log("hidden")
+    with patch("core.cli.time.monotonic", return_value=reporter.started + 30):
+        reporter.progress(25)
+        reporter.progress(25.4)  # same percentage: no new line
+
+    text = stream.getvalue()
+    assert "hidden" not in text
+    assert text.count("[PROGRESS]") == 1
+    assert "25% | Elapsed: 30s | ETA: 1m 30s" in text
@@ -0,0 +1,38 @@
+from unittest.mock import patch
+from core.services.client_registry import get_genai_client, invalidate_clients
+from core.services.generation_service import GenerationService
+from core.factories.llm_factory import GeminiProvider
+
+@patch("google.genai.Client")
+def test_client_shared_per_key(mock_client_cls):
+    """Verify one client is built per API key and reused by all consumers."""
+    service = GenerationService(api_key="key-A")
+    provider = GeminiProvider("key-A", "gemini-3-flash-preview")
+
+    assert service.client is provider.client
+    assert get_genai_client("key-A") is service.client
+    mock_client_cls.assert_called_once_with(api_key="key-A")
+
+    assert get_genai_client("key-B") is not None
+    assert mock_client_cls.call_count == 2
+
+@patch("google.genai.Client")
+def test_client_missing_key(mock_client_cls):
+    """Verify no client is created without an API key."""
+    assert get_genai_client("") is None
+    assert GenerationService(api_key=None).client is None
+    mock_client_cls.assert_not_called()
+
+@patch("google.genai.Client")
+def test_invalidate_clients(mock_client_cls):
+    """Verify invalidation forces a fresh client on next use."""
+    mock_client_cls.side_effect = lambda **kwargs: object()
+    first = get_genai_client("key-A")
+    other = get_genai_client("key-B")
+
+    invalidate_clients("key-A")
+    assert get_genai_client("key-A") is not first
+    assert get_genai_client("key-B") is other
+
+    invalidate_clients()
+    assert get_genai_client("key-B") is not other
@@ -0,0 +1,96 @@
+import json
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from core.comfy_api import ComfyAPI
+
+PAYLOAD = bytes(range(256)) * 8192  # 2 MiB, several download chunks
+
+class FakeComfyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    history_failures = 0
+    queued = 0
+    connections = set()
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"", content_type="application/json"):
+        FakeComfyHandler.connections.add(self.client_address)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith("/history/"):
+            if FakeComfyHandler.history_failures > 0:
+                FakeComfyHandler.history_failures -= 1
+                return self._send(503)
+            return self._send(200, json.dumps({"p1": {"outputs": {}}}).encode())
+        if self.path.startswith("/view"):
+            return self._send(200, PAYLOAD, "image/png")
+        self._send(404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if self.path == "/prompt":
+            FakeComfyHandler.queued += 1
+            return self._send(503)
+        if self.path == "/upload/image":
+            return self._send(200, json.dumps({"name": "up.png"}).encode())
+        self._send(404)
+
+@pytest.fixture
+def server():
+    FakeComfyHandler.history_failures = 0
+    FakeComfyHandler.queued = 0
+    FakeComfyHandler.connections = set()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), FakeComfyHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+def test_session_reuses_connections(server, tmp_path):
+    """Verify calls share pooled keep-alive connections."""
+    api = ComfyAPI(server)
+    src = tmp_path / "in.png"
+    src.write_bytes(b"img")
+
+    for _ in range(3):
+        assert api.upload_image(src, "in.png") == "up.png"
+        assert api.get_history("p1") is not None
+
+    assert len(FakeComfyHandler.connections) == 1
+    api.close()
+
+def test_idempotent_calls_retried(server):
+    """Verify GET is retried on 503 while queueing a prompt is not."""
+    FakeComfyHandler.history_failures = 2
+    api = ComfyAPI(server, retries=3)
+
+    assert api.get_history("p1") == {"p1": {"outputs": {}}}
+    assert api.queue_prompt({}) is None
+    assert FakeComfyHandler.queued == 1
+
+def test_download_streams_atomically(server, tmp_path):
+    """Verify the download streams to a temp file and lands at the final path."""
+    api = ComfyAPI(server)
+    save_path = tmp_path / "out" / "render.png"
+
+    assert api.download_image("render.png", "", "output", save_path) is True
+    assert save_path.read_bytes() == PAYLOAD
+    assert not (save_path.parent / "render.png.part").exists()
+
+def test_download_failure_leaves_no_file(tmp_path):
+    """Verify a failed download leaves neither a partial nor a final file."""
+    api = ComfyAPI("http://127.0.0.1:1", connect_timeout=0.5, retries=0)
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    save_path = out_dir / "render.png"
+
+    assert api.download_image("render.png", "", "output", save_path) is False
+    assert list(out_dir.iterdir()) == []
@@ -1,8 +1,12 @@
 import pytest
+import threading
+import time
 import json
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 from core.services.comfy_orchestrator import ComfyOrchestrator
+from core.services.task_planner import BatchTask
+from core.services.upload_cache import ComfyUploadCache
 
 @pytest.fixture
 def mock_settings():
@@ -35,11 +39,7 @@ def test_process_batch_live_flow(mock_parse, mock_provider_cls, mock_open, orche
     orchestrator.node_mapping = {"LOAD_IMAGE": "10", "GEMINI_PROMPT": "20", "SAVE_IMAGE": "30"}
     
     # 2. Setup Task
-    task = {
-        "project": Path("/in/P1"), 
-        "image": Path("/in/P1/i1.png"), 
-        "prompt": {"title": "T1", "prompt": "P1"}
-    }
+    task = BatchTask(Path("/in/P1"), Path("/in/P1/i1.png"), "T1", "P1")
     
     # 3. Setup API Mocks
     orchestrator.api.upload_image.return_value = "uploaded_name.png"
@@ -114,3 +114,195 @@ def test_process_batch_scanning(mock_mkdir, mock_exists, mock_iterdir, mock_pars
         orchestrator.process_batch()
         assert mock_process.called
         assert mock_process.call_count == 1
+
+@pytest.fixture
+def comfy_project(tmp_path):
+    """Project with 2 images x 2 prompts, plus a minimal workflow file."""
+    project = tmp_path / "projects" / "P1"
+    project.mkdir(parents=True)
+    (project / "prompts.md").write_text("### Day\nSunny\n\n### Night\nDark\n", encoding="utf-8")
+    for i in range(2):
+        (project / f"view{i}.png").write_bytes(f"fake{i}".encode())
+    workflow = {"10": {"inputs": {"image": ""}}, "30": {"inputs": {"filename_prefix": ""}}}
+    wf_path = tmp_path / "wf.json"
+    wf_path.write_text(json.dumps(workflow), encoding="utf-8")
+    return project, wf_path
+
+def make_pipelined(comfy_project, tmp_path, depth):
+    project, wf_path = comfy_project
+    settings = {
+        "input_path": str(project), "output_path": str(tmp_path / "out"),
+        "workflow_path": str(wf_path), "queue_depth": depth,
+        "comfy_websocket": False, "resume": False, "upload_cache": False
+    }
+    with patch("core.services.comfy_orchestrator.ComfyAPI"):
+        orch = ComfyOrchestrator(settings)
+    orch.api.base_url = "http://render:8188"
+    orch.node_mapping = {"LOAD_IMAGE": "10", "SAVE_IMAGE": "30"}
+    orch.api.upload_image.return_value = "up.png"
+    return orch
+
+def test_pipelined_keeps_queue_full(comfy_project, tmp_path):
+    """Verify several prompts are queued before earlier ones finish, bounded by queue_depth."""
+    orch = make_pipelined(comfy_project, tmp_path, depth=3)
+    lock = threading.Lock()
+    state = {"next": 0, "queued": set(), "peak": 0}
+
+    def queue_prompt(workflow, api_key):
+        with lock:
+            state["next"] += 1
+            pid = f"p{state['next']}"
+            state["queued"].add(pid)
+            state["peak"] = max(state["peak"], len(state["queued"]))
+        return pid
+
+    def get_history(pid):
+        time.sleep(0.05)
+        with lock:
+            state["queued"].discard(pid)
+        return {pid: {"outputs": {"30": {"images": [{"filename": f"{pid}.png"}]}}}}
+
+    def download(filename, subfolder, img_type, save_path):
+        save_path.write_bytes(b"png")
+        return True
+
+    orch.api.queue_prompt.side_effect = queue_prompt
+    orch.api.get_history.side_effect = get_history
+    orch.api.download_image.side_effect = download
+    progress = []
+    orch.progress_callback = progress.append
+
+    orch.process_batch()
+
+    assert orch.api.queue_prompt.call_count == 4
+    assert orch.api.download_image.call_count == 4
+    # 2 views x 2 prompts: each view is uploaded once
+    assert orch.api.upload_image.call_count == 2
+    assert 1 < state["peak"] <= 3
+    assert progress[-1] == 100
+
+def test_stop_cancels_outstanding_prompts(comfy_project, tmp_path):
+    """Verify stop() deletes our pending prompts and interrupts our running one."""
+    orch = make_pipelined(comfy_project, tmp_path, depth=3)
+    ids = iter(["p1", "p2", "p3", "p4"])
+    window_full = threading.Event()
+
+    def queue_prompt(*args):
+        pid = next(ids)
+        if pid == "p3":
+            window_full.set()
+        return pid
+
+    def get_history(pid):
+        window_full.wait(timeout=5)
+        orch.stop()
+        return None
+
+    orch.api.queue_prompt.side_effect = queue_prompt
+
+    orch.api.get_history.side_effect = get_history
+    orch.api.get_queue.return_value = {"queue_running": [[0, "p1", {}, {}, []]], "queue_pending": []}
+
+    orch.process_batch()
+
+    orch.api.download_image.assert_not_called()
+    orch.api.interrupt.assert_called_once_with("p1")
+    assert sorted(orch.api.delete_queued.call_args.args[0]) == ["p2", "p3"]
+    assert orch.api.queue_prompt.call_count == 3
+
+def test_upload_skipped_when_server_has_same_bytes(comfy_project, tmp_path):
+    """Verify a later run reuses a content-addressed upload the server still holds."""
+    orch = make_pipelined(comfy_project, tmp_path, depth=1)
+    orch.upload_cache = ComfyUploadCache(tmp_path / "uploads.json")
+    orch.api.upload_image.side_effect = lambda path, name: name
+    orch.api.queue_prompt.return_value = None  # stop after the upload stage
+
+    orch.process_batch()
+    assert orch.api.upload_image.call_count == 2
+    names = {c.args[1] for c in orch.api.upload_image.call_args_list}
+    assert all(n.startswith("nanopapl_") for n in names)
+
+    # Second run: server still has both files -> no uploads
+    orch2 = make_pipelined(comfy_project, tmp_path, depth=1)
+    orch2.upload_cache = ComfyUploadCache(tmp_path / "uploads.json")
+    orch2.api.has_input_image.return_value = True
+    orch2.api.queue_prompt.return_value = None
+
+    orch2.process_batch()
+    orch2.api.upload_image.assert_not_called()
+    assert {c.args[0]["10"]["inputs"]["image"] for c in orch2.api.queue_prompt.call_args_list} == names
+
+def test_dead_node_tasks_requeued_elsewhere(comfy_project, tmp_path):
+    """Verify tasks stuck on a node that dies are re-dispatched to a healthy node."""
+    project, wf_path = comfy_project
+    apis = {}
+
+    def make_api(base_url):
+        api = MagicMock()
+        api.base_url = base_url
+        api.upload_image.return_value = "up.png"
+        api.get_queue.return_value = {"queue_running": [], "queue_pending": []}
+        api.get_system_stats.return_value = {"devices": []}
+        apis[base_url] = api
+        return api
+
+    settings = {
+        "input_path": str(project), "output_path": str(tmp_path / "out"),
+        "workflow_path": str(wf_path), "queue_depth": 1, "health_interval": 0.05,
+        "comfy_urls": ["http://a:8188", "http://b:8188"],
+        "comfy_websocket": False, "resume": False, "upload_cache": False
+    }
+    with patch("core.services.comfy_orchestrator.ComfyAPI", side_effect=make_api):
+        orch = ComfyOrchestrator(settings)
+    orch.node_mapping = {"LOAD_IMAGE": "10", "SAVE_IMAGE": "30"}
+    a, b = apis["http://a:8188"], apis["http://b:8188"]
+
+    # Node A accepts a prompt, then stops responding
+    def a_queue(*args):
+        a.get_system_stats.return_value = None
+        return "a1"
+    a.queue_prompt.side_effect = a_queue
+    a.get_history.return_value = None
+
+    ids = iter(range(100))
+    b.queue_prompt.side_effect = lambda *args: f"b{next(ids)}"
+    b.get_history.side_effect = lambda pid: {pid: {"outputs": {"30": {"images": [{"filename": "o.png"}]}}}}
+    b.download_image.side_effect = lambda filename, subfolder, img_type, save_path: save_path.write_bytes(b"png") or True
+
+    logs = []
+    orch.log_callback = logs.append
+    orch.process_batch()
+
+    assert a.queue_prompt.call_count == 1
+    assert b.download_image.call_count == 4
+    assert any("Re-queueing" in line for line in logs)
+    assert any("b:8188: 4 done" in line for line in logs)
+
+def test_cached_result_keeps_its_format(comfy_project, tmp_path):
+    """Verify a cached JPEG is written back with a .jpg extension, not .png."""
+    from io import BytesIO
+    from PIL import Image
+    buf = BytesIO()
+    Image.new("RGB", (4, 4)).save(buf, format="JPEG")
+
+    orch = make_pipelined(comfy_project, tmp_path, 1)
+    out_dir = tmp_path / "cached"
+    out_dir.mkdir()
+    saved = orch._save_cached_result(buf.getvalue(), out_dir, "view0", {"title": "Day", "prompt": "Sunny"})
+
+    assert saved.suffix == ".jpg"
+    assert saved.read_bytes() == buf.getvalue()
+
+def test_sequential_run_balances_pool_slots(comfy_project, tmp_path):
+    """Verify the one-at-a-time path acquires each slot it releases, so in_flight ends at zero."""
+    orch = make_pipelined(comfy_project, tmp_path, depth=1)
+    ids = iter(["p1", "p2", "p3", "p4"])
+    orch.api.queue_prompt.side_effect = lambda *args: next(ids)
+    orch.api.get_history.side_effect = lambda pid: {pid: {"outputs": {"30": {"images": [{"filename": f"{pid}.png"}]}}}}
+    orch.api.download_image.side_effect = lambda filename, subfolder, img_type, save_path: save_path.write_bytes(b"png") or True
+
+    orch.process_batch()
+
+    node = orch.nodes[0]
+    assert node.in_flight == 0
+    assert node.completed == 4
@@ -0,0 +1,50 @@
+from unittest.mock import MagicMock
+from core.services.comfy_pool import ComfyNode, ComfyNodePool
+
+def make_node(url, queue_len=0, alive=True):
+    api = MagicMock()
+    api.base_url = url
+    api.get_queue.return_value = {"queue_running": [], "queue_pending": [[i, f"x{i}"] for i in range(queue_len)]}
+    api.get_system_stats.return_value = {"devices": []} if alive else None
+    return ComfyNode(api)
+
+def test_select_shortest_queue():
+    """Verify dispatch goes to the node with the shortest server queue."""
+    busy, idle = make_node("http://a:8188", queue_len=5), make_node("http://b:8188", queue_len=1)
+    pool = ComfyNodePool([busy, idle])
+
+    assert pool.select(depth=2) is idle
+    pool.acquire(idle)
+    pool.acquire(idle)
+    assert pool.select(depth=2) is busy  # idle is at capacity
+
+def test_select_skips_unreachable_node():
+    """Verify a node whose queue can't be read is taken out of rotation."""
+    dead, alive = make_node("http://a:8188"), make_node("http://b:8188", queue_len=3)
+    dead.api.get_queue.return_value = None
+    logs = []
+    pool = ComfyNodePool([dead, alive], log=logs.append)
+
+    assert pool.select(depth=1) is alive
+    assert not dead.healthy
+    assert any("a:8188 taken out of rotation" in line for line in logs)
+
+def test_health_check_recovers_node():
+    """Verify health checks remove dead nodes and restore recovered ones."""
+    node = make_node("http://a:8188", alive=False)
+    pool = ComfyNodePool([node, make_node("http://b:8188")])
+
+    pool.check_health()
+    assert not node.healthy
+    node.api.get_system_stats.return_value = {"devices": []}
+    pool.check_health()
+    assert node.healthy
+
+def test_report_throughput():
+    """Verify per-node stats appear in the report."""
+    node = make_node("http://a:8188")
+    pool = ComfyNodePool([node])
+    pool.acquire(node)
+    pool.release(node, success=True)
+
+    assert "a:8188: 1 done, 0 failed" in pool.report()[0]
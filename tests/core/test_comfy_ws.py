@@ -0,0 +1,95 @@
+import json
+import threading
+from unittest.mock import MagicMock, patch
+from websockets.sync.server import serve
+from core.comfy_ws import ComfyEventListener, wait_for_outputs
+
+def make_api(base_url="http://127.0.0.1:8188"):
+    api = MagicMock()
+    api.base_url = base_url
+    api.client_id = "cid"
+    return api
+
+def test_listener_url():
+    """Verify the WebSocket URL is derived from the HTTP base URL."""
+    assert ComfyEventListener(make_api()).url == "ws://127.0.0.1:8188/ws?clientId=cid"
+    assert ComfyEventListener(make_api("https://render:443")).url == "wss://render:443/ws?clientId=cid"
+
+def test_listener_resolves_futures():
+    """Verify executed outputs are collected and resolved on completion."""
+    listener = ComfyEventListener(make_api())
+    future = listener.watch("p1")
+
+    listener._handle({"type": "executed", "data": {"prompt_id": "p1", "node": "30", "output": {"images": [{"filename": "a.png"}]}}})
+    assert not future.done()
+    listener._handle({"type": "execution_success", "data": {"prompt_id": "p1"}})
+
+    result = future.result(timeout=1)
+    assert result["status"] == "success"
+    assert result["outputs"]["30"]["images"][0]["filename"] == "a.png"
+
+def test_listener_error_and_early_finish():
+    """Verify errors resolve futures and prompts finished before watch() are remembered."""
+    listener = ComfyEventListener(make_api())
+    listener._handle({"type": "execution_error", "data": {"prompt_id": "p1", "exception_message": "OOM"}})
+
+    result = listener.watch("p1").result(timeout=1)
+    assert result["status"] == "error"
+    assert result["error"] == "OOM"
+
+def test_wait_for_outputs_polls_with_backoff():
+    """Verify polling fallback backs off instead of hitting /history every second."""
+    api = make_api()
+    api.get_history.side_effect = [None, None, {"p1": {"outputs": {"30": {"images": []}}}}]
+
+    with patch("core.comfy_ws.time.sleep") as mock_sleep, \
+         patch("core.comfy_ws.time.monotonic", side_effect=[0, 0, 1, 10, 10, 10, 20]):
+        outputs = wait_for_outputs(api, "p1", listener=None, poll_min=0.5)
+
+    assert outputs == {"30": {"images": []}}
+    assert api.get_history.call_count == 3
+    assert mock_sleep.called
+
+def test_wait_for_outputs_falls_back_to_history_for_cached_node():
+    """Verify a missing required node (served from server cache) is read from /history."""
+    api = make_api()
+    api.get_history.return_value = {"p1": {"outputs": {"30": {"images": [{"filename": "c.png"}]}}}}
+    listener = ComfyEventListener(make_api())
+    listener._connected.set()
+    listener._handle({"type": "execution_success", "data": {"prompt_id": "p1"}})
+
+    outputs = wait_for_outputs(api, "p1", listener=listener, required_node="30")
+
+    assert outputs["30"]["images"][0]["filename"] == "c.png"
+    api.get_history.assert_called_once_with("p1")
+
+def test_listener_end_to_end():
+    """Verify a real socket round trip resolves the prompt without any polling."""
+    def handler(ws):
+        ws.send(json.dumps({"type": "status", "data": {}}))
+        ws.send(b"\x00binary-preview")
+        ws.send(json.dumps({"type": "executed", "data": {"prompt_id": "p1", "node": "30", "output": {"images": []}}}))
+        ws.send(json.dumps({"type": "executing", "data": {"prompt_id": "p1", "node": None}}))
+        ws.recv()  # keep open until the client closes
+
+    with serve(handler, "127.0.0.1", 0) as server:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        port = server.socket.getsockname()[1]
+        api = make_api(f"http://127.0.0.1:{port}")
+
+        listener = ComfyEventListener(api)
+        assert listener.start()
+        try:
+            outputs = wait_for_outputs(api, "p1", listener=listener, required_node="30")
+        finally:
+            listener.close()
+            server.shutdown()
+
+    assert outputs == {"30": {"images": []}}
+    api.get_history.assert_not_called()
+
+def test_listener_start_unavailable():
+    """Verify start() reports failure when no server is listening."""
+    listener = ComfyEventListener(make_api("http://127.0.0.1:1"), open_timeout=0.5)
+    assert listener.start() is False
+    assert not listener.connected
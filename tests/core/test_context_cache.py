@@ -0,0 +1,82 @@
+import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from core.services.context_cache import ContextCache, REFRESH_MARGIN_SECONDS
+
+LONG_INSTRUCTION = "Describe renders precisely. " * 400
+
+def _cache_obj(name, seconds=3600):
+    expires = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=seconds)
+    return SimpleNamespace(name=name, expire_time=expires)
+
+def test_small_prefix_is_not_cached():
+    """Verify a prefix below the minimum size never calls the API."""
+    client = MagicMock()
+    assert ContextCache().get(client, "key", "model", "Short instruction") is None
+    client.caches.create.assert_not_called()
+
+def test_cache_is_created_once_and_extended_near_expiry():
+    """Verify one create per prefix, a TTL extension near expiry, and a new cache for a new prefix."""
+    client = MagicMock()
+    client.caches.create.side_effect = [_cache_obj("caches/1", seconds=REFRESH_MARGIN_SECONDS - 10), _cache_obj("caches/2")]
+    client.caches.update.return_value = _cache_obj("caches/1")
+    cache = ContextCache()
+
+    assert cache.get(client, "key", "model", LONG_INSTRUCTION) == "caches/1"
+    assert cache.get(client, "key", "model", LONG_INSTRUCTION) == "caches/1"
+    client.caches.update.assert_called_once()
+    assert cache.get(client, "key", "model", LONG_INSTRUCTION + "v2") == "caches/2"
+    assert client.caches.create.call_count == 2
+
+def test_unavailable_caching_falls_back_without_retrying():
+    """Verify a failed create returns None and is not retried on every message."""
+    client = MagicMock()
+    client.caches.create.side_effect = RuntimeError("model does not support caching")
+    cache = ContextCache()
+
+    assert cache.get(client, "key", "model", LONG_INSTRUCTION) is None
+    assert cache.get(client, "key", "model", LONG_INSTRUCTION) is None
+    assert client.caches.create.call_count == 1
+
+@patch('core.factories.llm_factory.get_genai_client')
+def test_provider_uses_cache_and_falls_back(mock_get_client, tmp_path):
+    """Verify the request references the cache instead of the instruction and pinned image, and retries without it."""
+    from core.factories.llm_factory import GeminiProvider
+
+    pinned = tmp_path / "ref.png"; pinned.write_bytes(b"ref")
+    client = mock_get_client.return_value
+    client.caches.create.return_value = _cache_obj("caches/1")
+    chat = client.chats.create.return_value
+    chat.send_message.side_effect = [RuntimeError("404 NOT_FOUND. CachedContent caches/1 not found"), MagicMock(parts=[], usage_metadata=None)]
+
+    provider = GeminiProvider("key", "gemini-3-pro-image-preview", file_cache=False, context_cache=ContextCache())
+    provider.generate_chat([], "Hi", [], LONG_INSTRUCTION,
+                           {"resolution": "1K", "ratio": "1:1", "pinned_images": [str(pinned)], "context_cache": True})
+
+    first, retry = client.chats.create.call_args_list
+    assert first.kwargs["config"].cached_content == "caches/1"
+    assert first.kwargs["config"].system_instruction is None
+    assert len(chat.send_message.call_args_list[0].args[0]) == 1
+
+    assert retry.kwargs["config"].cached_content is None
+    assert retry.kwargs["config"].system_instruction == LONG_INSTRUCTION
+    assert chat.send_message.call_args_list[1].args[0][1].inline_data.data == b"ref"
+    assert provider.context_cache._entries == {}
+
+@patch('core.factories.llm_factory.get_genai_client')
+def test_provider_keeps_cache_on_transient_error(mock_get_client):
+    """Verify an overload error surfaces without a resend and the cache stays valid."""
+    from core.factories.llm_factory import GeminiProvider
+
+    client = mock_get_client.return_value
+    client.caches.create.return_value = _cache_obj("caches/1")
+    chat = client.chats.create.return_value
+    chat.send_message.side_effect = [RuntimeError("503 UNAVAILABLE. Model overloaded"), MagicMock(parts=[], usage_metadata=None)]
+
+    provider = GeminiProvider("key", "gemini-3-pro-image-preview", file_cache=False, context_cache=ContextCache())
+    text, _ = provider.generate_chat([], "Hi", [], LONG_INSTRUCTION, {"resolution": "1K", "ratio": "1:1", "context_cache": True})
+
+    assert text.startswith("Gemini Error:")
+    assert chat.send_message.call_count == 1
+    assert provider.context_cache.get(client, "key", "gemini-3-pro-image-preview", LONG_INSTRUCTION) == "caches/1"
+    assert client.caches.create.call_count == 1
@@ -0,0 +1,133 @@
+import datetime
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from core.services.gemini_files import GeminiFileCache
+
+def _uploaded(name, hours=48):
+    expires = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=hours)
+    return SimpleNamespace(name=name, uri=f"https://files/{name}", mime_type="image/png", expiration_time=expires)
+
+def _client(*uploads):
+    client = MagicMock()
+    client.files.upload.side_effect = list(uploads)
+    return client
+
+def test_same_content_uploads_once(tmp_path):
+    """Verify identical bytes are uploaded once, across paths and cache instances."""
+    a = tmp_path / "a.png"; a.write_bytes(b"render")
+    b = tmp_path / "b.png"; b.write_bytes(b"render")
+    client = _client(_uploaded("files/1"))
+
+    cache = GeminiFileCache(tmp_path / "files.json")
+    first = cache.upload(client, "key", a)
+    assert cache.upload(client, "key", b)["uri"] == first["uri"]
+
+    reloaded = GeminiFileCache(tmp_path / "files.json")
+    assert reloaded.upload(client, "key", a)["uri"] == first["uri"]
+    assert client.files.upload.call_count == 1
+    assert "key" not in (tmp_path / "files.json").read_text()
+
+def test_expiring_handle_is_reuploaded(tmp_path):
+    """Verify a handle inside the expiry margin is replaced, and other API keys upload separately."""
+    img = tmp_path / "a.png"; img.write_bytes(b"render")
+    client = _client(_uploaded("files/1", hours=0.5), _uploaded("files/2"), _uploaded("files/3"))
+    cache = GeminiFileCache(tmp_path / "files.json")
+
+    cache.upload(client, "key", img)
+    assert cache.upload(client, "key", img)["uri"] == "https://files/files/2"
+    assert cache.upload(client, "other-key", img)["uri"] == "https://files/files/3"
+    assert client.files.upload.call_count == 3
+
+def test_failed_upload_returns_none(tmp_path):
+    """Verify an upload error leaves nothing cached so the caller inlines the bytes."""
+    img = tmp_path / "a.png"; img.write_bytes(b"render")
+    client = _client(RuntimeError("quota"))
+    cache = GeminiFileCache(tmp_path / "files.json")
+
+    assert cache.upload(client, "key", img) is None
+    assert cache.get("key", cache.content_hash(img)) is None
+
+@patch('core.factories.llm_factory.get_genai_client')
+def test_provider_references_uploaded_files(mock_get_client, tmp_path):
+    """Verify attachments and earlier user images go out as file URIs, and a rejected URI falls back inline."""
+    from core.factories.llm_factory import GeminiProvider
+
+    old = tmp_path / "old.png"; old.write_bytes(b"old")
+    new = tmp_path / "new.png"; new.write_bytes(b"new")
+    client = mock_get_client.return_value
+    # The current attachment is resolved before the history
+    client.files.upload.side_effect = [_uploaded("files/new"), _uploaded("files/old")]
+    chat = client.chats.create.return_value
+    chat.send_message.side_effect = [
+        RuntimeError("404 NOT_FOUND. File https://files/files/new not found"), MagicMock(parts=[], usage_metadata=None)
+    ]
+
+    provider = GeminiProvider("key", "gemini-3-pro-image-preview", file_cache=GeminiFileCache(tmp_path / "files.json"))
+    history = [{"role": "user", "text": "Look", "images": [str(old)]}, {"role": "model", "text": "Nice"}]
+    provider.generate_chat(history, "Again", [str(new)], "", {"resolution": "1K", "ratio": "1:1", "file_uploads": True})
+
+    first_history = client.chats.create.call_args_list[0].kwargs["history"]
+    assert first_history[0].parts[1].file_data.file_uri == "https://files/files/old"
+    first_parts = chat.send_message.call_args_list[0].args[0]
+    assert first_parts[1].file_data.file_uri == "https://files/files/new"
+
+    # Retry: handles forgotten, attachment and history image inlined
+    retry_parts = chat.send_message.call_args_list[1].args[0]
+    assert retry_parts[1].inline_data.data == b"new"
+    assert client.chats.create.call_args_list[1].kwargs["history"][0].parts[1].inline_data.data == b"old"
+
+@patch('core.factories.llm_factory.get_genai_client')
+def test_uploads_are_opt_in(mock_get_client, tmp_path):
+    """Verify nothing goes to the Files API unless the request asks for it: attachments are inlined."""
+    from core.factories.llm_factory import GeminiProvider
+
+    img = tmp_path / "a.png"; img.write_bytes(b"a")
+    client = mock_get_client.return_value
+    chat = client.chats.create.return_value
+    chat.send_message.return_value = MagicMock(parts=[], usage_metadata=None)
+
+    provider = GeminiProvider("key", "gemini-3-pro-image-preview", file_cache=GeminiFileCache(tmp_path / "files.json"))
+    provider.generate_chat([], "Hi", [str(img)], "", {"resolution": "1K", "ratio": "1:1"})
+
+    client.files.upload.assert_not_called()
+    assert chat.send_message.call_args.args[0][1].inline_data.data == b"a"
+
+def _provider_with_attachment(mock_get_client, tmp_path):
+    from core.factories.llm_factory import GeminiProvider
+
+    img = tmp_path / "a.png"; img.write_bytes(b"a")
+    client = mock_get_client.return_value
+    client.files.upload.side_effect = [_uploaded("files/a")]
+    provider = GeminiProvider("key", "gemini-3-pro-image-preview", file_cache=GeminiFileCache(tmp_path / "files.json"))
+    return provider, client.chats.create.return_value, str(img)
+
+@patch('core.factories.llm_factory.get_genai_client')
+def test_other_errors_are_not_resent(mock_get_client, tmp_path):
+    """Verify quota / network errors and 404s about something else surface without a resend."""
+    provider, chat, img = _provider_with_attachment(mock_get_client, tmp_path)
+
+    for error in (RuntimeError("429 RESOURCE_EXHAUSTED. files/a"), RuntimeError("404 NOT_FOUND. models/x")):
+        chat.send_message.reset_mock()
+        chat.send_message.side_effect = [error, MagicMock(parts=[], usage_metadata=None)]
+        text, _ = provider.generate_chat([], "Hi", [img], "", {"resolution": "1K", "ratio": "1:1", "file_uploads": True})
+        assert text.startswith("Gemini Error:")
+        assert chat.send_message.call_count == 1
+    assert provider.file_cache.get("key", provider.file_cache.content_hash(tmp_path / "a.png"))
+
+@patch('core.factories.llm_factory.get_genai_client')
+def test_streamed_output_is_not_replayed(mock_get_client, tmp_path):
+    """Verify a stale-file error after the first chunk ends the turn instead of streaming it again."""
+    provider, chat, img = _provider_with_attachment(mock_get_client, tmp_path)
+
+    def stream(parts):
+        yield SimpleNamespace(parts=[SimpleNamespace(text="Hello ", inline_data=None)], usage_metadata=None)
+        raise RuntimeError("404 NOT_FOUND. File files/a not found")
+
+    chat.send_message_stream.side_effect = stream
+    chunks = []
+    text, _ = provider.generate_chat([], "Hi", [img], "", {"resolution": "1K", "ratio": "1:1", "file_uploads": True},
+                                     on_chunk=chunks.append)
+
+    assert chunks == ["Hello "]
+    assert chat.send_message_stream.call_count == 1
+    assert text.startswith("Gemini Error:")
@@ -18,7 +18,7 @@ def test_generation_service_init(mock_client_cls):
 
 @patch("PIL.Image.open")
 @patch("core.utils.image_utils.get_mime_type")
-def test_generate_image_flow(mock_mime, mock_img_open, service):
+def test_generate_image_flow(mock_mime, mock_img_open, service, tmp_path):
     """Verify the end-to-end generate_image flow with AI client mocks."""
     # 1. Mock source image
     mock_src_img = MagicMock(spec=Image.Image)
@@ -44,13 +44,35 @@ def test_generate_image_flow(mock_mime, mock_img_open, service):
         prompt_data = {"prompt": "A cute cat", "title": "Cat"}
         out_config = {"resolution": "2K", "ratio": "16:9", "project_out_dir": Path("/out")}
         
-        result = service.generate_image(prompt_data, Path("in.png"), out_config)
+        src = tmp_path / "in.png"
+        src.write_bytes(b"original-png-bytes")
+        result = service.generate_image(prompt_data, src, out_config)
         
         assert result["success"] is True
         assert result["saved_path"] == Path("/out/cat.png")
         service.client.models.generate_content.assert_called_once()
         mock_save.assert_called_once()
 
+        # Original file bytes are uploaded as-is (no re-encode)
+        mock_src_img.save.assert_not_called()
+        contents = service.client.models.generate_content.call_args.kwargs["contents"]
+        assert contents[0].parts[1].inline_data.data == b"original-png-bytes"
+
+def test_prepare_image_shared_across_prompts(service, tmp_path):
+    """Verify a source image is read once and reused for every prompt."""
+    src = tmp_path / "view.png"
+    Image.new("RGB", (64, 32)).save(src)
+
+    with patch.object(Path, "read_bytes", autospec=True, side_effect=Path.read_bytes) as mock_read:
+        first = service.prepare_image(src)
+        second = service.prepare_image(src)
+
+    assert first is second
+    assert mock_read.call_count == 1
+    assert first.size == (64, 32)
+    assert first.data == src.read_bytes()
+    assert first.mime_type == "image/png"
+
 @patch("PIL.Image.open")
 def test_save_generated_image_logic(mock_img_open, service, tmp_path):
     """Verify resolution checking and filename construction during save."""
@@ -1,11 +1,14 @@
+import json
 import os
 import pytest
+from unittest.mock import patch
+from core.constants import HISTORY_INDEX_FILE_NAME
 from core.history_manager import HistoryManager
 
 @pytest.fixture
 def history_manager(tmp_path):
     """Створює HistoryManager з використанням тимчасової папки."""
-    return HistoryManager(base_dir=tmp_path)
+    return HistoryManager(base_dir=tmp_path / "History")
 
 def test_create_session(history_manager):
     """Тест створення нової сесії."""
@@ -44,3 +47,191 @@ def test_create_folder(history_manager):
     folder_path = history_manager.base_dir / folder_name
     assert folder_path.exists()
     assert folder_path.is_dir()
+
+def test_list_sessions_uses_index(history_manager):
+    """Тест: список сесій береться з індексу, без читання файлів сесій."""
+    first_id, first = history_manager.create_session()
+    second_id, _ = history_manager.create_session(folder_name="Work")
+    first["messages"].append({"role": "user", "text": "Newest message"})
+    history_manager.save_session(first_id, first)
+
+    with patch("builtins.open", side_effect=AssertionError("session file opened")):
+        structure = history_manager.list_sessions()
+
+    assert [s["id"] for s in structure["sessions"]] == [first_id]
+    assert structure["sessions"][0]["title"] == "Newest message"
+    assert [s["id"] for s in structure["folders"]["Work"]] == [second_id]
+
+def test_index_follows_move_and_delete(history_manager):
+    """Тест: індекс оновлюється при переміщенні та видаленні."""
+    session_id, _ = history_manager.create_session()
+    history_manager.create_folder("Empty")
+    assert history_manager.move_session(session_id, "Work")
+
+    structure = history_manager.list_sessions()
+    assert structure["sessions"] == []
+    assert structure["folders"]["Empty"] == []
+    assert structure["folders"]["Work"][0]["folder"] == "Work"
+
+    history_manager.delete_folder("Work")
+    structure = history_manager.list_sessions()
+    assert "Work" not in structure["folders"]
+    assert history_manager.load_session(session_id) is None
+
+def test_existing_json_history_is_migrated(tmp_path):
+    """Тест: наявні JSON-сесії імпортуються в індекс при першому запуску."""
+    base = tmp_path / "History"
+    (base / "Archive").mkdir(parents=True)
+    for sid, folder, updated in (("a", "", "2026-01-01"), ("b", "", "2026-02-01"), ("c", "Archive", "2026-03-01")):
+        target = base / folder / f"{sid}.json" if folder else base / f"{sid}.json"
+        target.write_text(json.dumps({"id": sid, "title": sid.upper(), "updated_at": updated, "messages": []}), encoding="utf-8")
+
+    structure = HistoryManager(base_dir=base).list_sessions()
+
+    assert [s["id"] for s in structure["sessions"]] == ["b", "a"]
+    assert [s["title"] for s in structure["folders"]["Archive"]] == ["C"]
+    assert (base / HISTORY_INDEX_FILE_NAME).exists()
+
+def test_file_added_while_closed_is_indexed(tmp_path):
+    """Тест: сесія, скопійована в папку історії поки програма закрита, з'являється у списку після запуску."""
+    base = tmp_path / "History"
+    manager = HistoryManager(base_dir=base)
+    own_id, _ = manager.create_session()
+    manager.index.close()
+
+    (base / "Imported").mkdir()
+    (base / "Imported" / "ext.json").write_text(json.dumps({"id": "ext", "title": "External", "updated_at": "2026-01-01", "messages": []}), encoding="utf-8")
+
+    structure = HistoryManager(base_dir=base).list_sessions()
+    assert [s["id"] for s in structure["sessions"]] == [own_id]
+    assert [s["title"] for s in structure["folders"]["Imported"]] == ["External"]
+
+def test_file_deleted_while_closed_is_dropped(tmp_path):
+    """Тест: сесія, видалена з диска поки програма закрита, зникає зі списку після запуску."""
+    base = tmp_path / "History"
+    manager = HistoryManager(base_dir=base)
+    kept_id, _ = manager.create_session()
+    gone_id, _ = manager.create_session()
+    gone_path = manager._get_path(gone_id)
+    manager.index.close()
+
+    gone_path.unlink()
+
+    reopened = HistoryManager(base_dir=base)
+    assert [s["id"] for s in reopened.list_sessions()["sessions"]] == [kept_id]
+    assert reopened.index.get(gone_id) is None
+
+def test_append_message_does_not_rewrite_snapshot(history_manager):
+    """Тест: нове повідомлення дописується в лог, а знімок сесії не переписується."""
+    session_id, data = history_manager.create_session()
+    snapshot = history_manager._get_path(session_id)
+    before = snapshot.read_bytes()
+
+    history_manager.append_message(session_id, {"role": "user", "text": "Hello there"}, data)
+    history_manager.update_session(session_id, data, settings={"model": "m"})
+
+    assert snapshot.read_bytes() == before
+    assert data["title"] == "Hello there"
+    loaded = history_manager.load_session(session_id)
+    assert [m["text"] for m in loaded["messages"]] == ["Hello there"]
+    assert loaded["settings"] == {"model": "m"}
+    assert history_manager.list_sessions()["sessions"][0]["title"] == "Hello there"
+
+def test_log_is_compacted(history_manager):
+    """Тест: після COMPACT_AFTER записів лог згортається у знімок."""
+    history_manager.COMPACT_AFTER = 5
+    session_id, _ = history_manager.create_session()
+    for i in range(12):
+        history_manager.append_message(session_id, {"role": "user", "text": f"m{i}"})
+
+    snapshot = history_manager._get_path(session_id)
+    assert len(json.loads(snapshot.read_text(encoding="utf-8"))["messages"]) == 10
+    assert [m["text"] for m in history_manager.load_session(session_id)["messages"]] == [f"m{i}" for i in range(12)]
+
+def test_torn_log_line_is_skipped(history_manager):
+    """Тест: обірваний останній рядок логу (збій під час запису) ігнорується."""
+    session_id, _ = history_manager.create_session()
+    history_manager.append_message(session_id, {"role": "user", "text": "kept"})
+    log_path = history_manager._get_path(session_id).with_suffix(".jsonl")
+    with open(log_path, "ab") as f:
+        f.write(b'{"op": "append", "message": {"role": "mo')
+
+    history_manager.append_message(session_id, {"role": "user", "text": "after crash"})
+
+    assert [m["text"] for m in history_manager.load_session(session_id)["messages"]] == ["kept", "after crash"]
+
+def test_interrupted_compaction_does_not_duplicate(history_manager):
+    """Тест: збій між записом знімка та видаленням логу не дублює повідомлення."""
+    session_id, _ = history_manager.create_session()
+    history_manager.append_message(session_id, {"role": "user", "text": "one"})
+    log_path = history_manager._get_path(session_id).with_suffix(".jsonl")
+    saved_log = log_path.read_bytes()
+
+    history_manager.compact_session(session_id)
+    # Simulate the crash: the absorbed log is still on disk
+    (log_path.parent / f"{session_id}.compacting.jsonl").write_bytes(saved_log)
+    history_manager.append_message(session_id, {"role": "user", "text": "two"})
+
+    assert [m["text"] for m in history_manager.load_session(session_id)["messages"]] == ["one", "two"]
+
+def test_path_lookup_does_not_walk_tree(history_manager):
+    """Тест: пошук файлу сесії іде через індекс шляхів, без rglob."""
+    session_id, _ = history_manager.create_session()
+    other_id, _ = history_manager.create_session(folder_name="Work")
+    history_manager.move_session(session_id, "Archive")
+
+    with patch.object(type(history_manager.base_dir), "rglob", side_effect=AssertionError("tree walked")):
+        assert history_manager.load_session(session_id)["folder"] == "Archive"
+        assert history_manager.load_session(other_id) is not None
+        history_manager.delete_session(other_id)
+
+    assert history_manager.load_session(other_id) is None
+
+def test_sync_with_disk_picks_up_external_changes(history_manager):
+    """Тест: файли, додані чи видалені поза програмою, підхоплюються без повного сканування."""
+    session_id, _ = history_manager.create_session()
+    assert history_manager.sync_with_disk() is False  # own writes are already indexed
+
+    external = history_manager.base_dir / "Imported"
+    external.mkdir()
+    (external / "ext.json").write_text(json.dumps({"id": "ext", "title": "External", "updated_at": "2026-01-01", "messages": []}), encoding="utf-8")
+    history_manager._get_path(session_id).unlink()
+
+    assert history_manager.sync_with_disk() is True
+    structure = history_manager.list_sessions()
+    assert structure["sessions"] == []
+    assert [s["title"] for s in structure["folders"]["Imported"]] == ["External"]
+    assert history_manager.load_session("ext")["title"] == "External"
+
+def test_first_sync_compares_disk_with_index(tmp_path):
+    """Тест: перша синхронізація порівнює диск з індексом, а не лише запам'ятовує час зміни папок."""
+    base = tmp_path / "History"
+    HistoryManager(base_dir=base).index.close()
+    (base / "drop.json").write_text(json.dumps({"id": "drop", "title": "Dropped", "updated_at": "2026-01-01", "messages": []}), encoding="utf-8")
+
+    manager = HistoryManager(base_dir=base)
+    assert [s["title"] for s in manager.list_sessions()["sessions"]] == ["Dropped"]
+    assert manager.load_session("drop")["title"] == "Dropped"
+    assert manager.sync_with_disk() is False  # baseline now matches disk and index
+
+    (base / "drop.json").unlink()
+    assert manager.sync_with_disk() is True
+    assert manager.list_sessions()["sessions"] == []
+
+def test_changes_are_published(history_manager):
+    """Перевірка подій змін: створення, оновлення, переміщення, видалення."""
+    from core.history_manager import SESSION_CREATED, SESSION_UPDATED, SESSION_MOVED, SESSION_DELETED, FOLDER_DELETED
+    events = []
+    unsubscribe = history_manager.subscribe(events.append)
+
+    sid, data = history_manager.create_session()
+    history_manager.update_session(sid, data, title="Kitchen")
+    history_manager.move_session(sid, "Work")
+    history_manager.delete_folder("Work")
+    unsubscribe()
+    history_manager.delete_session(sid)
+
+    assert [e.kind for e in events] == [SESSION_CREATED, SESSION_UPDATED, SESSION_MOVED, FOLDER_DELETED]
+    assert events[1].info["title"] == "Kitchen"
+    assert events[2].info["folder"] == "Work"
+    assert all(e.session_id == sid for e in events[:3])
@@ -0,0 +1,111 @@
+import threading
+import time
+from core.jobs import CancellationToken, Job, JobExecutor, STARTED, PROGRESS, RESULT, ERROR, FINISHED
+
+def collect(job):
+    events = []
+    job.subscribe(lambda e: events.append((e.kind, e.args)))
+    return events
+
+def test_job_event_stream():
+    """Verify a job reports started, its own events, its result and finished in order."""
+    def work(job):
+        job.progress(50)
+        return "ok"
+
+    job = Job(work)
+    events = collect(job)
+    job.run()
+
+    assert events == [(STARTED, ()), (PROGRESS, (50,)), (RESULT, ("ok",)), (FINISHED, ())]
+    assert job.state == Job.DONE and job.done
+
+def test_job_error_is_reported():
+    def work(job):
+        raise ValueError("boom")
+
+    job = Job(work)
+    events = collect(job)
+    job.run()
+
+    assert [kind for kind, _ in events] == [STARTED, ERROR, FINISHED]
+    assert job.state == Job.FAILED and str(job.error) == "boom"
+
+def test_cancellation_token_callbacks():
+    """Verify cancel callbacks run once, and late registrations run immediately."""
+    token = CancellationToken()
+    calls = []
+    token.on_cancel(lambda: calls.append("early"))
+    token.cancel()
+    token.cancel()
+    token.on_cancel(lambda: calls.append("late"))
+
+    assert token.cancelled
+    assert calls == ["early", "late"]
+
+def test_executor_is_bounded():
+    """Verify no more than max_workers jobs run at once and queued ones still complete."""
+    executor = JobExecutor(max_workers=2, name="TestJob")
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0}
+    release = threading.Event()
+
+    def work(job):
+        with lock:
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+        release.wait(2)
+        with lock:
+            state["active"] -= 1
+
+    jobs = [executor.submit(Job(work)) for _ in range(5)]
+    deadline = time.monotonic() + 2
+    while state["active"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.05)  # a third job would have started by now
+    assert state["active"] == 2
+    release.set()
+    assert all(job.wait(5) for job in jobs)
+    assert state["peak"] == 2
+    assert executor.active_jobs == []
+    executor.shutdown()
+
+def test_cancelled_running_job_frees_its_slot():
+    """Verify a job stopped mid-run no longer blocks the queue, and the pool shrinks back once it returns."""
+    executor = JobExecutor(max_workers=1, name="TestJob")
+    gate = threading.Event()
+    stuck = executor.submit(Job(lambda job: gate.wait(5)))  # ignores cancellation, like a blocking call
+    deadline = time.monotonic() + 2
+    while stuck.state != Job.RUNNING and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    stuck.cancel()
+    follower = executor.submit(Job(lambda job: "ran"))
+    assert follower.wait(2) and follower.result == "ran"
+    assert not stuck.done
+
+    gate.set()
+    assert stuck.wait(5)
+    deadline = time.monotonic() + 2
+    while len(executor._threads) > 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(executor._threads) == 1
+    executor.shutdown()
+
+def test_cancelled_job_never_starts():
+    """Verify a job cancelled while queued finishes without running."""
+    executor = JobExecutor(max_workers=1, name="TestJob")
+    gate = threading.Event()
+    blocker = executor.submit(Job(lambda job: gate.wait(2)))
+    ran = []
+    queued = executor.submit(Job(lambda job: ran.append(True)))
+    events = collect(queued)
+
+    queued.cancel()
+    gate.set()
+
+    assert queued.wait(5) and blocker.wait(5)
+    assert ran == []
+    assert queued.state == Job.CANCELLED
+    assert events == [(FINISHED, ())]
+    executor.shutdown()
@@ -33,3 +33,50 @@ def test_llm_client_generate_call(mock_factory):
     
     assert text == "AI Response"
     assert img == "path/to/img.png"
+
+@patch('core.factories.llm_factory.get_genai_client')
+def test_gemini_provider_streams_text_and_keeps_image(mock_get_client):
+    """Verify streaming passes each text delta to on_chunk and returns the complete image."""
+    from core.factories.llm_factory import GeminiProvider
+
+    def chunk(text=None, data=None, usage=None):
+        part = MagicMock(text=text)
+        part.inline_data = MagicMock(data=data) if data else None
+        return MagicMock(parts=[part], usage_metadata=usage)
+
+    usage = MagicMock(prompt_token_count=42, candidates_token_count=7, total_token_count=49)
+    chat = mock_get_client.return_value.chats.create.return_value
+    chat.send_message_stream.return_value = iter([chunk("Hel"), chunk("lo"), chunk(data=b"png", usage=usage)])
+
+    provider = GeminiProvider("key", "gemini-3-pro-image-preview")
+    chunks = []
+    text, img = provider.generate_chat([], "Hi", [], "", {"resolution": "1K", "ratio": "1:1"}, on_chunk=chunks.append)
+
+    assert chunks == ["Hel", "lo"]
+    assert (text, img) == ("Hello", b"png")
+    assert provider.last_usage["prompt_tokens"] == 42
+    chat.send_message.assert_not_called()
+
+@patch('core.factories.llm_factory.get_genai_client')
+def test_streamed_and_blocking_replies_read_the_same(mock_get_client):
+    """Verify text around an image is joined identically with and without streaming."""
+    from core.factories.llm_factory import GeminiProvider
+
+    def part(text=None, data=None):
+        p = MagicMock(text=text)
+        p.inline_data = MagicMock(data=data) if data else None
+        return p
+
+    parts = [part("Here is "), part("the render:"), part(data=b"png"), part("Want changes?")]
+    chat = mock_get_client.return_value.chats.create.return_value
+    chat.send_message.return_value = MagicMock(parts=parts, usage_metadata=None)
+    chat.send_message_stream.return_value = iter([MagicMock(parts=[p], usage_metadata=None) for p in parts])
+
+    provider = GeminiProvider("key", "gemini-3-pro-image-preview")
+    config = {"resolution": "1K", "ratio": "1:1"}
+    blocking = provider.generate_chat([], "Hi", [], "", config)
+    chunks = []
+    streamed = provider.generate_chat([], "Hi", [], "", config, on_chunk=chunks.append)
+
+    assert blocking == streamed == ("Here is the render:\nWant changes?", b"png")
+    assert "".join(chunks) == blocking[0]
@@ -0,0 +1,108 @@
+import threading
+import pytest
+from unittest.mock import MagicMock, patch
+from core.services.rate_limiter import RateLimiter, is_retryable_error, get_retry_delay_hint
+from core.models import AppConfig
+
+class FakeAPIError(Exception):
+    def __init__(self, code, message=""):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+def test_daily_budget_is_enforced():
+    """Verify acquire() fails once today's usage reaches the RPD budget."""
+    limiter = RateLimiter(rpm=600, rpd=3, used_today=1, burst=10)
+    assert limiter.acquire() is True
+    assert limiter.acquire() is True
+    assert limiter.acquire() is False
+    assert limiter.is_exhausted is True
+
+def test_retries_are_not_charged():
+    """Verify a retry may run at the RPD limit and does not use up the budget."""
+    limiter = RateLimiter(rpm=600, rpd=1, burst=10)
+    assert limiter.acquire() is True
+    assert limiter.acquire(charge=False) is True
+    assert limiter.used_today == 1
+    assert limiter.acquire() is False
+
+def test_from_config_reads_todays_usage():
+    """Verify the limiter picks up the daily counter kept by track_api_usage."""
+    from datetime import datetime
+    config = AppConfig(gemini_rpm=30, gemini_rpd=100)
+    config.api_usage = {"date": datetime.now().strftime("%Y-%m-%d"), "count": 42}
+    limiter = RateLimiter.from_config(config)
+    assert limiter.used_today == 42
+    assert limiter.rpd == 100
+
+    config.api_usage = {"date": "2000-01-01", "count": 42}
+    assert RateLimiter.from_config(config).used_today == 0
+
+def test_daily_budget_is_opt_in():
+    """Verify the default config limits requests per minute only, never per day."""
+    from datetime import datetime
+    config = AppConfig()
+    config.api_usage = {"date": datetime.now().strftime("%Y-%m-%d"), "count": 10000}
+    limiter = RateLimiter.from_config(config)
+    assert limiter.rpd == 0
+    assert not limiter.is_exhausted
+    assert limiter.acquire() is True
+
+def test_aimd_rate_adaptation():
+    """Verify the rate halves on throttle and recovers additively on success."""
+    limiter = RateLimiter(rpm=60, base_backoff=0.01, max_backoff=0.01)
+    assert limiter.rate == pytest.approx(1.0)
+
+    limiter.on_throttled(0)
+    assert limiter.rate == pytest.approx(0.5)
+
+    limiter.on_success()
+    assert limiter.rate == pytest.approx(0.6)
+    for _ in range(20):
+        limiter.on_success()
+    assert limiter.rate == pytest.approx(1.0)
+
+def test_cancel_wakes_waiters():
+    """Verify cancel() releases threads blocked waiting for a token."""
+    limiter = RateLimiter(rpm=1, burst=1)
+    assert limiter.acquire() is True  # drain the bucket
+
+    results = []
+    t = threading.Thread(target=lambda: results.append(limiter.acquire()))
+    t.start()
+    limiter.cancel()
+    t.join(timeout=2)
+    assert results == [False]
+
+def test_retryable_error_detection():
+    assert is_retryable_error(FakeAPIError(429, "RESOURCE_EXHAUSTED"))
+    assert is_retryable_error(FakeAPIError(503, "UNAVAILABLE"))
+    assert not is_retryable_error(FakeAPIError(400, "INVALID_ARGUMENT"))
+    assert is_retryable_error(Exception("429 RESOURCE_EXHAUSTED. {'error': ...}"))
+    assert not is_retryable_error(Exception("400 Image files/abc503 is invalid"))
+    assert not is_retryable_error(Exception("Output 2024_0429.png not found"))
+    assert get_retry_delay_hint(Exception("{'retryDelay': '37s'}")) == 37.0
+
+@patch("PIL.Image.open")
+def test_generation_service_retries_on_429(mock_img_open, tmp_path):
+    """Verify GenerationService retries throttled calls through the limiter."""
+    from core.services.generation_service import GenerationService
+    mock_src = MagicMock()
+    mock_src.size = (100, 100)
+    mock_src.format = "PNG"
+    mock_img_open.return_value.__enter__.return_value = mock_src
+
+    limiter = RateLimiter(rpm=600, burst=10, base_backoff=0.01, max_backoff=0.01)
+    service = GenerationService("key", rate_limiter=limiter)
+    service.client = MagicMock()
+    response = MagicMock()
+    response.parts = [MagicMock()]
+    service.client.models.generate_content.side_effect = [FakeAPIError(429, "RESOURCE_EXHAUSTED"), response]
+
+    with patch.object(service, "_save_generated_image", return_value={"success": True}):
+        src = tmp_path / "in.png"
+        src.write_bytes(b"fake")
+        result = service.generate_image({"prompt": "p", "title": "t"}, src, {"ratio": "1:1"})
+
+    assert result["success"] is True
+    assert service.client.models.generate_content.call_count == 2
+    assert limiter.used_today == 1  # the retry is not charged again
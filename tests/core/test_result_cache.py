@@ -0,0 +1,64 @@
+import pytest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+from core.services.result_cache import ResultCache
+
+def test_cache_roundtrip_and_stats(tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    key = ResultCache.make_key("abc", {"prompt": "p", "image_size": "2K"})
+
+    assert cache.get(key) is None
+    cache.put(key, b"png-bytes")
+    assert cache.get(key) == b"png-bytes"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Survives a restart
+    assert ResultCache(tmp_path / "cache").get(key) == b"png-bytes"
+
+def test_cache_key_is_order_independent():
+    a = ResultCache.make_key("h", {"prompt": "p", "image_size": "2K", "aspect_ratio": "16:9"})
+    b = ResultCache.make_key("h", {"aspect_ratio": "16:9", "image_size": "2K", "prompt": "p"})
+    assert a == b
+    assert a != ResultCache.make_key("h", {"prompt": "p", "image_size": "4K", "aspect_ratio": "16:9"})
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=25)
+    cache.put("a", b"x" * 10)
+    cache.put("b", b"x" * 10)
+    cache.get("a")              # 'a' is now more recent than 'b'
+    cache.put("c", b"x" * 10)   # over budget -> evict 'b'
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.total_bytes <= 25
+
+@patch("PIL.Image.open")
+def test_generation_service_cache_hit_skips_api(mock_img_open, tmp_path):
+    """Verify a cache hit is materialised via _save_generated_image without an API call."""
+    from core.services.generation_service import GenerationService
+    mock_src = MagicMock()
+    mock_src.size = (100, 100)
+    mock_src.format = "PNG"
+    mock_img_open.return_value.__enter__.return_value = mock_src
+
+    cache = ResultCache(tmp_path)
+    service = GenerationService("key", result_cache=cache)
+    service.client = MagicMock()
+    response = MagicMock()
+    response.parts[0].inline_data.data = b"generated"
+    response.parts = [response.parts[0]]
+    service.client.models.generate_content.return_value = response
+
+    prompt = {"prompt": "p", "title": "t"}
+    config = {"resolution": "2K", "ratio": "16:9"}
+    src = tmp_path / "in.png"
+    src.write_bytes(b"fake")
+    with patch.object(service, "_save_generated_image", side_effect=lambda *a: {"success": True}) as mock_save:
+        first = service.generate_image(prompt, src, config)
+        second = service.generate_image(prompt, src, config)
+
+    assert first["cache_hit"] is False
+    assert second["cache_hit"] is True
+    assert service.client.models.generate_content.call_count == 1
+    assert mock_save.call_args_list[1].args[0] == b"generated"
@@ -0,0 +1,59 @@
+import pytest
+from core.services.task_journal import TaskJournal
+
+@pytest.fixture
+def source_image(tmp_path):
+    img = tmp_path / "view.png"
+    img.write_bytes(b"image-bytes")
+    return img
+
+def test_journal_persists_completed_tasks(tmp_path, source_image):
+    """Verify done records survive a reload and failed ones are retried."""
+    out_dir = tmp_path / "out"
+    journal = TaskJournal(out_dir)
+    done_key = journal.task_key("P1", source_image, "Sunny day", "2K", "16:9")
+    failed_key = journal.task_key("P1", source_image, "Dark night", "2K", "16:9")
+
+    journal.mark_done(done_key)
+    journal.mark_failed(failed_key)
+
+    reloaded = TaskJournal(out_dir)
+    assert reloaded.is_done(done_key) is True
+    assert reloaded.is_done(failed_key) is False
+
+def test_journal_key_depends_on_content_and_params(tmp_path, source_image):
+    journal = TaskJournal(tmp_path)
+    key = journal.task_key("P1", source_image, "Prompt", "2K", "16:9")
+
+    assert key == journal.task_key("P1", source_image, "Prompt", "2K", "16:9")
+    assert key != journal.task_key("P1", source_image, "Prompt", "4K", "16:9")
+    assert key != journal.task_key("P1", source_image, "Prompt edited", "2K", "16:9")
+
+    source_image.write_bytes(b"different-bytes")
+    assert key != journal.task_key("P1", source_image, "Prompt", "2K", "16:9")
+
+def test_journal_requires_output_to_exist(tmp_path, source_image):
+    """Verify a done task is re-run if its output file was deleted."""
+    journal = TaskJournal(tmp_path)
+    key = journal.task_key("P1", source_image, "Prompt", "1K", "1:1")
+    output = tmp_path / "result.png"
+    output.write_bytes(b"x")
+    journal.mark_done(key, output)
+    assert journal.is_done(key) is True
+
+    output.unlink()
+    assert journal.is_done(key) is False
+
+def test_journal_tolerates_torn_last_line(tmp_path, source_image):
+    """Verify a crash mid-append doesn't corrupt earlier or later records."""
+    journal = TaskJournal(tmp_path)
+    key_a = journal.task_key("P1", source_image, "A", "1K", "1:1")
+    key_b = journal.task_key("P1", source_image, "B", "1K", "1:1")
+    journal.mark_done(key_a)
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('{"t": "task", "key": "tor')
+
+    reloaded = TaskJournal(tmp_path)
+    assert reloaded.is_done(key_a) is True
+    reloaded.mark_done(key_b)
+    assert TaskJournal(tmp_path).is_done(key_b) is True
@@ -0,0 +1,78 @@
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+from core.services.task_planner import plan_batch, BatchTask
+from core.constants import API_PRICING
+
+@pytest.fixture
+def root(tmp_path):
+    """Projects root (tmp_path itself also holds the redirected config files)."""
+    path = tmp_path / "projects"
+    path.mkdir()
+    return path
+
+def make_project(root, name, images, prompts="### Day\nSunny day\n\n### Night\nDark night\n"):
+    project = root / name
+    project.mkdir()
+    (project / "prompts.md").write_text(prompts, encoding="utf-8")
+    for img in images:
+        (project / img).write_bytes(b"fake")
+    return project
+
+def test_plan_single_project(root):
+    """Verify single project mode yields one task per (image, prompt)."""
+    project = make_project(root, "P1", ["a.png", "b.jpg", "notes.txt"])
+    logs = []
+
+    plan = plan_batch(project, log=logs.append)
+
+    assert plan.projects == (project,)
+    assert plan.total == 4
+    assert all(isinstance(t, BatchTask) for t in plan.tasks)
+    assert {t.title for t in plan.tasks} == {"Day", "Night"}
+    assert any("Single Project Mode" in line for line in logs)
+
+def test_plan_multi_project_skips_invalid(root):
+    """Verify root mode plans every project and skips empty ones."""
+    make_project(root, "P1", ["a.png"])
+    make_project(root, "P2", [])
+    make_project(root, "P3", ["a.png"], prompts="no headers here")
+    logs = []
+
+    plan = plan_batch(root, log=logs.append)
+
+    assert len(plan.projects) == 3
+    assert plan.count_by_project() == {"P1": 2}
+    assert any("'P2': No images found" in line for line in logs)
+    assert any("'P3'" in line for line in logs)
+
+def test_plan_prefers_optimized_images(root):
+    """Verify images come from the 'optimized' subfolder when present."""
+    project = make_project(root, "P1", ["a.png"])
+    optimized = project / "optimized"
+    optimized.mkdir()
+    (optimized / "a_small.png").write_bytes(b"fake")
+
+    plan = plan_batch(project)
+
+    assert {t.image_path for t in plan.tasks} == {optimized / "a_small.png"}
+
+def test_plan_parses_each_project_once(root):
+    """Verify prompts.md is parsed exactly once per project."""
+    make_project(root, "P1", ["a.png"])
+    make_project(root, "P2", ["a.png"])
+
+    with patch("core.utils.prompt_parser.parse_markdown_prompts",
+               return_value=[{"title": "T", "prompt": "P"}]) as mock_parse:
+        plan = plan_batch(root)
+
+    assert mock_parse.call_count == 2
+    assert plan.total == 2
+
+def test_plan_estimate_cost(root):
+    """Verify the cost estimate uses the configured pricing table."""
+    project = make_project(root, "P1", ["a.png", "b.png"])
+    plan = plan_batch(project)
+
+    assert plan.estimate_cost("2K") == pytest.approx(4 * API_PRICING["2K"])
+    assert plan.estimate_cost("2K", task_count=1) == pytest.approx(API_PRICING["2K"])
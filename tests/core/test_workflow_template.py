@@ -0,0 +1,58 @@
+import copy
+import json
+from core.services.workflow_template import WorkflowTemplate
+
+MAPPING = {"LOAD_IMAGE": "10", "GEMINI_PROMPT": "20", "SAVE_IMAGE": "30"}
+
+def make_workflow(extra_nodes=50):
+    wf = {
+        "10": {"class_type": "LoadImage", "inputs": {"image": ""}},
+        "20": {"class_type": "Gemini", "inputs": {"prompt": "", "seed": 0, "model": ["5", 0]}},
+        "30": {"class_type": "SaveImage", "inputs": {"filename_prefix": "", "images": ["20", 0]}},
+    }
+    for i in range(extra_nodes):
+        wf[str(100 + i)] = {"class_type": "Note", "inputs": {"text": f"node {i}", "list": [1, 2, 3]}}
+    return wf
+
+PATCHES = {
+    "LOAD_IMAGE": {"image": "up.png"},
+    "GEMINI_PROMPT": {"prompt": "Sunny day", "seed": 42},
+    "SAVE_IMAGE": {"filename_prefix": "TEMP_view"},
+}
+
+def legacy_render(workflow):
+    """The previous approach: full deep copy, then patch in place."""
+    wf = json.loads(json.dumps(workflow))
+    wf["10"]["inputs"]["image"] = "up.png"
+    wf["20"]["inputs"].update(prompt="Sunny day", seed=42)
+    wf["30"]["inputs"]["filename_prefix"] = "TEMP_view"
+    return wf
+
+def test_render_matches_deep_copy_approach():
+    """Verify the rendered payload is identical to the deep-copy-and-patch result."""
+    workflow = make_workflow()
+    template = WorkflowTemplate(workflow, MAPPING)
+
+    assert json.dumps(template.render(PATCHES), sort_keys=True) == json.dumps(legacy_render(workflow), sort_keys=True)
+
+def test_render_leaves_template_untouched():
+    """Verify rendering never mutates the template and shares unpatched nodes."""
+    workflow = make_workflow()
+    original = copy.deepcopy(workflow)
+    template = WorkflowTemplate(workflow, MAPPING)
+
+    first = template.render(PATCHES)
+    second = template.render({"GEMINI_PROMPT": {"prompt": "Night"}})
+
+    assert workflow == original
+    assert first["20"]["inputs"]["prompt"] == "Sunny day"
+    assert second["20"]["inputs"]["prompt"] == "Night"
+    assert second["10"] is workflow["10"]  # not patched -> shared
+    assert first["100"] is workflow["100"]
+
+def test_missing_roles_are_ignored():
+    """Verify roles absent from the workflow are skipped."""
+    template = WorkflowTemplate({"10": {"inputs": {"image": ""}}}, MAPPING)
+
+    assert template.patch_points == {"LOAD_IMAGE": "10"}
+    assert template.render(PATCHES) == {"10": {"inputs": {"image": "up.png"}}}
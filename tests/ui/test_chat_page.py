@@ -31,6 +31,7 @@ def test_send_message_updates_ui(qtbot, chat_interface, monkeypatch):
     class MockWorker(QObject):
         response_signal = Signal(object) # Now object per BaseWorker
         error_signal = Signal(str)
+        chunk_signal = Signal(str)
         def __init__(self, *args, **kwargs):
             super().__init__()
             self.user_message = args[3] if len(args) > 3 else ""
@@ -21,6 +21,7 @@ def test_error_visualization_in_chat(qtbot, chat_interface, monkeypatch):
     class ErrorWorker(QObject):
         response_signal = Signal(object)
         error_signal = Signal(str)
+        chunk_signal = Signal(str)
         def __init__(self, *args, **kwargs):
             super().__init__()
         def start(self):
@@ -0,0 +1,74 @@
+import pytest
+from ui.widgets.chat import ChatMessageArea
+
+def _messages(n):
+    return [{"role": "user" if i % 2 else "model", "text": f"Message {i}"} for i in range(n)]
+
+@pytest.fixture
+def area(qtbot):
+    widget = ChatMessageArea()
+    qtbot.addWidget(widget)
+    widget.resize(500, 600)
+    widget.show()
+    return widget
+
+def test_long_session_renders_last_page_only(area):
+    """Перевірка, що довга сесія створює бабли лише для останньої сторінки."""
+    area.set_messages(_messages(300))
+
+    assert area.message_count() == 300
+    assert area.rendered_count() == area.PAGE_SIZE
+    assert area._bubbles[-1].bubble.text() == "Message 299"
+
+def test_scrolling_up_loads_older_pages_within_budget(qtbot, area):
+    """Перевірка підвантаження старших сторінок і обмеження кількості віджетів."""
+    area.set_messages(_messages(300))
+    qtbot.wait(100)
+    vsb = area.scroll_area.verticalScrollBar()
+
+    for _ in range(6):
+        vsb.setValue(0)
+        qtbot.wait(150)
+
+    assert area._first < 300 - area.PAGE_SIZE
+    assert area.rendered_count() <= area.MAX_RENDERED
+
+def test_new_message_jumps_back_to_latest(qtbot, area):
+    """Перевірка, що нове повідомлення повертає вікно до кінця розмови."""
+    area.set_messages(_messages(300))
+    qtbot.wait(100)
+    vsb = area.scroll_area.verticalScrollBar()
+    for _ in range(4):
+        vsb.setValue(0)
+        qtbot.wait(150)
+
+    area.add_user_message("Newest")
+
+    assert area.message_count() == 301
+    assert area._bubbles[-1].bubble.text() == "Newest"
+    assert area.rendered_count() <= area.MAX_RENDERED
+
+def test_streamed_reply_updates_one_bubble(area):
+    """Перевірка, що відповідь, яка стрімиться, оновлює один бабл на місці."""
+    area.add_user_message("Question")
+    area.set_streaming_text("Hel")
+    bubble = area._bubbles[-1]
+    area.set_streaming_text("Hello wor")
+
+    assert area.message_count() == 2
+    assert area._bubbles[-1] is bubble
+    assert bubble.bubble.text() == "Hello wor"
+
+    area.finish_streaming_message("Hello world")
+    assert area.message_count() == 2
+    assert area._bubbles[-1].bubble.text() == "Hello world"
+    assert not area.is_streaming()
+
+def test_failed_stream_is_discarded(area):
+    """Перевірка, що часткова відповідь видаляється при помилці."""
+    area.add_user_message("Question")
+    area.set_streaming_text("Partial")
+    area.discard_streaming_message()
+
+    assert area.message_count() == 1
+    assert area.rendered_count() == 1
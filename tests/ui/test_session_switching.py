@@ -43,3 +43,79 @@ def test_switching_sessions_updates_display(qtbot, chat_with_history):
     
     # Перевіримо, що вміст дійсно інший (можна по тексту баблів)
     # Але для UI тесту достатньо перевірки виклику завантаження
+
+def test_generation_runs_per_session(qtbot, chat_with_history, monkeypatch):
+    """Перевірка, що генерація в одній сесії не блокує іншу, а відповідь потрапляє у свою сесію."""
+    from PySide6.QtCore import QObject, Signal
+    from core.models import GenerationResult
+    class PendingWorker(QObject):
+        response_signal = Signal(object)
+        error_signal = Signal(str)
+        chunk_signal = Signal(str)
+        def __init__(self, *args, **kwargs):
+            super().__init__()
+            self.session_id = kwargs.get("session_id")
+            self.partial_text = ""
+        def start(self): pass
+        def isRunning(self): return True
+        
+    monkeypatch.setattr("ui.pages.chat_page.ChatWorker", PendingWorker)
+    interface, sid1, sid2 = chat_with_history
+    from core.utils import config_helper
+    interface.config_manager = config_helper.config_manager
+    monkeypatch.setattr(config_helper.config_manager.config, "api_key", "mock-key")
+    
+    # Запускаємо генерацію в першій сесії і перемикаємось на другу
+    interface.on_session_selected_by_id(sid1)
+    interface.on_send_clicked("Draw a chair", interface.control_panel.get_chat_config())
+    worker1 = interface.workers[sid1]
+    interface.on_session_selected_by_id(sid2)
+    assert interface.control_panel.input_area.btn_send.isEnabled()
+    
+    # Друга сесія не заблокована
+    interface.on_send_clicked("Draw a table", interface.control_panel.get_chat_config())
+    assert set(interface.workers) == {sid1, sid2}
+    
+    # Відповідь першої сесії записується у її лог, а не у відкриту
+    worker1.response_signal.emit(GenerationResult(success=True, text_response="Chair done", session_id=sid1))
+    assert sid1 not in interface.workers
+    assert interface.history_manager.load_session(sid1)["messages"][-1]["text"] == "Chair done"
+    assert all(m["text"] != "Chair done" for m in interface.current_session["messages"])
+    
+    # Друга сесія все ще чекає на свою відповідь
+    assert not interface.control_panel.input_area.btn_send.isEnabled()
+
+def test_force_stop_does_not_block(qtbot, chat_with_history, monkeypatch):
+    """Перевірка, що зупинка не чекає на завершення запиту, а пізня відповідь нікуди не потрапляє."""
+    from PySide6.QtCore import QObject, Signal
+    from core.models import GenerationResult
+    class StuckWorker(QObject):
+        response_signal = Signal(object)
+        error_signal = Signal(str)
+        chunk_signal = Signal(str)
+        def __init__(self, *args, **kwargs):
+            super().__init__()
+            self.session_id = kwargs.get("session_id")
+            self.partial_text = ""
+            self.stopped = False
+        def start(self): pass
+        def isRunning(self): return True
+        def stop(self): self.stopped = True
+        def wait(self, msecs=None): raise AssertionError("UI thread blocked on a stopped worker")
+
+    monkeypatch.setattr("ui.pages.chat_page.ChatWorker", StuckWorker)
+    interface, sid1, _ = chat_with_history
+    from core.utils import config_helper
+    interface.config_manager = config_helper.config_manager
+    monkeypatch.setattr(config_helper.config_manager.config, "api_key", "mock-key")
+
+    interface.on_session_selected_by_id(sid1)
+    interface.on_send_clicked("Draw a chair", interface.control_panel.get_chat_config())
+    worker = interface.workers[sid1]
+    interface.force_stop_worker()
+
+    assert worker.stopped and sid1 not in interface.workers
+    assert interface.control_panel.input_area.btn_send.isEnabled()
+    messages = len(interface.history_manager.load_session(sid1)["messages"])
+    worker.response_signal.emit(GenerationResult(success=True, text_response="Too late", session_id=sid1))
+    assert len(interface.history_manager.load_session(sid1)["messages"]) == messages
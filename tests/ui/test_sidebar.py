@@ -1,6 +1,8 @@
 import pytest
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QPersistentModelIndex
 from ui.widgets.chat.sidebar import ChatSidebar
+from ui.widgets.chat.session_model import ID_ROLE
+from core.history_manager import HistoryManager
 
 @pytest.fixture
 def sidebar(qtbot):
@@ -11,7 +13,7 @@ def sidebar(qtbot):
 
 def test_sidebar_initialization(sidebar):
     """Перевірка початкового стану сайдбару."""
-    assert sidebar.history_list.topLevelItemCount() == 0
+    assert sidebar.count() == 0
     assert sidebar.btn_new.text() == "New Chat"
 
 def test_sidebar_populate_sessions(sidebar):
@@ -30,13 +32,13 @@ def test_sidebar_populate_sessions(sidebar):
     sidebar.set_sessions(mock_structure)
     
     # 2 Top level items: folder "Work" and session "Session 2"
-    assert sidebar.history_list.topLevelItemCount() == 2
+    assert sidebar.count() == 2
     
     # Check folder item
-    folder_item = sidebar.history_list.topLevelItem(0)
-    assert folder_item.text(0) == "Work"
-    assert folder_item.childCount() == 1
-    assert folder_item.child(0).text(0) == "Session 1"
+    folder_item = sidebar.model.index(0, 0)
+    assert folder_item.data() == "Work"
+    assert sidebar.model.rowCount(folder_item) == 1
+    assert sidebar.model.index(0, 0, folder_item).data() == "Session 1"
 
 def test_sidebar_signals(qtbot, sidebar):
     """Перевірка сигналів при кліку на сесію."""
@@ -45,9 +47,40 @@ def test_sidebar_signals(qtbot, sidebar):
         "sessions": [{"id": "s-test", "title": "Test Session", "updated_at": "", "folder": ""}]
     }
     sidebar.set_sessions(mock_structure)
-    item = sidebar.history_list.topLevelItem(0)
+    item = sidebar.model.index(0, 0)
     
     with qtbot.waitSignal(sidebar.sessionSelected) as blocker:
         sidebar._on_item_clicked(item)
     
     assert blocker.args == ["s-test"]
+
+def test_sidebar_follows_history_changes(qtbot, tmp_path):
+    """Перевірка, що сайдбар оновлює лише змінені рядки за подіями HistoryManager."""
+    hm = HistoryManager(base_dir=tmp_path / "History")
+    sid_old, _ = hm.create_session()
+    sidebar = ChatSidebar()
+    qtbot.addWidget(sidebar)
+    sidebar.set_history(hm)
+    
+    resets = []
+    sidebar.model.modelReset.connect(lambda: resets.append(True))
+    tracked = QPersistentModelIndex(sidebar.model.index_for_session(sid_old))
+    
+    # Нова сесія з'являється зверху
+    sid_new, _ = hm.create_session()
+    assert sidebar.model.index(0, 0).data(ID_ROLE) == sid_new
+    
+    # Нове повідомлення піднімає стару сесію нагору і дає їй назву
+    hm.append_message(sid_old, {"role": "user", "text": "Render a kitchen"})
+    assert sidebar.model.index(0, 0).data() == "Render a kitchen"
+    assert tracked.row() == 0
+    
+    # Переміщення у папку та видалення
+    hm.move_session(sid_new, "Work")
+    folder = sidebar.model.index(0, 0)
+    assert folder.data() == "Work"
+    assert sidebar.model.index(0, 0, folder).data(ID_ROLE) == sid_new
+    hm.delete_folder("Work")
+    hm.delete_session(sid_old)
+    assert sidebar.count() == 0
+    assert resets == []
@@ -453,6 +453,12 @@ class MessageBubble(QWidget):
             layout.addWidget(self.content_container, 1)
             layout.addStretch()
 
+    def set_text(self, text: str) -> None:
+        """Replace the bubble text in place (used while a reply streams in)"""
+        self.bubble.setText(text)
+        if text and self.content_layout.indexOf(self.bubble) < 0:
+            self.content_layout.addWidget(self.bubble)
+
     def on_image_opened(self, path: str) -> None:
         """Open image in default system viewer"""
         if os.path.exists(path):
@@ -545,13 +551,16 @@ class TypingBubble(QWidget):
 class AttachmentTrayItem(QWidget):
     """
     Component for single attachment preview in the tray.
-    Encapsulates preview and removal logic.
+    Encapsulates preview, pin and removal logic.
+    Pinned images stay attached to every message of the session.
     """
     removed = Signal(str)  # Emits path
+    pinToggled = Signal(str)  # Emits path
 
-    def __init__(self, path: str, parent: Optional[QWidget] = None) -> None:
+    def __init__(self, path: str, parent: Optional[QWidget] = None, pinned: bool = False) -> None:
         super().__init__(parent)
         self.path = path
+        self.pinned = pinned
         layout = QVBoxLayout(self)
         layout.setContentsMargins(0, 0, 0, 0)
         layout.setSpacing(2)
@@ -568,9 +577,19 @@ class AttachmentTrayItem(QWidget):
         self.lbl.setStyleSheet(f"border: 1px solid {border}; border-radius: 6px; background: {bg};")
         layout.addWidget(self.lbl, 0, Qt.AlignCenter)
 
-        # Remove button
+        # Pin + Remove buttons
+        buttons = QHBoxLayout()
+        buttons.setContentsMargins(0, 0, 0, 0)
+        buttons.setSpacing(2)
+        self.btn_pin = ToolButton(FluentIcon.UNPIN if pinned else FluentIcon.PIN)
+        self.btn_pin.setFixedSize(18, 18)
+        self.btn_pin.setCursor(Qt.PointingHandCursor)
+        self.btn_pin.setToolTip("Unpin reference image" if pinned else "Pin: keep sending with every message")
+        self.btn_pin.clicked.connect(lambda: self.pinToggled.emit(self.path))
+        buttons.addWidget(self.btn_pin)
+
         self.btn_remove = PushButton("×")
-        self.btn_remove.setFixedSize(60, 18)
+        self.btn_remove.setFixedSize(40, 18)
         self.btn_remove.setCursor(Qt.PointingHandCursor)
         self.btn_remove.clicked.connect(lambda: self.removed.emit(self.path))
         
@@ -586,7 +605,8 @@ class AttachmentTrayItem(QWidget):
             }}
             QPushButton:hover {{ background-color: {UIConfig.DANGER_HOVER}; }}
         """)
-        layout.addWidget(self.btn_remove, 0, Qt.AlignCenter)
+        buttons.addWidget(self.btn_remove)
+        layout.addLayout(buttons)
 
 class ChatTextEdit(TextEdit):
     """Single-line auto-expanding chat input (Ollama-style)"""
@@ -13,6 +13,9 @@ from core import constants
 
 # Workers
 from core.workers.batch_worker import BatchWorker
+from core.services.rate_limiter import RateLimiter
+from core.services.result_cache import ResultCache
+from core.utils.path_provider import PathProvider
 from core.workers.comfy_worker import ComfyWorker
 
 from ui.components import NPBasePage
@@ -105,8 +108,14 @@ class BatchPage(NPBasePage):
         ratio_text = gen_cfg["ratio"]
         fmt_text = gen_cfg["format"]
 
-        # Get timeout from config
+        # Get timeout and parallelism from config
         timeout = self.config_manager.config.api_timeout
+        concurrency = self.config_manager.config.batch_concurrency
+
+        result_cache = None
+        if state.get("batch_result_cache", False):
+            max_bytes = self.config_manager.config.result_cache_max_mb * 1024 * 1024
+            result_cache = ResultCache(PathProvider().get_result_cache_dir(), max_bytes)
 
         self.worker = BatchWorker(
             key, in_path, out_path,
@@ -114,6 +123,10 @@ class BatchPage(NPBasePage):
             fmt_text,
             self.MODEL_ID, state.get("batch_save_logs", True),
             timeout, # Pass timeout
+            max_concurrency=concurrency,
+            rate_limiter=RateLimiter.from_config(self.config_manager.config),
+            resume=state.get("batch_resume", True),
+            result_cache=result_cache,
             parent=self
         )
         self._connect_signals()
@@ -132,6 +145,7 @@ class BatchPage(NPBasePage):
         gen_cfg = self.config_panel.gen_config.get_config()
         settings = {
             "comfy_url": self.config_manager.config.comfy_url or constants.DEFAULT_COMFY_URL,
+            "comfy_urls": [self.config_manager.config.comfy_url or constants.DEFAULT_COMFY_URL] + list(self.config_manager.config.comfy_extra_urls),
             "api_key": self.config_manager.config.comfy_api_key,
             "input_path": in_path,
             "output_path": out_path,
@@ -142,7 +156,11 @@ class BatchPage(NPBasePage):
             "system_prompt": self.config_panel.text_sys_prompt.toPlainText(),
             "use_random_seed": self.config_panel.check_random_seed.isChecked(),
             "seed_value": self.config_panel.spin_seed.value(),
-            "save_logs": state.get("batch_save_logs", True)
+            "save_logs": state.get("batch_save_logs", True),
+            "resume": state.get("batch_resume", True),
+            "result_cache": state.get("batch_result_cache", False),
+            "result_cache_max_mb": self.config_manager.config.result_cache_max_mb,
+            "queue_depth": self.config_manager.config.comfy_queue_depth
         }
         
         self.worker = ComfyWorker(settings)
@@ -157,7 +175,7 @@ class BatchPage(NPBasePage):
         self.worker.preview_signal.connect(self.monitor_panel.update_preview)
         self.worker.finished_signal.connect(self.on_finished)
         self.worker.error_signal.connect(self.handle_critical_error)
-        self.worker.finished.connect(self.worker.deleteLater)
+        self.worker.finished_signal.connect(self.worker.deleteLater)
 
     def handle_critical_error(self, e):
         self.append_log(f"CRITICAL ERROR: {e}")
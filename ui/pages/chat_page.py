@@ -15,6 +15,7 @@ from ui.components import InputDialog, UIConfig, NPBasePage
 
 # Managers & Core
 from core.workers.chat_worker import ChatWorker
+from core.jobs import JobExecutor
 from core.history_manager import HistoryManager
 from core.utils import config_helper
 from core import constants
@@ -40,10 +41,14 @@ class ChatInterface(NPBasePage):
         self.current_session = None
         self.current_session_id = None
         self.chat_history_api = []
-        self.worker = None
+        # One worker per generating session, all on a bounded pool, so a slow
+        # generation in one chat doesn't block the others
+        self.workers: Dict[str, ChatWorker] = {}
+        self.chat_executor = JobExecutor(config_helper.get_value("chat_max_parallel", 3), name="Chat")
         
         self._setup_ui()
-        self._refresh_sidebar()
+        # Listed once; from then on the sidebar follows HistoryManager change events
+        self.chat_sidebar.set_history(self.history_manager)
         
         # Auto-load latest session
         if self.chat_sidebar.count() > 0:
@@ -83,6 +88,7 @@ class ChatInterface(NPBasePage):
         self.control_panel.clearClicked.connect(self.clear_current_chat)
         self.control_panel.folderClicked.connect(self.open_output_folder)
         self.control_panel.stopClicked.connect(self.force_stop_worker)
+        self.control_panel.pinnedChanged.connect(self.save_pinned_images)
         content_layout.addWidget(self.control_panel)
         
         self.splitter.addWidget(self.content_widget)
@@ -103,27 +109,19 @@ class ChatInterface(NPBasePage):
 
     # --- Session Management ---
 
-    def _refresh_sidebar(self):
-        sessions = self.history_manager.list_sessions()
-        self.chat_sidebar.set_sessions(sessions)
-
-    def start_new_chat(self, refresh_sidebar: bool = True):
-        """Create a new chat session.
-        
-        Args:
-            refresh_sidebar: If False, skip sidebar refresh (used when called as fallback after deletion)
-        """
+    def start_new_chat(self):
+        """Create a new chat session (the sidebar picks it up from the history change event)."""
         self.current_session_id, self.current_session = self.history_manager.create_session()
         self.chat_history_api = []
         self.message_display.clear()
         self.message_display.add_ai_message("Hello! I am your AI assistant.")
-        
-        if refresh_sidebar:
-            self._refresh_sidebar()
+        self.control_panel.set_pinned_images([])
+        self._restore_session_state()
+        self.chat_sidebar.select_session(self.current_session_id)
         
         if self.current_session:
-            self.current_session["settings"] = self.control_panel.get_chat_config()
-            self.history_manager.save_session(self.current_session_id, self.current_session)
+            self.history_manager.update_session(self.current_session_id, self.current_session,
+                                                settings=self.control_panel.get_chat_config())
 
     def on_session_selected_by_id(self, sid: str):
         if sid == self.current_session_id: return
@@ -134,22 +132,33 @@ class ChatInterface(NPBasePage):
             self._load_chat_from_data(data)
 
     def _load_chat_from_data(self, data):
-        self.message_display.clear()
-        self.chat_history_api = []
-        
-        for msg in data.get("messages", []):
-            is_user = (msg["role"] == "user")
-            text = msg.get("text", "")
-            imgs = msg.get("images", [])
-            
-            if is_user: self.message_display.add_user_message(text, imgs)
-            else: self.message_display.add_ai_message(text, imgs)
-            
-            self.chat_history_api.append({"role": msg["role"], "text": text})
+        messages = data.get("messages", [])
+        # The display renders the newest page only and pages in older ones on scroll
+        self.message_display.set_messages(messages)
+        # User attachments ride along so they stay in context (sent as uploaded file references)
+        self.chat_history_api = [
+            {"role": msg["role"], "text": msg.get("text", ""),
+             "images": list(msg.get("images", [])) if msg["role"] == "user" else []}
+            for msg in messages
+        ]
             
         self.control_panel.set_chat_config(data.get("settings", {}))
+        self.control_panel.set_pinned_images(data.get("pinned_images", []))
+        self._restore_session_state()
         QTimer.singleShot(100, self.message_display.scroll_to_bottom)
 
+    def _restore_session_state(self):
+        """Show the busy state of the session on screen: locked input plus typing or the reply so far."""
+        worker = self.workers.get(self.current_session_id)
+        self.control_panel.set_enabled(worker is None)
+        if worker is None:
+            return
+        partial = getattr(worker, 'partial_text', "")
+        if partial:
+            self.message_display.set_streaming_text(partial)
+        else:
+            self.message_display.show_typing_indicator(True)
+
     def handle_dropped_files(self, paths: List[str]):
         """Delegate attachment handling to control panel"""
         self.control_panel.handle_dropped_files(paths)
@@ -157,7 +166,7 @@ class ChatInterface(NPBasePage):
     # --- Core Logic ---
 
     def on_send_clicked(self, text: str, config: dict) -> None:
-        if self.worker and self.worker.isRunning(): return
+        if self.current_session_id in self.workers: return
         imgs = self.control_panel.get_current_images()
         if not text and not imgs: return
         
@@ -167,11 +176,10 @@ class ChatInterface(NPBasePage):
         self.control_panel.clear_input()
         
         if self.current_session:
-            self.current_session["messages"].append({
+            self.history_manager.append_message(self.current_session_id, {
                 "role": "user", "text": text, "images": list(imgs),
                 "timestamp": datetime.datetime.now().isoformat()
-            })
-            self.history_manager.save_session(self.current_session_id, self.current_session)
+            }, self.current_session)
         
         api_key = self.config_manager.config.api_key
         if not api_key:
@@ -189,91 +197,125 @@ class ChatInterface(NPBasePage):
             img_mode=config["img_mode"]
         )
         
-        self.worker = ChatWorker(
+        worker = ChatWorker(
             api_key=api_key,
             config=gen_config,
-            history=self.chat_history_api, 
+            history=list(self.chat_history_api),
             user_message=text,
             image_paths=imgs,
-            session_id=self.current_session_id
+            session_id=self.current_session_id,
+            pinned_images=list(self.control_panel.get_pinned_images()),
+            executor=self.chat_executor
         )
-        self.worker.response_signal.connect(self.on_response)
-        self.worker.error_signal.connect(self.on_error)
+        # Mirrors the session log, which already holds the user message
+        self.chat_history_api.append({"role": "user", "text": text, "images": list(imgs)})
+        worker.response_signal.connect(self.on_response)
+        worker.chunk_signal.connect(self.on_chunk)
+        worker.error_signal.connect(self.on_error)
+        self.workers[self.current_session_id] = worker
         
         self.showStateToolTip("Thinking", "Gemini is analyzing your request...")
-        self.worker.start()
+        worker.start()
+
+    def _detach_worker(self, worker):
+        for signal, slot in ((worker.response_signal, self.on_response), (worker.chunk_signal, self.on_chunk),
+                             (worker.error_signal, self.on_error)):
+            try:
+                signal.disconnect(slot)
+            except (RuntimeError, TypeError):
+                pass  # never connected
+
+    def _release_worker(self, worker) -> Optional[str]:
+        """Forget a finished worker; returns its session id, or None if it was already released (stopped)."""
+        sid = getattr(worker, 'session_id', None)
+        if sid is None or self.workers.get(sid) is not worker:
+            return None
+        del self.workers[sid]
+        return sid
+
+    def _finish_state(self, title: str, content: str):
+        """Completes the progress tooltip, keeping one up while other sessions are still generating."""
+        self.finishStateToolTip(title, content)
+        if self.workers:
+            self.showStateToolTip("Thinking", f"{len(self.workers)} chat(s) still generating...")
+
+    def on_chunk(self, _text: str) -> None:
+        """Grow the streamed reply in place (only for the session on screen)."""
+        worker = self.sender()
+        if getattr(worker, 'session_id', self.current_session_id) != self.current_session_id:
+            return
+        self.message_display.show_typing_indicator(False)
+        # Full text so far, so a reply resumed after switching sessions is complete
+        self.message_display.set_streaming_text(getattr(worker, 'partial_text', _text))
 
     def on_response(self, result) -> None:
         from core.models import GenerationResult
         
+        sid = self._release_worker(self.sender())
+        if sid is None:
+            return  # Stopped by the user: the reply is dropped
+        
+        status = "Response received"
         try:
             # Unpack standardized result
             if isinstance(result, GenerationResult):
                 text = result.text_response or ""
                 image_path = result.output_path
-                sid = result.session_id or self.current_session_id
+                context = result.metadata.get("context", {})
+                tokens = context.get("prompt_tokens") or context.get("estimated_tokens")
+                if tokens:
+                    status = f"Response received ({tokens:,} tokens sent)"
             else:
                 # Legacy fallback (tuple)
                 text, image_path = result
-                worker = self.sender()
-                sid = getattr(worker, 'session_id', self.current_session_id)
             
-            is_active = (sid == self.current_session_id)
             imgs = [image_path] if image_path else []
+            message = {
+                "role": "model", "text": text, "images": imgs,
+                "timestamp": datetime.datetime.now().isoformat()
+            }
             
-            if is_active:
-                self.message_display.show_typing_indicator(False)
-                
-                # Get original user message from worker
-                worker = self.sender()
-                user_msg = getattr(worker, 'user_message', '')
-                self.chat_history_api.append({"role": "user", "text": user_msg})
+            if sid == self.current_session_id:
                 self.chat_history_api.append({"role": "model", "text": text})
-                self.message_display.add_ai_message(text, imgs)
-                
+                self.message_display.finish_streaming_message(text, imgs)
                 if self.current_session:
-                    self.current_session["messages"].append({
-                        "role": "model", "text": text, "images": imgs,
-                        "timestamp": datetime.datetime.now().isoformat()
-                    })
-                    self.history_manager.save_session(sid, self.current_session)
+                    self.history_manager.append_message(sid, message, self.current_session)
             else:
-                # Background session update
-                data = self.history_manager.load_session(sid)
-                if data:
-                    data["messages"].append({
-                        "role": "model", "text": text, "images": imgs,
-                        "timestamp": datetime.datetime.now().isoformat()
-                    })
-                    self.history_manager.save_session(sid, data)
+                # Background session update: appended to its log without loading it
+                self.history_manager.append_message(sid, message)
         finally:
-            # ALWAYS re-enable UI, regardless of which session is active
-            self.message_display.show_typing_indicator(False)
-            self.finishStateToolTip("Ready", "Response received")
-            self.control_panel.set_enabled(True)
+            # Only the session that finished is unlocked; others keep their own state
+            if sid == self.current_session_id:
+                self.message_display.show_typing_indicator(False)
+                self.control_panel.set_enabled(True)
+            self._finish_state("Ready", status)
 
     def on_error(self, error_msg: str):
-        try:
-            worker = self.sender()
-            sid = getattr(worker, 'session_id', self.current_session_id)
-            
-            if sid == self.current_session_id:
-                self.message_display.add_ai_message(f"❌ Error: {error_msg}")
-        finally:
+        sid = self._release_worker(self.sender())
+        if sid is None:
+            return
+        
+        if sid == self.current_session_id:
+            self.message_display.discard_streaming_message()
             self.message_display.show_typing_indicator(False)
-            self.finishStateToolTip("Error", "Generation failed")
+            self.message_display.add_ai_message(f"❌ Error: {error_msg}")
             self.control_panel.set_enabled(True)
+        self._finish_state("Error", "Generation failed")
 
     # --- UI Actions ---
 
     def force_stop_worker(self):
-        """Hard-stop the current chat worker and unlock the UI."""
-        if self.worker and self.worker.isRunning():
-            self.worker.stop()
-            self.worker.wait(2000)
+        """Hard-stop the chat worker of the session on screen and unlock its input."""
+        worker = self.workers.pop(self.current_session_id, None)
+        if worker:
+            # No wait: the job drains in the background without holding a chat slot,
+            # and whatever it still delivers goes nowhere
+            worker.stop()
+            self._detach_worker(worker)
         
+        self.message_display.discard_streaming_message()
         self.message_display.show_typing_indicator(False)
-        self.finishStateToolTip("Stopped", "Generation cancelled by user")
+        self._finish_state("Stopped", "Generation cancelled by user")
         self.control_panel.set_enabled(True)
 
     def toggle_sidebar(self):
@@ -284,8 +326,11 @@ class ChatInterface(NPBasePage):
 
     def save_current_settings(self, config: dict):
         if self.current_session:
-            self.current_session["settings"] = config
-            self.history_manager.save_session(self.current_session_id, self.current_session)
+            self.history_manager.update_session(self.current_session_id, self.current_session, settings=config)
+
+    def save_pinned_images(self, paths: list):
+        if self.current_session:
+            self.history_manager.update_session(self.current_session_id, self.current_session, pinned_images=paths)
 
     def clear_current_chat(self):
         if not self.current_session: return
@@ -315,6 +360,12 @@ class ChatInterface(NPBasePage):
         """Delete a chat session and handle UI state properly."""
         was_current = (sid == self.current_session_id)
         
+        # Its reply would have nowhere to go
+        worker = self.workers.pop(sid, None)
+        if worker:
+            worker.stop()
+            self._detach_worker(worker)
+        
         # Delete the session file
         self.history_manager.delete_session(sid)
         
@@ -325,16 +376,13 @@ class ChatInterface(NPBasePage):
             self.chat_history_api = []
             self.message_display.clear()
         
-        # Refresh sidebar to reflect deletion
-        self._refresh_sidebar()
-        
         # If we deleted current session, select another or create new
         if was_current:
             if self.chat_sidebar.count() > 0:
                 self.chat_sidebar.select_first_item()
             else:
-                # No sessions left - create new (skip refresh since we just did it)
-                self.start_new_chat(refresh_sidebar=False)
+                # No sessions left - create new
+                self.start_new_chat()
 
     def rename_session(self, sid: str):
         data = self.history_manager.load_session(sid)
@@ -344,10 +392,8 @@ class ChatInterface(NPBasePage):
         if dialog.exec():
             new_title = dialog.inputLineEdit.text().strip()
             if new_title:
-                data["title"] = new_title
-                self.history_manager.save_session(sid, data)
-                self._refresh_sidebar()
-                if sid == self.current_session_id: self.current_session["title"] = new_title
+                current = self.current_session if sid == self.current_session_id else None
+                self.history_manager.update_session(sid, current, title=new_title)
 
     def create_new_folder(self):
         dialog = InputDialog("New Folder", "Enter folder name:", self)
@@ -355,12 +401,10 @@ class ChatInterface(NPBasePage):
             name = dialog.inputLineEdit.text().strip()
             if name:
                 self.history_manager.create_folder(name)
-                self._refresh_sidebar()
 
     def move_session_to_folder(self, sid: str, folder: str):
         if self.history_manager.move_session(sid, folder):
             if sid == self.current_session_id: self.current_session["folder"] = folder
-            self._refresh_sidebar()
 
     def delete_folder(self, folder_name: str):
         dialog = MessageBox("Delete Folder?", f"Permanently delete '{folder_name}' and all its chats?", self)
@@ -369,4 +413,3 @@ class ChatInterface(NPBasePage):
             self.history_manager.delete_folder(folder_name)
             if self.current_session and self.current_session.get("folder") == folder_name:
                 self.start_new_chat()
-            self._refresh_sidebar()
@@ -9,12 +9,13 @@ from qfluentwidgets import (
     SwitchButton, Theme, setTheme, FluentIcon, SettingCardGroup, 
     SwitchSettingCard, isDarkTheme, LineEdit, PrimaryPushButton, 
     InfoBar, InfoBarPosition, ExpandSettingCard, ColorPickerButton, SettingCard,
-    setThemeColor, qconfig, ToolButton, ScrollArea, ComboBox
+    setThemeColor, qconfig, ToolButton, ScrollArea, ComboBox, SpinBox
 )
 
 from core.utils import config_helper
 from core import constants
 from core.utils.path_provider import PathProvider
+from core.services.client_registry import invalidate_clients
 from ui.components import (
     ModernPathSelector, CustomColorSettingCard, get_scroll_style, 
     MessageBox, UIConfig, NPBasePage
@@ -99,7 +100,6 @@ class SettingsInterface(NPBasePage):
         self.api_key_card.viewLayout.addWidget(btn_save)
 
         # Timeout Logic
-        from qfluentwidgets import SpinBox
         self.timeout_card = SettingCard(
             FluentIcon.SPEED_HIGH, "API Timeout",
             "Maximum time (seconds) to wait for generation response", self
@@ -117,9 +117,104 @@ class SettingsInterface(NPBasePage):
         self.timeout_card.hBoxLayout.addSpacing(10)
         self.timeout_card.hBoxLayout.addWidget(btn_tout, 0, Qt.AlignRight)
         self.timeout_card.hBoxLayout.addSpacing(16)
+
+        # Batch Parallelism
+        self.concurrency_card = SettingCard(
+            FluentIcon.SPEED_HIGH, "Parallel Requests",
+            "Number of Gemini batch requests sent at the same time", self
+        )
+        self.concurrency_spin = SpinBox()
+        self.concurrency_spin.setRange(1, 16)
+        self.concurrency_spin.setValue(self.config_manager.config.batch_concurrency)
+        self.concurrency_spin.setToolTip("1 = sequential. 4-8 is a good range for most API tiers (Default: 4)")
+        
+        btn_conc = PrimaryPushButton(FluentIcon.SAVE, "Save")
+        btn_conc.setFixedWidth(80)
+        btn_conc.clicked.connect(self.save_concurrency)
+        
+        self.concurrency_card.hBoxLayout.addWidget(self.concurrency_spin, 0, Qt.AlignRight)
+        self.concurrency_card.hBoxLayout.addSpacing(10)
+        self.concurrency_card.hBoxLayout.addWidget(btn_conc, 0, Qt.AlignRight)
+        self.concurrency_card.hBoxLayout.addSpacing(16)
+
+        # Quota Limits (RPM / RPD)
+        self.quota_card = SettingCard(
+            FluentIcon.HISTORY, "Request Limits",
+            "Requests per minute / per day allowed for your API tier", self
+        )
+        self.rpm_spin = SpinBox()
+        self.rpm_spin.setRange(1, 1000)
+        self.rpm_spin.setValue(self.config_manager.config.gemini_rpm)
+        self.rpm_spin.setToolTip("Requests Per Minute. Throughput adapts automatically on 429 errors.")
+        self.rpd_spin = SpinBox()
+        self.rpd_spin.setRange(0, 100000)
+        self.rpd_spin.setValue(self.config_manager.config.gemini_rpd)
+        self.rpd_spin.setToolTip("Requests Per Day (0 = unlimited). Batch stops when reached.")
+
+        btn_quota = PrimaryPushButton(FluentIcon.SAVE, "Save")
+        btn_quota.setFixedWidth(80)
+        btn_quota.clicked.connect(self.save_quota_limits)
+
+        self.quota_card.hBoxLayout.addWidget(QLabel("RPM"), 0, Qt.AlignRight)
+        self.quota_card.hBoxLayout.addWidget(self.rpm_spin, 0, Qt.AlignRight)
+        self.quota_card.hBoxLayout.addSpacing(10)
+        self.quota_card.hBoxLayout.addWidget(QLabel("RPD"), 0, Qt.AlignRight)
+        self.quota_card.hBoxLayout.addWidget(self.rpd_spin, 0, Qt.AlignRight)
+        self.quota_card.hBoxLayout.addSpacing(10)
+        self.quota_card.hBoxLayout.addWidget(btn_quota, 0, Qt.AlignRight)
+        self.quota_card.hBoxLayout.addSpacing(16)
+        
+        # Chat Context Budget
+        self.context_card = SettingCard(
+            FluentIcon.CHAT, "Chat Context",
+            "Token budget for history sent with each chat message / turns always kept", self
+        )
+        self.context_tokens_spin = SpinBox()
+        self.context_tokens_spin.setRange(0, 1000000)
+        self.context_tokens_spin.setSingleStep(1000)
+        self.context_tokens_spin.setValue(self.config_manager.config.chat_context_tokens)
+        self.context_tokens_spin.setToolTip("Older turns are condensed or dropped above this (0 = send everything). Default: 32000")
+        self.keep_turns_spin = SpinBox()
+        self.keep_turns_spin.setRange(0, 100)
+        self.keep_turns_spin.setValue(self.config_manager.config.chat_keep_turns)
+        self.keep_turns_spin.setToolTip("Latest turns always sent verbatim (Default: 6)")
+
+        btn_ctx = PrimaryPushButton(FluentIcon.SAVE, "Save")
+        btn_ctx.setFixedWidth(80)
+        btn_ctx.clicked.connect(self.save_chat_context)
+
+        self.context_card.hBoxLayout.addWidget(QLabel("Tokens"), 0, Qt.AlignRight)
+        self.context_card.hBoxLayout.addWidget(self.context_tokens_spin, 0, Qt.AlignRight)
+        self.context_card.hBoxLayout.addSpacing(10)
+        self.context_card.hBoxLayout.addWidget(QLabel("Turns"), 0, Qt.AlignRight)
+        self.context_card.hBoxLayout.addWidget(self.keep_turns_spin, 0, Qt.AlignRight)
+        self.context_card.hBoxLayout.addSpacing(10)
+        self.context_card.hBoxLayout.addWidget(btn_ctx, 0, Qt.AlignRight)
+        self.context_card.hBoxLayout.addSpacing(16)
         
         group.addSettingCard(self.api_key_card)
         group.addSettingCard(self.timeout_card)
+        group.addSettingCard(self.concurrency_card)
+        group.addSettingCard(self.quota_card)
+        group.addSettingCard(self.context_card)
+
+        self.context_cache_card = SwitchSettingCard(
+            FluentIcon.CLOUD, "Context Caching",
+            "Cache the system instruction and pinned images on Gemini's side (fewer input tokens; storage billed per hour)",
+            None, self
+        )
+        self.context_cache_card.switchButton.setChecked(self.config_manager.config.chat_context_cache)
+        self.context_cache_card.switchButton.checkedChanged.connect(self.toggle_context_cache)
+        group.addSettingCard(self.context_cache_card)
+
+        self.file_uploads_card = SwitchSettingCard(
+            FluentIcon.PHOTO, "Upload Chat Images",
+            "Upload attachments to Gemini's file store once and send them by reference (kept there for 48 h); off = send inline",
+            None, self
+        )
+        self.file_uploads_card.switchButton.setChecked(self.config_manager.config.chat_file_uploads)
+        self.file_uploads_card.switchButton.checkedChanged.connect(self.toggle_file_uploads)
+        group.addSettingCard(self.file_uploads_card)
         self.comfy_key_card = ExpandSettingCard(
             FluentIcon.VPN, "ComfyUI API Key",
             "Configure your ComfyUI API access key (optional)", self
@@ -185,6 +280,45 @@ class SettingsInterface(NPBasePage):
         self.comfy_url_card.viewLayout.addWidget(btn)
         
         group.addSettingCard(self.comfy_url_card)
+
+        # Additional Render Nodes (load balancing)
+        self.comfy_nodes_card = ExpandSettingCard(
+            FluentIcon.IOT, "Additional Render Nodes",
+            "Extra ComfyUI servers; batch tasks go to the one with the shortest queue", self
+        )
+        self.comfy_nodes_input = LineEdit()
+        self.comfy_nodes_input.setPlaceholderText("http://192.168.1.20:8188, http://192.168.1.21:8188")
+        self.comfy_nodes_input.setText(", ".join(self.config_manager.config.comfy_extra_urls))
+        self.comfy_nodes_input.setToolTip("Comma-separated URLs. Leave empty to use only the main ComfyUI URL.")
+
+        btn_nodes = PrimaryPushButton(FluentIcon.SAVE, "Save Nodes")
+        btn_nodes.clicked.connect(self.save_comfy_nodes)
+        btn_nodes.setToolTip("Update the list of additional ComfyUI servers.")
+        self.comfy_nodes_card.viewLayout.addWidget(self.comfy_nodes_input)
+        self.comfy_nodes_card.viewLayout.addWidget(btn_nodes)
+
+        group.addSettingCard(self.comfy_nodes_card)
+
+        # Pipelined Queue Depth
+        self.queue_depth_card = SettingCard(
+            FluentIcon.SPEED_HIGH, "Queue Depth",
+            "Prompts kept queued on the ComfyUI server while others upload/download", self
+        )
+        self.queue_depth_spin = SpinBox()
+        self.queue_depth_spin.setRange(1, 16)
+        self.queue_depth_spin.setValue(self.config_manager.config.comfy_queue_depth)
+        self.queue_depth_spin.setToolTip("1 = one task at a time. 2-4 keeps the GPU busy between tasks (Default: 3)")
+
+        btn_depth = PrimaryPushButton(FluentIcon.SAVE, "Save")
+        btn_depth.setFixedWidth(80)
+        btn_depth.clicked.connect(self.save_queue_depth)
+
+        self.queue_depth_card.hBoxLayout.addWidget(self.queue_depth_spin, 0, Qt.AlignRight)
+        self.queue_depth_card.hBoxLayout.addSpacing(10)
+        self.queue_depth_card.hBoxLayout.addWidget(btn_depth, 0, Qt.AlignRight)
+        self.queue_depth_card.hBoxLayout.addSpacing(16)
+
+        group.addSettingCard(self.queue_depth_card)
         self.layout.addWidget(group)
 
     def _init_storage_group(self):
@@ -391,8 +525,12 @@ class SettingsInterface(NPBasePage):
             InfoBar.warning("Suspicious Key", f"The entered key seems too long ({len(key)} chars). Gemini keys are usually ~39 chars.", 
                            parent=self, duration=5000, position=InfoBarPosition.TOP)
             
+        old_key = self.config_manager.config.api_key
         self.config_manager.config.api_key = key
         self.config_manager.save()
+        if old_key != key:
+            # Drop clients bound to the previous key; new workers pick up the new one
+            invalidate_clients()
         self._show_success(f"Gemini API Key saved (Length: {len(key)})")
 
     def save_timeout(self):
@@ -401,6 +539,34 @@ class SettingsInterface(NPBasePage):
         self.config_manager.save()
         self._show_success(f"Timeout updated to {val} seconds")
 
+    def save_concurrency(self):
+        val = self.concurrency_spin.value()
+        self.config_manager.config.batch_concurrency = val
+        self.config_manager.save()
+        self._show_success(f"Parallel requests set to {val}")
+
+    def save_chat_context(self):
+        self.config_manager.config.chat_context_tokens = self.context_tokens_spin.value()
+        self.config_manager.config.chat_keep_turns = self.keep_turns_spin.value()
+        self.config_manager.save()
+        self._show_success("Chat context budget updated")
+
+    def toggle_context_cache(self, checked: bool):
+        self.config_manager.config.chat_context_cache = checked
+        self.config_manager.save()
+        self._show_success("Context caching " + ("enabled" if checked else "disabled"))
+
+    def toggle_file_uploads(self, checked: bool):
+        self.config_manager.config.chat_file_uploads = checked
+        self.config_manager.save()
+        self._show_success("Chat image uploads " + ("enabled" if checked else "disabled"))
+
+    def save_quota_limits(self):
+        self.config_manager.config.gemini_rpm = self.rpm_spin.value()
+        self.config_manager.config.gemini_rpd = self.rpd_spin.value()
+        self.config_manager.save()
+        self._show_success(f"Limits updated: {self.rpm_spin.value()} RPM / {self.rpd_spin.value()} RPD")
+
     def refresh_api_key(self):
         """Force a re-read from the secure storage."""
         # We bypass get_value to ensure we aren't just hitting a stale cache if something changed externally
@@ -427,6 +593,18 @@ class SettingsInterface(NPBasePage):
         self.config_manager.save()
         self._show_success("ComfyUI URL saved")
 
+    def save_comfy_nodes(self):
+        urls = [u.strip().rstrip('/') for u in self.comfy_nodes_input.text().split(',') if u.strip()]
+        self.config_manager.config.comfy_extra_urls = urls
+        self.config_manager.save()
+        self._show_success(f"{len(urls)} additional render node(s) saved")
+
+    def save_queue_depth(self):
+        val = self.queue_depth_spin.value()
+        self.config_manager.config.comfy_queue_depth = val
+        self.config_manager.save()
+        self._show_success(f"ComfyUI queue depth set to {val}")
+
     def save_data_root(self):
         root = self.data_root_selector.get_path()
         if root:
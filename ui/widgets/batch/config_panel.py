@@ -50,6 +50,16 @@ class ConfigPanel(QWidget):
         self.check_save_logs.setChecked(True)
         self.check_save_logs.setToolTip("If enabled, a .txt file containing the prompt will be saved alongside each image.")
         settings_card.addWidget(self.check_save_logs)
+
+        self.check_resume = CheckBox("Skip completed tasks (resume)")
+        self.check_resume.setChecked(True)
+        self.check_resume.setToolTip("Tasks already finished for the same image, prompt, resolution and ratio are skipped on re-run.")
+        settings_card.addWidget(self.check_resume)
+
+        self.check_result_cache = CheckBox("Reuse cached results")
+        self.check_result_cache.setChecked(False)
+        self.check_result_cache.setToolTip("Identical image + prompt + resolution + ratio requests are served from the local cache instead of the API.")
+        settings_card.addWidget(self.check_result_cache)
         
         self.layout.addWidget(settings_card)
         
@@ -93,6 +103,8 @@ class ConfigPanel(QWidget):
         state = {
             "batch_engine": self.combo_engine.currentIndex(),
             "batch_save_logs": self.check_save_logs.isChecked(),
+            "batch_resume": self.check_resume.isChecked(),
+            "batch_result_cache": self.check_result_cache.isChecked(),
             "batch_seed_val": self.spin_seed.value(),
             "batch_random_seed": self.check_random_seed.isChecked(),
             "batch_input_path": self.path_in.get_path(),
@@ -125,6 +137,8 @@ class ConfigPanel(QWidget):
         })
         
         self.check_save_logs.setChecked(bool(config_helper.get_value("batch_save_logs", True)))
+        self.check_resume.setChecked(bool(config_helper.get_value("batch_resume", True)))
+        self.check_result_cache.setChecked(bool(config_helper.get_value("batch_result_cache", False)))
         
         try: self.spin_seed.setValue(int(config_helper.get_value("batch_seed_val", 123456789)))
         except: pass
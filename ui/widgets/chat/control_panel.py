@@ -18,10 +18,12 @@ class ChatControlPanel(QWidget):
     folderClicked = Signal()
     settingChanged = Signal(dict)
     stopClicked = Signal()
+    pinnedChanged = Signal(list)
 
     def __init__(self, parent: Optional[QWidget] = None) -> None:
         super().__init__(parent)
         self.current_image_paths = []
+        self.pinned_image_paths = []  # Session reference images, kept across messages
         self._init_ui()
         
     def _init_ui(self):
@@ -98,22 +100,47 @@ class ChatControlPanel(QWidget):
             if item.widget():
                 item.widget().deleteLater()
         
-        if not self.current_image_paths:
+        if not self.current_image_paths and not self.pinned_image_paths:
             self.tray_frame.setVisible(False)
             return
         
         self.tray_frame.setVisible(True)
-        for path in self.current_image_paths:
-            item = AttachmentTrayItem(path, self)
+        for path in self.pinned_image_paths + self.current_image_paths:
+            item = AttachmentTrayItem(path, self, pinned=path in self.pinned_image_paths)
             item.removed.connect(self.remove_attachment)
+            item.pinToggled.connect(self.toggle_pin)
             self.tray_layout.addWidget(item)
         self.tray_layout.addStretch()
 
     def remove_attachment(self, path: str):
-        if path in self.current_image_paths:
+        if path in self.pinned_image_paths:
+            self.pinned_image_paths.remove(path)
+            self.update_tray()
+            self.pinnedChanged.emit(list(self.pinned_image_paths))
+        elif path in self.current_image_paths:
             self.current_image_paths.remove(path)
             self.update_tray()
 
+    def toggle_pin(self, path: str):
+        """Pinned images move out of the per-message attachments and stay for the session."""
+        if path in self.pinned_image_paths:
+            self.pinned_image_paths.remove(path)
+            self.current_image_paths.append(path)
+        else:
+            if path in self.current_image_paths:
+                self.current_image_paths.remove(path)
+            self.pinned_image_paths.append(path)
+        self.update_tray()
+        self.pinnedChanged.emit(list(self.pinned_image_paths))
+
+    def set_pinned_images(self, paths: List[str]):
+        """Shows a session's pinned images (no pinnedChanged: nothing changed for the session)."""
+        self.pinned_image_paths = list(paths)
+        self.update_tray()
+
+    def get_pinned_images(self) -> List[str]:
+        return self.pinned_image_paths
+
     def clear_attachments(self):
         self.current_image_paths = []
         self.update_tray()
@@ -8,11 +8,28 @@ class ChatMessageArea(ThemeAwareBackground):
     """
     Standalone Component for displaying chat messages.
     Encapsulates: Scroll Area, Message Bubbles, Auto-scroll Logic.
+
+    Messages are kept as plain data; only a window of at most MAX_RENDERED
+    of them has live bubbles. The window starts at the newest PAGE_SIZE
+    messages, grows a page at a time when scrolling near either edge, and
+    releases the page at the far edge once it exceeds the budget, so widget
+    and pixmap memory stay bounded however long the conversation is.
     """
+    PAGE_SIZE = 20
+    MAX_RENDERED = 60
+    LOAD_MARGIN = 40 # px from the edge that triggers loading the next page
+
     def __init__(self, parent: Optional[QWidget] = None) -> None:
         super().__init__(parent)
         self.setObjectName("ChatMessageArea")
         self.typing_indicator = None
+        self._messages: list[dict] = []
+        self._bubbles: list[MessageBubble] = []
+        self._first = self._last = 0 # Rendered window: self._messages[_first:_last]
+        self._anchor = None
+        self._streaming_index = None # Message receiving a streamed reply
+        self._paging = True # Off between re-rendering the tail and scrolling to it
+        self._stick_to_bottom = False # Follow the bottom while layout is still growing
         self._init_ui()
 
     def _init_ui(self):
@@ -35,6 +52,10 @@ class ChatMessageArea(ThemeAwareBackground):
         self.scroll_area.setWidget(self.container)
         layout.addWidget(self.scroll_area)
 
+        vsb = self.scroll_area.verticalScrollBar()
+        vsb.valueChanged.connect(self._on_scroll)
+        vsb.rangeChanged.connect(self._on_range_changed)
+
     def resizeEvent(self, event) -> None:
         """Ensure scroll stays at bottom if it was there before resize"""
         vsb = self.scroll_area.verticalScrollBar()
@@ -47,6 +68,18 @@ class ChatMessageArea(ThemeAwareBackground):
             # Use small delay to allow QScrollArea to update its maximum
             QTimer.singleShot(10, self.scroll_to_bottom)
 
+    def set_messages(self, messages: list[dict]) -> None:
+        """
+        Replace the conversation with session messages ({'role', 'text', 'images'}).
+        Only the newest page is rendered; older pages load on scroll-up.
+        """
+        self.clear()
+        self._messages = [
+            {"text": m.get("text", ""), "is_user": m.get("role") == "user", "images": m.get("images") or []}
+            for m in messages
+        ]
+        self._show_tail()
+
     def add_user_message(self, text: str, image_paths: Optional[list[str]] = None) -> None:
         """Add a User message bubble (Right aligned)"""
         self._add_bubble(text, is_user=True, image_paths=image_paths)
@@ -56,56 +89,188 @@ class ChatMessageArea(ThemeAwareBackground):
         self._add_bubble(text, is_user=False, image_paths=image_paths)
         
     def _add_bubble(self, text: str, is_user: bool, image_paths: Optional[list[str]] = None) -> None:
-        bubble = MessageBubble(text, is_user, image_paths)
-        # Add before the stretch (which is the last item)
-        count = self.container_layout.count()
-        if count > 0:
-            self.container_layout.insertWidget(count - 1, bubble)
+        at_tail = self._last == len(self._messages)
+        self._messages.append({"text": text, "is_user": is_user, "images": image_paths or []})
+        if at_tail:
+            self._insert_bubble(len(self._bubbles), len(self._messages) - 1)
+            self._last = len(self._messages)
+            self._trim_top()
         else:
-            self.container_layout.addWidget(bubble)
+            # Scrolled back into older pages: jump to the latest message
+            self._show_tail()
             
         QTimer.singleShot(50, self.scroll_to_bottom)
 
+    # --- Streaming ---
+
+    def is_streaming(self) -> bool:
+        return self._streaming_index is not None
+
+    def set_streaming_text(self, text: str) -> None:
+        """Show the reply received so far, updating one AI bubble in place."""
+        if self._streaming_index is None:
+            self.add_ai_message(text)
+            self._streaming_index = len(self._messages) - 1
+            return
+        vsb = self.scroll_area.verticalScrollBar()
+        at_bottom = vsb.value() >= vsb.maximum() - 20
+        self._messages[self._streaming_index]["text"] = text
+        bubble = self._bubble_for(self._streaming_index)
+        if bubble:
+            bubble.set_text(text)
+        if at_bottom:
+            QTimer.singleShot(10, self.scroll_to_bottom)
+
+    def finish_streaming_message(self, text: str, image_paths: Optional[list[str]] = None) -> None:
+        """Settle the streamed reply with its final text and images (plain add if nothing streamed)."""
+        index, self._streaming_index = self._streaming_index, None
+        if index is None:
+            self.add_ai_message(text, image_paths)
+            return
+        self._messages[index].update(text=text, images=image_paths or [])
+        bubble = self._bubble_for(index)
+        if bubble:
+            # Rebuilt once so images get their own loaders
+            position = self._bubbles.index(bubble)
+            self._release(self._bubbles.pop(position))
+            self._insert_bubble(position, index)
+        QTimer.singleShot(50, self.scroll_to_bottom)
+
+    def discard_streaming_message(self) -> None:
+        """Drop a partial reply (e.g. the request failed)."""
+        index, self._streaming_index = self._streaming_index, None
+        if index is None:
+            return
+        bubble = self._bubble_for(index)
+        if bubble:
+            self._release(bubble)
+            self._bubbles.remove(bubble)
+            self._last -= 1
+        elif index < self._first:
+            self._first -= 1
+            self._last -= 1
+        del self._messages[index]
+
+    def _bubble_for(self, index: int) -> Optional[MessageBubble]:
+        if self._first <= index < self._last:
+            return self._bubbles[index - self._first]
+        return None
+
     def message_count(self) -> int:
-        """Returns the number of message bubbles (excluding stretch and typing indicator)"""
-        count = 0
-        for i in range(self.container_layout.count()):
-            widget = self.container_layout.itemAt(i).widget()
-            if widget and isinstance(widget, MessageBubble):
-                count += 1
-        return count
+        """Returns the number of messages in the conversation (rendered or not)"""
+        return len(self._messages)
+
+    def rendered_count(self) -> int:
+        """Returns the number of message bubbles currently alive"""
+        return len(self._bubbles)
 
     def clear(self) -> None:
         """Clear all messages"""
-        while self.container_layout.count() > 1: # Keep the stretch
+        self._anchor = None
+        self._streaming_index = None
+        while self.container_layout.count():
             item = self.container_layout.takeAt(0)
             if item.widget():
                 item.widget().deleteLater()
-                
-        # Or just remove stretch and re-add? 
-        # Actually safer to iterate cleanly:
-        # Re-adding stretch ensures it's at the bottom
-        pass # Improvement: Just clear everything and re-add stretch
-        
-        while self.container_layout.count():
-             item = self.container_layout.takeAt(0)
-             if item.widget():
-                 item.widget().deleteLater()
         
         self.typing_indicator = None # Ensure reference is cleared after widgets are scheduled for deletion
+        self._messages = []
+        self._bubbles = []
+        self._first = self._last = 0
         self.container_layout.addStretch()
 
+    # --- Paging ---
+
+    def _show_tail(self) -> None:
+        """Render only the newest page (drops whatever window was rendered)."""
+        self._anchor = None
+        self._paging = False
+        for bubble in self._bubbles:
+            self._release(bubble)
+        self._bubbles = []
+        self._last = len(self._messages)
+        self._first = max(0, self._last - self.PAGE_SIZE)
+        for index in range(self._first, self._last):
+            self._insert_bubble(len(self._bubbles), index)
+        QTimer.singleShot(50, self.scroll_to_bottom)
+
+    def _insert_bubble(self, position: int, index: int) -> None:
+        """Create the bubble for message `index` at `position` among the rendered bubbles."""
+        msg = self._messages[index]
+        bubble = MessageBubble(msg["text"], msg["is_user"], msg["images"])
+        # Bubbles come first in the layout, then the typing indicator and the stretch
+        self.container_layout.insertWidget(position, bubble)
+        self._bubbles.insert(position, bubble)
+
+    def _release(self, bubble: MessageBubble) -> None:
+        self.container_layout.removeWidget(bubble)
+        bubble.deleteLater()
+
+    def _on_scroll(self, value: int) -> None:
+        vsb = self.scroll_area.verticalScrollBar()
+        self._stick_to_bottom = value >= vsb.maximum() - self.LOAD_MARGIN
+        if not self._paging or self._anchor is not None:
+            return
+        if value <= self.LOAD_MARGIN and self._first > 0:
+            self._load_older()
+        elif value >= vsb.maximum() - self.LOAD_MARGIN and self._last < len(self._messages):
+            self._load_newer()
+
+    def _load_older(self) -> None:
+        """Render the page above the window; release the bottom page if over budget."""
+        self._set_anchor(self._bubbles[0])
+        new_first = max(0, self._first - self.PAGE_SIZE)
+        for index in range(new_first, self._first):
+            self._insert_bubble(index - new_first, index)
+        self._first = new_first
+        while len(self._bubbles) > self.MAX_RENDERED:
+            self._release(self._bubbles.pop())
+            self._last -= 1
+
+    def _load_newer(self) -> None:
+        """Render the page below the window; release the top page if over budget."""
+        self._set_anchor(self._bubbles[-1])
+        new_last = min(len(self._messages), self._last + self.PAGE_SIZE)
+        for index in range(self._last, new_last):
+            self._insert_bubble(len(self._bubbles), index)
+        self._last = new_last
+        self._trim_top()
+
+    def _trim_top(self) -> None:
+        while len(self._bubbles) > self.MAX_RENDERED:
+            self._release(self._bubbles.pop(0))
+            self._first += 1
+
+    def _set_anchor(self, bubble: MessageBubble) -> None:
+        """Remember where `bubble` sits in the viewport so it stays put after relayout."""
+        self._anchor = (bubble, bubble.y() - self.scroll_area.verticalScrollBar().value())
+        # Fallback in case the relayout does not change the scroll range
+        QTimer.singleShot(100, self._restore_anchor)
+
+    def _on_range_changed(self, _min: int, _max: int) -> None:
+        if self._anchor is not None:
+            self._restore_anchor()
+        elif self._stick_to_bottom:
+            # Bubbles laid out after the last scroll_to_bottom (first render, images loading)
+            self.scroll_area.verticalScrollBar().setValue(_max)
+
+    def _restore_anchor(self) -> None:
+        if self._anchor is None:
+            return
+        bubble, offset = self._anchor
+        self._anchor = None
+        try:
+            self.scroll_area.verticalScrollBar().setValue(bubble.y() - offset)
+        except RuntimeError:
+            pass # Bubble was deleted meanwhile
+
     def show_typing_indicator(self, show: bool) -> None:
         """Show/Hide AI thinking indicator"""
         if show:
             if self.typing_indicator:
                 return
             self.typing_indicator = TypingBubble()
-            count = self.container_layout.count()
-            if count > 0:
-                self.container_layout.insertWidget(count - 1, self.typing_indicator)
-            else:
-                self.container_layout.addWidget(self.typing_indicator)
+            self.container_layout.insertWidget(len(self._bubbles), self.typing_indicator)
             QTimer.singleShot(50, self.scroll_to_bottom)
         else:
             if self.typing_indicator:
@@ -120,3 +285,5 @@ class ChatMessageArea(ThemeAwareBackground):
         """Scroll to the bottom of the chat"""
         vsb = self.scroll_area.verticalScrollBar()
         vsb.setValue(vsb.maximum())
+        self._stick_to_bottom = True
+        self._paging = True
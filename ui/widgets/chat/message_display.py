@@ -36,12 +36,27 @@ class ChatMessageDisplay(ThemeAwareBackground):
         self.chat_area = ChatMessageArea(self)
         self.layout.addWidget(self.chat_area)
 
+    def set_messages(self, messages: list[dict]):
+        self.chat_area.set_messages(messages)
+
     def add_user_message(self, text: str, image_paths: Optional[list[str]] = None):
         self.chat_area.add_user_message(text, image_paths)
 
     def add_ai_message(self, text: str, image_paths: Optional[list[str]] = None):
         self.chat_area.add_ai_message(text, image_paths)
 
+    def is_streaming(self) -> bool:
+        return self.chat_area.is_streaming()
+
+    def set_streaming_text(self, text: str):
+        self.chat_area.set_streaming_text(text)
+
+    def finish_streaming_message(self, text: str, image_paths: Optional[list[str]] = None):
+        self.chat_area.finish_streaming_message(text, image_paths)
+
+    def discard_streaming_message(self):
+        self.chat_area.discard_streaming_message()
+
     def message_count(self) -> int:
         return self.chat_area.message_count()
 
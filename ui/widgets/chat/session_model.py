@@ -0,0 +1,261 @@
+from typing import Dict, List, Optional
+from PySide6.QtCore import Qt, QAbstractItemModel, QModelIndex, QObject, Signal
+from qfluentwidgets import FluentIcon
+
+from core.history_manager import (
+    HistoryEvent, SESSION_CREATED, SESSION_UPDATED, SESSION_MOVED, SESSION_DELETED,
+    FOLDER_CREATED, FOLDER_DELETED, RESET
+)
+
+KIND_ROLE = Qt.UserRole      # "folder" or "session"
+ID_ROLE = Qt.UserRole + 1    # Session ID or folder name
+
+
+class _Node:
+    __slots__ = ("kind", "key", "title", "updated_at", "parent", "children")
+
+    def __init__(self, kind: str, key: str, title: str = "", updated_at: str = "", parent=None):
+        self.kind = kind
+        self.key = key
+        self.title = title
+        self.updated_at = updated_at
+        self.parent = parent
+        self.children: List["_Node"] = []
+
+
+class ChatSessionModel(QAbstractItemModel):
+    """
+    Two-level tree of the chat history for the sidebar: folders (by name)
+    first, then root sessions; sessions are newest first within their folder.
+
+    Kept in step with HistoryManager change events: each event inserts,
+    moves, updates or removes only the affected rows, so views keep their
+    selection and scroll position and nothing is re-listed from disk.
+    """
+    # Events may come from the history watcher thread; queued to this model's thread
+    _historyEvent = Signal(object)
+
+    def __init__(self, parent: Optional[QObject] = None) -> None:
+        super().__init__(parent)
+        self._root = _Node("root", "")
+        self._sessions: Dict[str, _Node] = {}
+        self._folders: Dict[str, _Node] = {}
+        self._history = None
+        self._unsubscribe = None
+        self._historyEvent.connect(self._apply_event)
+
+    # --- Feeding ---
+
+    def attach(self, history_manager) -> None:
+        """Load the current listing once, then follow the manager's change events."""
+        self.detach()
+        self._history = history_manager
+        self._unsubscribe = unsubscribe = history_manager.subscribe(self._historyEvent.emit)
+        # Stop listening with the model, not with the (possibly longer-lived) manager
+        self.destroyed.connect(lambda *_: unsubscribe())
+        self.set_structure(history_manager.list_sessions())
+
+    def detach(self) -> None:
+        if self._unsubscribe:
+            self._unsubscribe()
+        self._unsubscribe = None
+        self._history = None
+
+    def set_structure(self, structure: Dict) -> None:
+        """Full reset from a HistoryManager.list_sessions() structure."""
+        self.beginResetModel()
+        self._root.children = []
+        self._sessions.clear()
+        self._folders.clear()
+        for name in sorted(structure.get("folders", {})):
+            folder = self._new_folder(name)
+            self._root.children.append(folder)
+            for sess in structure["folders"][name]:
+                folder.children.append(self._new_session(sess, folder))
+        for sess in structure.get("sessions", []):
+            self._root.children.append(self._new_session(sess, self._root))
+        for node in [self._root] + list(self._folders.values()):
+            node.children[self._folder_count(node):] = sorted(
+                node.children[self._folder_count(node):], key=lambda n: n.updated_at, reverse=True
+            )
+        self.endResetModel()
+
+    def _apply_event(self, event: HistoryEvent) -> None:
+        if event.kind in (SESSION_CREATED, SESSION_UPDATED, SESSION_MOVED):
+            self.upsert_session(event.info)
+        elif event.kind == SESSION_DELETED:
+            self.remove_session(event.session_id)
+        elif event.kind == FOLDER_CREATED:
+            self.add_folder(event.folder)
+        elif event.kind == FOLDER_DELETED:
+            self.remove_folder(event.folder)
+        elif event.kind == RESET and self._history is not None:
+            self.set_structure(self._history.list_sessions())
+
+    # --- Incremental updates ---
+
+    def upsert_session(self, info: Dict) -> None:
+        """Insert a session, or update its title/time and move it to its place."""
+        folder_name = info.get("folder", "") or ""
+        parent = self.add_folder(folder_name) if folder_name else self._root
+        node = self._sessions.get(info["id"])
+
+        if node is not None and node.parent is not parent:
+            self.remove_session(node.key)
+            node = None
+
+        if node is None:
+            node = self._new_session(info, parent)
+            row = self._session_position(parent, node.updated_at)
+            self.beginInsertRows(self._index_of(parent), row, row)
+            parent.children.insert(row, node)
+            self.endInsertRows()
+            return
+
+        node.title = info.get("title", node.title)
+        node.updated_at = info.get("updated_at", node.updated_at)
+        row = parent.children.index(node)
+        parent.children.pop(row)
+        target = self._session_position(parent, node.updated_at)
+        parent.children.insert(row, node)
+        if target != row:
+            parent_index = self._index_of(parent)
+            # Destination is counted before the move, hence +1 when moving down
+            self.beginMoveRows(parent_index, row, row, parent_index, target if target < row else target + 1)
+            parent.children.insert(target, parent.children.pop(row))
+            self.endMoveRows()
+            row = target
+        index = self.createIndex(row, 0, node)
+        self.dataChanged.emit(index, index, [Qt.DisplayRole])
+
+    def remove_session(self, session_id: str) -> None:
+        node = self._sessions.pop(session_id, None)
+        if node is None:
+            return
+        row = node.parent.children.index(node)
+        self.beginRemoveRows(self._index_of(node.parent), row, row)
+        node.parent.children.pop(row)
+        self.endRemoveRows()
+
+    def add_folder(self, name: str) -> _Node:
+        """Folder node by name, inserted in name order if new."""
+        node = self._folders.get(name)
+        if node is not None:
+            return node
+        node = self._new_folder(name)
+        folders = self._root.children[:self._folder_count(self._root)]
+        row = sum(1 for f in folders if f.key < name)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._root.children.insert(row, node)
+        self.endInsertRows()
+        return node
+
+    def remove_folder(self, name: str) -> None:
+        """Drops the folder and its subfolders with all their sessions (as HistoryManager does)."""
+        prefix = name.rstrip("/\\")
+        for key in [k for k in self._folders if k == prefix or k.startswith((prefix + "/", prefix + "\\"))]:
+            node = self._folders.pop(key)
+            for child in node.children:
+                self._sessions.pop(child.key, None)
+            row = self._root.children.index(node)
+            self.beginRemoveRows(QModelIndex(), row, row)
+            self._root.children.pop(row)
+            self.endRemoveRows()
+
+    # --- Lookup ---
+
+    def folder_names(self) -> List[str]:
+        return [node.key for node in self._root.children if node.kind == "folder"]
+
+    def index_for_session(self, session_id: str) -> QModelIndex:
+        node = self._sessions.get(session_id)
+        if node is None:
+            return QModelIndex()
+        return self.createIndex(node.parent.children.index(node), 0, node)
+
+    # --- QAbstractItemModel ---
+
+    def index(self, row: int, column: int, parent: QModelIndex = QModelIndex()) -> QModelIndex:
+        node = self._node(parent)
+        if column != 0 or not 0 <= row < len(node.children):
+            return QModelIndex()
+        return self.createIndex(row, 0, node.children[row])
+
+    def parent(self, index: QModelIndex = QModelIndex()) -> QModelIndex:
+        if not index.isValid():
+            return QModelIndex()
+        parent = index.internalPointer().parent
+        if parent is None or parent is self._root:
+            return QModelIndex()
+        # Folders are only top level and come first, so this lookup stays short
+        return self.createIndex(self._root.children.index(parent), 0, parent)
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.column() > 0:
+            return 0
+        return len(self._node(parent).children)
+
+    def columnCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        return 1
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        if role == Qt.DisplayRole:
+            return node.title
+        if role == Qt.DecorationRole and node.kind == "folder":
+            return FluentIcon.FOLDER.icon()
+        if role == KIND_ROLE:
+            return node.kind
+        if role == ID_ROLE:
+            return node.key
+        return None
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlags:
+        if not index.isValid():
+            return Qt.ItemIsDropEnabled  # Dropping on empty space moves to root
+        if index.internalPointer().kind == "folder":
+            return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsDropEnabled
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsDragEnabled
+
+    def supportedDropActions(self) -> Qt.DropActions:
+        return Qt.MoveAction
+
+    # --- Internal ---
+
+    def _node(self, index: QModelIndex) -> _Node:
+        return index.internalPointer() if index.isValid() else self._root
+
+    def _index_of(self, node: _Node) -> QModelIndex:
+        if node is self._root:
+            return QModelIndex()
+        return self.createIndex(node.parent.children.index(node), 0, node)
+
+    def _new_session(self, sess: Dict, parent: _Node) -> _Node:
+        node = _Node("session", sess["id"], sess.get("title", "Untitled"), sess.get("updated_at", ""), parent)
+        self._sessions[node.key] = node
+        return node
+
+    def _new_folder(self, name: str) -> _Node:
+        node = _Node("folder", name, name, parent=self._root)
+        self._folders[name] = node
+        return node
+
+    @staticmethod
+    def _folder_count(node: _Node) -> int:
+        count = 0
+        while count < len(node.children) and node.children[count].kind == "folder":
+            count += 1
+        return count
+
+    def _session_position(self, parent: _Node, updated_at: str) -> int:
+        """Row for a session in parent's children: after folders, newest first (binary search)."""
+        lo, hi = self._folder_count(parent), len(parent.children)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if parent.children[mid].updated_at >= updated_at:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
@@ -1,11 +1,12 @@
 from typing import List, Dict, Optional
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTreeWidgetItem
-from PySide6.QtCore import Qt, Signal, QSize
-from qfluentwidgets import TreeWidget, ToolButton, FluentIcon, BodyLabel, RoundMenu, Action, MenuAnimationType
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel
+from PySide6.QtCore import Qt, Signal, QSize, QModelIndex
+from qfluentwidgets import TreeView, ToolButton, FluentIcon, BodyLabel, RoundMenu, Action, MenuAnimationType
 from ui.components import NPButton, ThemeAwareBackground
+from ui.widgets.chat.session_model import ChatSessionModel, KIND_ROLE, ID_ROLE
 
-class ChatTreeWidget(TreeWidget):
-    """Subclass of TreeWidget to handle custom Drag & Drop logic for chat sessions."""
+class ChatTreeView(TreeView):
+    """TreeView over ChatSessionModel with custom Drag & Drop logic for chat sessions."""
     
     sessionMoved = Signal(str, str) # Emits sid, folder_name
 
@@ -13,30 +14,30 @@ class ChatTreeWidget(TreeWidget):
         super().__init__(parent)
         self.setDragEnabled(True)
         self.setAcceptDrops(True)
-        self.setDragDropMode(TreeWidget.InternalMove)
+        self.setDragDropMode(TreeView.InternalMove)
         self.setHeaderHidden(True)
         self.setIndentation(20)
 
     def dropEvent(self, event):
-        item = self.itemAt(event.position().toPoint())
-        selected_item = self.currentItem()
+        # The move goes through HistoryManager; the model follows its change event
+        index = self.indexAt(event.position().toPoint())
+        selected = self.currentIndex()
+        event.accept()
         
-        if not selected_item or selected_item.data(0, Qt.UserRole) != "session":
-            super().dropEvent(event)
+        if not selected.isValid() or selected.data(KIND_ROLE) != "session":
             return
             
-        sid = selected_item.data(1, Qt.UserRole)
+        sid = selected.data(ID_ROLE)
         target_folder = ""
         
         # Determine target folder based on where we dropped
-        if item:
-            if item.data(0, Qt.UserRole) == "folder":
-                target_folder = item.data(1, Qt.UserRole)
-            elif item.parent(): 
-                target_folder = item.parent().data(1, Qt.UserRole)
+        if index.isValid():
+            if index.data(KIND_ROLE) == "folder":
+                target_folder = index.data(ID_ROLE)
+            elif index.parent().isValid():
+                target_folder = index.parent().data(ID_ROLE)
         
         self.sessionMoved.emit(sid, target_folder)
-        event.accept()
 
 class ChatSidebar(ThemeAwareBackground):
     """
@@ -59,7 +60,7 @@ class ChatSidebar(ThemeAwareBackground):
         self.setMinimumWidth(0) # Allow collapsing to zero
         self.setMaximumWidth(300)
         
-        self.folders = [] # Cached folder list for move menu
+        self.model = ChatSessionModel(self)
         self._init_ui()
         
     def _init_ui(self):
@@ -84,72 +85,54 @@ class ChatSidebar(ThemeAwareBackground):
         layout.addSpacing(10)
         
         # History Tree
-        self.history_list = ChatTreeWidget(self)
+        self.history_list = ChatTreeView(self)
+        self.history_list.setModel(self.model)
         self.history_list.setContextMenuPolicy(Qt.CustomContextMenu)
         self.history_list.customContextMenuRequested.connect(self._show_context_menu)
-        self.history_list.itemClicked.connect(self._on_item_clicked)
+        self.history_list.clicked.connect(self._on_item_clicked)
         self.history_list.sessionMoved.connect(self.sessionMoved.emit)
         layout.addWidget(self.history_list)
         
-    def set_sessions(self, structure: Dict) -> None:
-        """Repopulate tree with folders and sessions"""
-        self.history_list.clear()
-        
-        # Update folder cache
-        folders = structure.get("folders", {})
-        self.folders = list(folders.keys())
-        
-        # Add Folders
-        folders = structure.get("folders", {})
-        for folder_name, sessions in folders.items():
-            folder_item = QTreeWidgetItem([folder_name])
-            folder_item.setIcon(0, FluentIcon.FOLDER.icon())
-            folder_item.setData(0, Qt.UserRole, "folder")
-            folder_item.setData(1, Qt.UserRole, folder_name)
-            self.history_list.addTopLevelItem(folder_item)
-            
-            for sess in sessions:
-                self._add_session_item(sess, parent=folder_item)
-                
-        # Add Root Sessions
-        root_sessions = structure.get("sessions", [])
-        for sess in root_sessions:
-            self._add_session_item(sess)
+    @property
+    def folders(self) -> List[str]:
+        """Folder names for the move menu"""
+        return self.model.folder_names()
 
-    def _add_session_item(self, sess: Dict, parent: Optional[QTreeWidgetItem] = None) -> None:
-        """Helper to add session item to tree"""
-        item = QTreeWidgetItem([sess["title"]])
-        item.setData(0, Qt.UserRole, "session")
-        item.setData(1, Qt.UserRole, sess["id"])
-        
-        if parent:
-            parent.addChild(item)
-        else:
-            self.history_list.addTopLevelItem(item)
+    def set_history(self, history_manager) -> None:
+        """Load the history once and follow its change events (only affected rows update)"""
+        self.model.attach(history_manager)
+
+    def set_sessions(self, structure: Dict) -> None:
+        """Repopulate tree with folders and sessions (full reset)"""
+        self.model.set_structure(structure)
 
     def add_session(self, sess: Dict) -> None:
-        """Add a single session (usually for new chats)"""
-        # For simplicity, we refresh the whole tree or just add to top
-        self._add_session_item(sess)
+        """Add or update a single session row"""
+        self.model.upsert_session(sess)
 
     def clear(self) -> None:
         """Clear all items"""
-        self.history_list.clear()
+        self.model.set_structure({})
 
-    def _on_item_clicked(self, item: QTreeWidgetItem):
-        type = item.data(0, Qt.UserRole)
-        if type == "session":
-            sid = item.data(1, Qt.UserRole)
+    def select_session(self, sid: str) -> None:
+        """Highlight a session without emitting sessionSelected"""
+        index = self.model.index_for_session(sid)
+        if index.isValid():
+            self.history_list.setCurrentIndex(index)
+
+    def _on_item_clicked(self, index: QModelIndex):
+        if index.data(KIND_ROLE) == "session":
+            sid = index.data(ID_ROLE)
             if sid:
                 self.sessionSelected.emit(sid)
 
     def _show_context_menu(self, pos):
         """Show native Fluent context menu on right click"""
-        item = self.history_list.itemAt(pos)
-        if not item:
+        item = self.history_list.indexAt(pos)
+        if not item.isValid():
             return
             
-        type = item.data(0, Qt.UserRole)
+        type = item.data(KIND_ROLE)
         menu = RoundMenu(parent=self)
         
         if type == "session":
@@ -160,9 +143,9 @@ class ChatSidebar(ThemeAwareBackground):
         if not menu.isEmpty():
             menu.exec(self.history_list.mapToGlobal(pos), aniType=MenuAnimationType.DROP_DOWN)
 
-    def _add_session_actions(self, menu: RoundMenu, item: QTreeWidgetItem):
+    def _add_session_actions(self, menu: RoundMenu, item: QModelIndex):
         """Add actions for a chat session item"""
-        sid = item.data(1, Qt.UserRole)
+        sid = item.data(ID_ROLE)
         
         rename_action = Action(FluentIcon.EDIT, "Rename", self)
         rename_action.triggered.connect(lambda: self.sessionRenamed.emit(sid))
@@ -189,9 +172,9 @@ class ChatSidebar(ThemeAwareBackground):
         delete_action.triggered.connect(lambda: self.sessionDeleted.emit(sid))
         menu.addAction(delete_action)
 
-    def _add_folder_actions(self, menu: RoundMenu, item: QTreeWidgetItem):
+    def _add_folder_actions(self, menu: RoundMenu, item: QModelIndex):
         """Add actions for a folder item"""
-        folder_name = item.data(1, Qt.UserRole)
+        folder_name = item.data(ID_ROLE)
         
         delete_action = Action(FluentIcon.DELETE, "Delete Folder", self)
         delete_action.triggered.connect(lambda: self.folderDeleted.emit(folder_name))
@@ -199,15 +182,15 @@ class ChatSidebar(ThemeAwareBackground):
             
     def select_first_item(self):
         """Programmatically select the first session item if exists"""
-        if self.history_list.topLevelItemCount() > 0:
-            item = self.history_list.topLevelItem(0)
-            if item.data(0, Qt.UserRole) == "session":
-                self.history_list.setCurrentItem(item)
+        if self.model.rowCount() > 0:
+            item = self.model.index(0, 0)
+            if item.data(KIND_ROLE) == "session":
+                self.history_list.setCurrentIndex(item)
                 self._on_item_clicked(item)
-            elif item.childCount() > 0:
-                child = item.child(0)
-                self.history_list.setCurrentItem(child)
+            elif self.model.rowCount(item) > 0:
+                child = self.model.index(0, 0, item)
+                self.history_list.setCurrentIndex(child)
                 self._on_item_clicked(child)
 
     def count(self) -> int:
-        return self.history_list.topLevelItemCount()
+        return self.model.rowCount()
@@ -113,7 +113,7 @@ class ModernWindow(FluentWindow):
         root_path = Path(self.config_manager.config.data_root or str(default_root))
         
         hist_path = root_path / "History"
-        self.history_manager = HistoryManager(base_dir=hist_path)
+        self.history_manager = HistoryManager(base_dir=hist_path, watch_interval=5.0)
         
         # Register global error handler for UI notifications
         from core.utils.error_manager import error_manager, ErrorSeverity